@@ -0,0 +1,201 @@
+"""
+Throughput, latency and memory of SpaceTradersApi calls against the local mock server.
+
+    python -m benchmarks.client --calls 500 --save before.json
+    python -m benchmarks.client --calls 500 --compare before.json --threshold 0.1
+"""
+
+import argparse
+import itertools
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict
+
+from benchmarks import payloads
+from benchmarks.mock_server import MockServer
+from spacetraders_api.decoding import Decoder
+from spacetraders_api.models import Ship
+from spacetraders_api.spacetraders_api import SpaceTradersApi
+
+# Metrics where a larger value is a regression, the others regress when they shrink
+_LOWER_IS_BETTER = ("p50_ms", "p99_ms", "peak_kib")
+
+
+def _percentile(sorted_values, q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def measure(call: Callable[[], object], calls: int, threads: int = 1) -> Dict:
+    """
+    Run `call` `calls` times on `threads` threads, then once more under tracemalloc for memory
+    """
+    call()  # warm up connections and caches
+
+    def timed(_):
+        start = time.perf_counter()
+        call()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    if threads == 1:
+        latencies = [timed(i) for i in range(calls)]
+    else:
+        with ThreadPoolExecutor(threads) as pool:
+            latencies = list(pool.map(timed, range(calls)))
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "rps": calls / elapsed,
+        "p50_ms": _percentile(latencies, 0.5) * 1e3,
+        "p99_ms": _percentile(latencies, 0.99) * 1e3,
+        "mean_ms": statistics.fmean(latencies) * 1e3,
+        "peak_kib": peak / 1024,
+    }
+
+
+def run(args) -> Dict:
+    server = MockServer(
+        latency=args.latency,
+        per_second=args.per_second,
+        burst=args.burst,
+        system_count=args.systems,
+        ship_count=args.ships,
+    ).start()
+    api = SpaceTradersApi(
+        "benchmark",
+        hostname=server.hostname,
+        scheme="http",
+        rate_limit=args.per_second is not None,
+        decode_mode=args.decode_mode,
+        pool_size=args.threads,
+        max_connections_per_host=args.threads,
+    )
+    ship_items = [payloads.ship(i) for i in range(args.ships)]
+    decoder = Decoder(args.decode_mode)
+    system_index = itertools.count()
+    scenarios = {
+        "get_my_agent": (api.get_my_agent, 1),
+        "get_my_ships": (api.get_my_ships, 1),
+        "get_system": (lambda: api.get_system("X1-BM7"), 1),
+        "get_systems_page": (lambda: api.get_systems(page=3, limit=20), 1),
+        "navigate_ship_to": (
+            lambda: api.navigate_ship_to("BENCH-1", "X1-BM1-W2"),
+            1,
+        ),
+        # Distinct systems, identical concurrent GETs would be coalesced into one request
+        "get_system_threaded": (
+            lambda: api.get_system(f"X1-BM{next(system_index) % args.systems}"),
+            args.threads,
+        ),
+        "iter_systems": (lambda: sum(1 for _ in api.iter_systems()), 1),
+        "decode_ships": (lambda: decoder.many(Ship, ship_items), 1),
+    }
+    results = {}
+    try:
+        for name, (call, threads) in scenarios.items():
+            if args.only and name not in args.only:
+                continue
+            calls = max(1, args.calls // 20) if name == "iter_systems" else args.calls
+            results[name] = measure(call, calls, threads)
+            print(_format_row(name, results[name]), flush=True)
+    finally:
+        api.close()
+        server.stop()
+    return {
+        "meta": {
+            "date": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+            "server_requests": server.requests,
+            "server_rate_limited": server.rate_limited,
+        },
+        "results": results,
+    }
+
+
+def _format_row(name: str, result: Dict) -> str:
+    return (
+        f"{name:<22}{result['rps']:>10.1f}{result['p50_ms']:>10.2f}"
+        f"{result['p99_ms']:>10.2f}{result['peak_kib']:>12.1f}"
+    )
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> int:
+    """
+    Print the relative change of every metric against a saved run
+    :return: Number of metrics that got worse by more than `threshold`
+    """
+    regressions = 0
+    print(
+        f"\n{'scenario':<22}{'metric':<10}{'baseline':>12}{'current':>12}{'change':>9}"
+    )
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        for metric in ("rps", "p50_ms", "p99_ms", "peak_kib"):
+            if not before.get(metric):
+                continue
+            change = result[metric] / before[metric] - 1
+            worse = (
+                change > threshold
+                if metric in _LOWER_IS_BETTER
+                else -change > threshold
+            )
+            regressions += worse
+            flag = "  REGRESSION" if worse else ""
+            print(
+                f"{name:<22}{metric:<10}{before[metric]:>12.2f}{result[metric]:>12.2f}"
+                f"{change:>+9.1%}{flag}"
+            )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.0, help="server latency (s)")
+    parser.add_argument(
+        "--per-second",
+        type=float,
+        default=None,
+        help="server rate limit, also turns on the client limiter",
+    )
+    parser.add_argument("--burst", type=int, default=30)
+    parser.add_argument("--systems", type=int, default=200)
+    parser.add_argument("--ships", type=int, default=20)
+    parser.add_argument("--decode-mode", default="validate")
+    parser.add_argument("--only", nargs="*", help="scenarios to run")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file of a previous run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    print(f"{'scenario':<22}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'peak KiB':>12}")
+    current = run(args)
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(current, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(
+                f"\n{regressions} metric(s) regressed by more than {args.threshold:.0%}"
+            )
+            sys.exit(1)
@@ -0,0 +1,49 @@
+"""
+Compare the decode modes of SpaceTradersApi on get_my_ships-shaped payloads.
+
+    python -m benchmarks.decode_modes --ships 200 --repeat 50
+"""
+
+import argparse
+import timeit
+
+from benchmarks.payloads import ship
+from spacetraders_api.decoding import DECODE_MODES, Decoder
+from spacetraders_api.models import Ship
+
+
+def _per_item_validation(items):
+    return [Ship(**item) for item in items]
+
+
+def run(ship_count: int, repeat: int):
+    items = [ship(i) for i in range(ship_count)]
+    print(f"{ship_count} ships per call, best of {repeat} runs")
+    print(f"{'mode':<22}{'decode ms':>12}{'decode+read ms':>16}")
+
+    def report(name, decode):
+        decode_only = min(timeit.repeat(lambda: decode(items), number=1, repeat=repeat))
+
+        def decode_and_read():
+            for decoded in decode(items):
+                # Typical polling reads a couple of nested fields per ship
+                if isinstance(decoded, dict):
+                    decoded["nav"]["status"], decoded["fuel"]["current"]
+                else:
+                    decoded.nav.status, decoded.fuel.current
+
+        with_read = min(timeit.repeat(decode_and_read, number=1, repeat=repeat))
+        print(f"{name:<22}{decode_only * 1e3:>12.3f}{with_read * 1e3:>16.3f}")
+
+    report("Ship(**item) loop", _per_item_validation)
+    for mode in DECODE_MODES:
+        decoder = Decoder(mode)
+        report(mode, lambda items, decoder=decoder: decoder.many(Ship, items))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ships", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run(args.ships, args.repeat)
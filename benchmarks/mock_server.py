@@ -0,0 +1,287 @@
+"""
+Local stand-in for the SpaceTraders API serving the payloads from benchmarks.payloads,
+with configurable latency and server-side rate limiting.
+
+    python -m benchmarks.mock_server --port 8080 --latency 0.02 --per-second 2 --burst 30
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks import payloads
+
+MAX_PAGE_SIZE = 20
+
+_SHIP = re.compile(r"/my/ships/([^/]+)")
+_SHIP_ACTION = re.compile(r"/my/ships/([^/]+)/(orbit|dock|navigate)")
+_SYSTEM = re.compile(r"/systems/X1-BM(\d+)")
+_WAYPOINTS = re.compile(r"/systems/(X1-BM\d+)/waypoints")
+_WAYPOINT = re.compile(r"/systems/(X1-BM\d+)/waypoints/X1-BM\d+-W(\d+)")
+
+
+def _encode(payload) -> bytes:
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def _page(items_at, total: int, query) -> dict:
+    page = max(1, int(query.get("page", ["1"])[0]))
+    limit = min(MAX_PAGE_SIZE, max(1, int(query.get("limit", ["10"])[0])))
+    first = (page - 1) * limit
+    return {
+        "data": [items_at(i) for i in range(first, min(total, first + limit))],
+        "meta": {"total": total, "page": page, "limit": limit},
+    }
+
+
+class _Bucket:
+    """
+    Server-side twin of the SpaceTraders limits: steady rate plus a burst pool
+    """
+
+    def __init__(self, per_second: float, burst: int, burst_time: float):
+        self.per_second = per_second
+        self.burst = burst
+        self.burst_time = burst_time
+        self._steady = per_second
+        self._pool = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        """
+        (allowed, remaining burst, seconds until a request would be allowed)
+        """
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._updated = now
+            self._steady = min(
+                self.per_second, self._steady + elapsed * self.per_second
+            )
+            self._pool = min(
+                float(self.burst), self._pool + elapsed * self.burst / self.burst_time
+            )
+            if self._steady >= 1:
+                self._steady -= 1
+                return True, int(self._pool), 0.0
+            if self._pool >= 1:
+                self._pool -= 1
+                return True, int(self._pool), 0.0
+            return False, 0, (1 - self._steady) / self.per_second
+
+
+class MockServer:
+    def __init__(
+        self,
+        port: int = 0,
+        latency: float = 0.0,
+        per_second: float = None,
+        burst: int = 30,
+        burst_time: float = 60.0,
+        system_count: int = payloads.SYSTEM_COUNT,
+        ship_count: int = 20,
+    ):
+        """
+        :param port: Port to listen on, 0 picks a free one
+        :param latency: Seconds added to every response
+        :param per_second: (optional) Steady requests per second before 429s, unlimited by default
+        :param burst: Burst pool size when rate limiting
+        :param burst_time: Seconds for the burst pool to refill
+        :param system_count: Number of systems in the paginated /systems listing
+        :param ship_count: Number of ships returned by /my/ships
+        """
+        self.latency = latency
+        self.system_count = system_count
+        self.ship_count = ship_count
+        self.requests = 0
+        self.rate_limited = 0
+        self._bucket = (
+            _Bucket(per_second, burst, burst_time) if per_second is not None else None
+        )
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_port
+
+    @property
+    def hostname(self) -> str:
+        return f"127.0.0.1:{self.port}"
+
+    def start(self) -> "MockServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @lru_cache(maxsize=None)
+    def _static_body(self, path: str):
+        """
+        Pre-encoded body of a GET whose response never changes, None for unknown paths
+        """
+        if path == "/":
+            return _encode({"status": "mock", "resetDate": "2024-06-01"})
+        if path == "/my/agent":
+            return _encode({"data": payloads.agent()})
+        if path == "/my/ships":
+            ships = [payloads.ship(i) for i in range(self.ship_count)]
+            return _encode(
+                {"data": ships, "meta": {"total": len(ships), "page": 1, "limit": 20}}
+            )
+        match = _WAYPOINT.fullmatch(path)
+        if match:
+            return _encode({"data": payloads.waypoint(match[1], int(match[2]))})
+        match = _SHIP.fullmatch(path)
+        if match:
+            return _encode({"data": payloads.ship(int(match[1].split("-")[-1], 16))})
+        match = _SYSTEM.fullmatch(path)
+        if match:
+            return _encode({"data": payloads.system(int(match[1]))})
+        return None
+
+    @lru_cache(maxsize=4096)
+    def _page_body(self, path: str, query: str):
+        query = parse_qs(query)
+        if path == "/systems":
+            return _encode(_page(payloads.system, self.system_count, query))
+        match = _WAYPOINTS.fullmatch(path)
+        if match:
+            return _encode(
+                _page(
+                    lambda i: payloads.waypoint(match[1], i),
+                    payloads.WAYPOINTS_PER_SYSTEM,
+                    query,
+                )
+            )
+        if path == "/agents":
+            return _encode(_page(payloads.agent, 1000, query))
+        return None
+
+    def _post_body(self, path: str):
+        match = _SHIP_ACTION.fullmatch(path)
+        if match is None:
+            return None
+        nav = payloads.ship_nav(
+            match[1],
+            {"orbit": "IN_ORBIT", "dock": "DOCKED"}.get(match[2], "IN_TRANSIT"),
+        )
+        if match[2] == "navigate":
+            return _encode(
+                {"data": {"nav": nav, "fuel": payloads.ship_fuel(), "events": []}}
+            )
+        return _encode({"data": {"nav": nav}})
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Send headers and body in one segment, otherwise Nagle's algorithm and
+            # delayed ACKs add ~40ms to every keep-alive response
+            wbufsize = 65536
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status: int, body: bytes, headers=()):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _handle(self, method: str):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                headers = []
+                if server._bucket is not None:
+                    allowed, remaining, retry_after = server._bucket.take()
+                    headers = [
+                        (
+                            "x-ratelimit-limit-per-second",
+                            str(server._bucket.per_second),
+                        ),
+                        ("x-ratelimit-limit-burst", str(server._bucket.burst)),
+                        ("x-ratelimit-burst-time", str(server._bucket.burst_time)),
+                        ("x-ratelimit-remaining", str(remaining)),
+                    ]
+                    if not allowed:
+                        server.rate_limited += 1
+                        error = {
+                            "error": {
+                                "code": 429,
+                                "message": "Rate limit exceeded",
+                                "data": {"retryAfter": retry_after},
+                            }
+                        }
+                        self._reply(
+                            429,
+                            _encode(error),
+                            headers + [("retry-after", f"{retry_after:.3f}")],
+                        )
+                        return
+
+                url = urlsplit(self.path)
+                path = url.path[3:] if url.path.startswith("/v2") else url.path
+                path = path or "/"
+                if method == "GET":
+                    body = server._static_body(path)
+                    if body is None:
+                        body = server._page_body(path, url.query)
+                else:
+                    body = server._post_body(path)
+                if body is None:
+                    body = _encode({"error": {"code": 404, "message": "Not found"}})
+                    self._reply(404, body, headers)
+                    return
+                self._reply(201 if method == "POST" else 200, body, headers)
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def do_PATCH(self):
+                self._handle("PATCH")
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--per-second", type=float, default=None)
+    parser.add_argument("--burst", type=int, default=30)
+    args = parser.parse_args()
+    mock = MockServer(args.port, args.latency, args.per_second, args.burst).start()
+    print(f"Serving on http://{mock.hostname}/v2, Ctrl+C to stop")
+    try:
+        mock._thread.join()
+    except KeyboardInterrupt:
+        mock.stop()
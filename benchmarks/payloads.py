@@ -0,0 +1,176 @@
+"""
+SpaceTraders-shaped response payloads used by the offline benchmarks
+"""
+
+SYSTEM_COUNT = 10000
+WAYPOINTS_PER_SYSTEM = 12
+
+
+def _route_point(system_symbol: str, waypoint_symbol: str, x: int, y: int) -> dict:
+    return {
+        "symbol": waypoint_symbol,
+        "type": "PLANET",
+        "systemSymbol": system_symbol,
+        "x": x,
+        "y": y,
+    }
+
+
+def ship_nav(ship_symbol: str, status: str = "DOCKED") -> dict:
+    origin = _route_point("X1-BM1", "X1-BM1-A1", 12, -7)
+    destination = _route_point("X1-BM1", "X1-BM1-B2", -40, 33)
+    return {
+        "systemSymbol": "X1-BM1",
+        "waypointSymbol": "X1-BM1-B2",
+        "route": {
+            "origin": origin,
+            "destination": destination,
+            "arrival": "2024-06-01T12:00:45.000Z",
+            "departureTime": "2024-06-01T12:00:00.000Z",
+        },
+        "status": status,
+        "flightMode": "CRUISE",
+    }
+
+
+def ship_fuel() -> dict:
+    return {
+        "current": 312,
+        "capacity": 400,
+        "consumed": {"amount": 88, "timestamp": "2024-06-01T12:00:00.000Z"},
+    }
+
+
+def ship(index: int) -> dict:
+    symbol = f"BENCH-{index:X}"
+    requirements = {"power": 1, "crew": 2}
+    return {
+        "symbol": symbol,
+        "nav": ship_nav(symbol),
+        "crew": {
+            "current": 57,
+            "capacity": 80,
+            "required": 57,
+            "rotation": "STRICT",
+            "morale": 100,
+            "wages": 0,
+        },
+        "fuel": ship_fuel(),
+        "cooldown": {"shipSymbol": symbol, "totalSeconds": 70, "remainingSeconds": 0},
+        "frame": {
+            "symbol": "FRAME_FRIGATE",
+            "name": "Frigate",
+            "description": "A medium-sized, multi-purpose spacecraft.",
+            "moduleSlots": 8,
+            "mountingPoints": 5,
+            "fuelCapacity": 400,
+            "condition": 1.0,
+            "integrity": 1,
+            "requirements": {"power": 8, "crew": 25},
+        },
+        "reactor": {
+            "symbol": "REACTOR_FISSION_I",
+            "name": "Fission Reactor I",
+            "description": "A basic fission power reactor.",
+            "condition": 1,
+            "integrity": 1,
+            "powerOutput": 31,
+            "requirements": {"crew": 8},
+        },
+        "engine": {
+            "symbol": "ENGINE_ION_DRIVE_II",
+            "name": "Ion Drive II",
+            "description": "An advanced propulsion system.",
+            "condition": 1,
+            "integrity": 1,
+            "speed": 30,
+            "requirements": {"power": 6, "crew": 8},
+        },
+        "modules": [
+            {
+                "symbol": f"MODULE_{kind}",
+                "capacity": 40,
+                "name": kind.title(),
+                "description": "A ship module.",
+                "requirements": {"crew": 0, "power": 1, "slots": 1},
+            }
+            for kind in ("CARGO_HOLD_II", "CREW_QUARTERS_I", "MINERAL_PROCESSOR_I")
+        ],
+        "mounts": [
+            {
+                "symbol": f"MOUNT_{kind}",
+                "name": kind.title(),
+                "description": "A ship mount.",
+                "strength": 10,
+                "deposits": ["IRON_ORE", "COPPER_ORE", "QUARTZ_SAND"],
+                "requirements": requirements,
+            }
+            for kind in ("SENSOR_ARRAY_I", "MINING_LASER_II", "GAS_SIPHON_I")
+        ],
+        "registration": {"name": symbol, "factionSymbol": "COSMIC", "role": "COMMAND"},
+        "cargo": {
+            "capacity": 40,
+            "units": 12,
+            "inventory": [
+                {
+                    "symbol": "IRON_ORE",
+                    "name": "Iron Ore",
+                    "description": "Raw iron.",
+                    "units": 12,
+                }
+            ],
+        },
+    }
+
+
+def system(index: int) -> dict:
+    symbol = f"X1-BM{index}"
+    return {
+        "symbol": symbol,
+        "sectorSymbol": "X1",
+        "type": ("RED_STAR", "ORANGE_STAR", "BLUE_STAR")[index % 3],
+        "x": (index * 7919) % 80000 - 40000,
+        "y": (index * 104729) % 80000 - 40000,
+        "waypoints": [
+            {
+                "symbol": f"{symbol}-W{j}",
+                "type": ("PLANET", "MOON", "ASTEROID")[j % 3],
+                "x": (j * 37) % 400 - 200,
+                "y": (j * 61) % 400 - 200,
+                "orbitals": [{"symbol": f"{symbol}-W{j}M"}] if j % 3 == 0 else [],
+            }
+            for j in range(WAYPOINTS_PER_SYSTEM)
+        ],
+        "factions": [{"symbol": "COSMIC"}] if index % 5 == 0 else [],
+    }
+
+
+def waypoint(system_symbol: str, index: int) -> dict:
+    traits = [("MARKETPLACE", "Marketplace"), ("SHIPYARD", "Shipyard")][: index % 3]
+    return {
+        "systemSymbol": system_symbol,
+        "symbol": f"{system_symbol}-W{index}",
+        "type": ("PLANET", "MOON", "ASTEROID")[index % 3],
+        "x": (index * 37) % 400 - 200,
+        "y": (index * 61) % 400 - 200,
+        "orbitals": [],
+        "traits": [
+            {"symbol": symbol, "name": name, "description": f"A {name.lower()}."}
+            for symbol, name in traits
+        ],
+        "modifiers": [],
+        "chart": {"submittedBy": "COSMIC", "submittedOn": "2024-06-01T00:00:00.000Z"},
+        "faction": {"symbol": "COSMIC"},
+        "isUnderConstruction": False,
+    }
+
+
+def agent(index: int = 0) -> dict:
+    return {
+        "accountId": "clbench0000",
+        "symbol": f"BENCH{index}",
+        "headquarters": "X1-BM1-A1",
+        "credits": 175000,
+        "startingFaction": "COSMIC",
+        "shipCount": 2,
+    }
@@ -0,0 +1,270 @@
+import itertools
+import threading
+from typing import AsyncIterator, Dict, Iterable, Iterator, List
+from spacetraders_api.async_spacetraders_api import AsyncSpaceTradersApi
+from spacetraders_api.exceptions import SpaceTradersApiException
+from spacetraders_api.response_cache import ResponseCache
+from spacetraders_api.pagination import MAX_PAGE_SIZE, aiter_pages, iter_pages
+from spacetraders_api.spacetraders_api import SpaceTradersApi
+from spacetraders_api.models import *
+
+
+class _AgentPoolBase:
+    def __init__(self, client_cls, access_tokens: Iterable[str], client_kwargs: Dict):
+        """
+        Shared bookkeeping of AgentPool and AsyncAgentPool.
+        Every agent gets its own client, so its own rate limiter, connection pool and, with
+        cache_responses=True, response cache.
+        """
+        if client_kwargs.get("response_cache") is not None:
+            # Cached /my/... responses are keyed by endpoint only, one agent would see another's
+            raise ValueError(
+                "A response_cache cannot be shared by the agents of a pool, "
+                "pass cache_responses=True for one cache per agent"
+            )
+        self._cache_responses = client_kwargs.pop("cache_responses", False)
+        self._client_cls = client_cls
+        self._client_kwargs = client_kwargs
+        self._clients: Dict[str, object] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._rotation = itertools.count()
+        for access_token in access_tokens:
+            self.add_agent(access_token)
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    @property
+    def tokens(self) -> List[str]:
+        return list(self._clients)
+
+    def add_agent(self, access_token: str):
+        """
+        Add an agent to the pool, returns its client (the existing one if the token is known)
+        """
+        with self._lock:
+            client = self._clients.get(access_token)
+            if client is None:
+                kwargs = dict(self._client_kwargs)
+                if self._cache_responses:
+                    kwargs["response_cache"] = ResponseCache()
+                client = self._client_cls(access_token, **kwargs)
+                self._clients[access_token] = client
+                self._in_flight[access_token] = 0
+            return client
+
+    def agent(self, access_token: str):
+        """
+        Client of one agent, for its private endpoints (/my/...)
+        """
+        return self._clients[access_token]
+
+    def _pick(self) -> str:
+        """
+        Token of the agent with the most spare budget: shortest rate limit wait, then fewest
+        requests in flight; ties are rotated so idle agents share the load evenly
+        """
+        if not self._clients:
+            raise SpaceTradersApiException("The agent pool has no agents")
+        with self._lock:
+            offset = next(self._rotation)
+            tokens = list(self._clients)
+            count = len(tokens)
+            best = min(
+                range(count),
+                key=lambda i: (
+                    self._clients[tokens[i]].estimate_wait(),
+                    self._in_flight[tokens[i]],
+                    (i - offset) % count,
+                ),
+            )
+            token = tokens[best]
+            self._in_flight[token] += 1
+            return token
+
+    def _done(self, token: str):
+        with self._lock:
+            self._in_flight[token] -= 1
+
+
+class AgentPool(_AgentPoolBase):
+    def __init__(self, access_tokens: Iterable[str] = (), **client_kwargs):
+        """
+        Client for several agents at once. Public reads are spread over whichever agent
+        has spare rate budget, private calls go through agent(token).
+        :param access_tokens: Tokens of the agents in the pool, more can be added later
+        :param client_kwargs: SpaceTradersApi arguments used for every agent.
+        Do not pass a rate_limiter or dispatcher here, sharing one would merge the agents' budgets.
+        A response_cache is rejected, as agents would be served each other's /my/... responses;
+        cache_responses=True gives every agent a ResponseCache of its own instead.
+        """
+        super().__init__(SpaceTradersApi, access_tokens, client_kwargs)
+
+    def close(self):
+        for client in self._clients.values():
+            client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _call(self, method: str, *args):
+        token = self._pick()
+        try:
+            return getattr(self._clients[token], method)(*args)
+        finally:
+            self._done(token)
+
+    def register_agent(self, callsign: str, faction="COSMIC") -> RegistrationResult:
+        """
+        Register a new agent and add it to the pool
+        """
+        registration = self._call("register_agent", callsign, faction, False)
+        self.add_agent(registration.token)
+        return registration
+
+    def get_status(self) -> Dict:
+        return self._call("get_status")
+
+    def get_factions(self, page: int = 1, limit: int = None) -> SearchResultPaginated:
+        return self._call("get_factions", page, limit)
+
+    def get_faction(self, faction_symbol: str) -> Faction:
+        return self._call("get_faction", faction_symbol)
+
+    def get_systems(self, page: int = 1, limit: int = None) -> SearchResultPaginated:
+        return self._call("get_systems", page, limit)
+
+    def get_system(self, system_symbol: str) -> System:
+        return self._call("get_system", system_symbol)
+
+    def get_system_waypoints(
+        self, system_symbol: str, page: int = 1, limit: int = None
+    ) -> SearchResultPaginated:
+        return self._call("get_system_waypoints", system_symbol, page, limit)
+
+    def get_waypoint(self, system_symbol: str, waypoint_symbol: str) -> SystemWaypoint:
+        return self._call("get_waypoint", system_symbol, waypoint_symbol)
+
+    def get_agents(self, page: int = 1, limit: int = None) -> SearchResultPaginated:
+        return self._call("get_agents", page, limit)
+
+    def get_public_agent(self, agent_symbol: str) -> Agent:
+        return self._call("get_public_agent", agent_symbol)
+
+    def iter_systems(self, prefetch: int = 4) -> Iterator[System]:
+        """
+        Walk every system, each prefetched page is fetched by the least busy agent
+        """
+        return iter_pages(self.get_systems, MAX_PAGE_SIZE, prefetch)
+
+    def iter_system_waypoints(
+        self, system_symbol: str, prefetch: int = 4
+    ) -> Iterator[SystemWaypoint]:
+        return iter_pages(
+            lambda page, limit: self.get_system_waypoints(system_symbol, page, limit),
+            MAX_PAGE_SIZE,
+            prefetch,
+        )
+
+    def iter_agents(self, prefetch: int = 4) -> Iterator[Agent]:
+        return iter_pages(self.get_agents, MAX_PAGE_SIZE, prefetch)
+
+    def iter_factions(self, prefetch: int = 4) -> Iterator[Faction]:
+        return iter_pages(self.get_factions, MAX_PAGE_SIZE, prefetch)
+
+    def download_systems_dump(self, path: str, chunk_size: int = 65536) -> int:
+        return self._call("download_systems_dump", path, chunk_size)
+
+
+class AsyncAgentPool(_AgentPoolBase):
+    def __init__(self, access_tokens: Iterable[str] = (), **client_kwargs):
+        """
+        asyncio twin of AgentPool, backed by AsyncSpaceTradersApi clients
+        """
+        super().__init__(AsyncSpaceTradersApi, access_tokens, client_kwargs)
+
+    async def close(self):
+        for client in self._clients.values():
+            await client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def _call(self, method: str, *args):
+        token = self._pick()
+        try:
+            return await getattr(self._clients[token], method)(*args)
+        finally:
+            self._done(token)
+
+    async def register_agent(
+        self, callsign: str, faction="COSMIC"
+    ) -> RegistrationResult:
+        registration = await self._call("register_agent", callsign, faction, False)
+        self.add_agent(registration.token)
+        return registration
+
+    async def get_status(self) -> Dict:
+        return await self._call("get_status")
+
+    async def get_factions(
+        self, page: int = 1, limit: int = None
+    ) -> SearchResultPaginated:
+        return await self._call("get_factions", page, limit)
+
+    async def get_faction(self, faction_symbol: str) -> Faction:
+        return await self._call("get_faction", faction_symbol)
+
+    async def get_systems(
+        self, page: int = 1, limit: int = None
+    ) -> SearchResultPaginated:
+        return await self._call("get_systems", page, limit)
+
+    async def get_system(self, system_symbol: str) -> System:
+        return await self._call("get_system", system_symbol)
+
+    async def get_system_waypoints(
+        self, system_symbol: str, page: int = 1, limit: int = None
+    ) -> SearchResultPaginated:
+        return await self._call("get_system_waypoints", system_symbol, page, limit)
+
+    async def get_waypoint(
+        self, system_symbol: str, waypoint_symbol: str
+    ) -> SystemWaypoint:
+        return await self._call("get_waypoint", system_symbol, waypoint_symbol)
+
+    async def get_agents(
+        self, page: int = 1, limit: int = None
+    ) -> SearchResultPaginated:
+        return await self._call("get_agents", page, limit)
+
+    async def get_public_agent(self, agent_symbol: str) -> Agent:
+        return await self._call("get_public_agent", agent_symbol)
+
+    def iter_systems(self, prefetch: int = 4) -> AsyncIterator[System]:
+        return aiter_pages(self.get_systems, MAX_PAGE_SIZE, prefetch)
+
+    def iter_system_waypoints(
+        self, system_symbol: str, prefetch: int = 4
+    ) -> AsyncIterator[SystemWaypoint]:
+        return aiter_pages(
+            lambda page, limit: self.get_system_waypoints(system_symbol, page, limit),
+            MAX_PAGE_SIZE,
+            prefetch,
+        )
+
+    def iter_agents(self, prefetch: int = 4) -> AsyncIterator[Agent]:
+        return aiter_pages(self.get_agents, MAX_PAGE_SIZE, prefetch)
+
+    def iter_factions(self, prefetch: int = 4) -> AsyncIterator[Faction]:
+        return aiter_pages(self.get_factions, MAX_PAGE_SIZE, prefetch)
+
+    async def download_systems_dump(self, path: str, chunk_size: int = 65536) -> int:
+        return await self._call("download_systems_dump", path, chunk_size)
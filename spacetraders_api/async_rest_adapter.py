@@ -0,0 +1,251 @@
+import asyncio
+import time
+import os
+import logging
+from typing import Dict
+from spacetraders_api.exceptions import SpaceTradersApiException, TransportError
+from spacetraders_api.models import Result
+from spacetraders_api.rate_limiter import RateLimiter
+from spacetraders_api.dispatcher import RequestDispatcher
+from spacetraders_api.metrics import Metrics
+from spacetraders_api.retry import CircuitBreaker, RetryPolicy
+from spacetraders_api.response_cache import ResponseCache
+from spacetraders_api.rest_adapter import RestAdapter
+from spacetraders_api.transport import AsyncHttpxTransport, Timeout
+
+
+class AsyncRestAdapter(RestAdapter):
+    def __init__(
+        self,
+        hostname: str = "api.spacetraders.io",
+        access_token: str = "",
+        ver: str = "v2",
+        ssl_verify: bool = True,
+        logger: logging.Logger = None,
+        pool_size: int = 100,
+        max_connections_per_host: int = 100,
+        timeout: Timeout = None,
+        http2: bool = False,
+        transport=None,
+        rate_limit: bool = True,
+        rate_limiter: RateLimiter = None,
+        max_rate_limit_retries: int = 3,
+        response_cache: ResponseCache = None,
+        codec=None,
+        coalesce_gets: bool = True,
+        dispatcher: RequestDispatcher = None,
+        metrics: Metrics = None,
+        scheme: str = "https",
+        retry_policy: RetryPolicy = None,
+        circuit_breaker: CircuitBreaker = None,
+        fail_fast: bool = True,
+    ):
+        """
+        asyncio twin of RestAdapter, get(), post(), etc. return coroutines.
+        Takes the same parameters as RestAdapter, the default transport is httpx.AsyncClient.
+        """
+        if transport is None:
+            transport = AsyncHttpxTransport(
+                pool_size=pool_size,
+                max_connections_per_host=max_connections_per_host,
+                ssl_verify=ssl_verify,
+                http2=http2,
+            )
+        super().__init__(
+            hostname,
+            access_token,
+            ver,
+            ssl_verify,
+            logger,
+            timeout=timeout,
+            transport=transport,
+            rate_limit=rate_limit,
+            rate_limiter=rate_limiter,
+            max_rate_limit_retries=max_rate_limit_retries,
+            response_cache=response_cache,
+            codec=codec,
+            coalesce_gets=coalesce_gets,
+            dispatcher=dispatcher,
+            metrics=metrics,
+            scheme=scheme,
+            retry_policy=retry_policy,
+            circuit_breaker=circuit_breaker,
+            fail_fast=fail_fast,
+        )
+
+    async def close(self):
+        await self._transport.aclose()
+
+    def __enter__(self):
+        raise TypeError("Use 'async with' with AsyncRestAdapter")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def _do(
+        self,
+        http_method: str,
+        endpoint: str,
+        ep_params: Dict = None,
+        data: Dict = None,
+        is_private: bool = True,
+        timeout: Timeout = None,
+    ) -> Result:
+        if http_method == "GET":
+            if self._response_cache is not None:
+                cached = self._response_cache.get(endpoint, ep_params)
+                if cached is not None:
+                    return cached
+            if self._single_flight is not None:
+                return await self._single_flight.ado(
+                    self._coalescing_key(endpoint, ep_params, is_private),
+                    lambda: self._send(
+                        http_method, endpoint, ep_params, data, is_private, timeout
+                    ),
+                )
+        return await self._send(
+            http_method, endpoint, ep_params, data, is_private, timeout
+        )
+
+    async def _send(
+        self,
+        http_method: str,
+        endpoint: str,
+        ep_params: Dict,
+        data: Dict,
+        is_private: bool,
+        timeout: Timeout,
+    ) -> Result:
+        full_url = self.url + endpoint
+        headers, body = self._encode_request(data, is_private)
+        request_info = (http_method, endpoint, ep_params)
+        metrics = self.metrics
+        if self._response_cache is not None:
+            generation = self._response_cache.generation
+
+        rate_limit_retries = 0
+        attempt = 0
+        while True:
+            if self._circuit_breaker is not None:
+                self._circuit_breaker.before_request()
+            if self._dispatcher is not None:
+                await self._dispatcher.aacquire(http_method, endpoint)
+            elif self._rate_limiter is not None:
+                delay = self._rate_limiter.reserve()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            try:
+                if self._logger.isEnabledFor(logging.DEBUG):
+                    self._logger.debug(msg=self._log_line_pre(request_info))
+
+                start = time.perf_counter() if metrics is not None else 0.0
+                response = await self._transport.request(
+                    method=http_method,
+                    url=full_url,
+                    params=ep_params,
+                    content=body,
+                    headers=headers,
+                    timeout=timeout if timeout is not None else self._timeout,
+                )
+            except TransportError as e:
+                delay = self._on_transport_error(e, attempt, request_info)
+                if delay is None:
+                    raise SpaceTradersApiException("Request failed") from e
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            if metrics is not None:
+                self._observe(request_info, response, body, time.perf_counter() - start)
+
+            retry_after = self._retry_after(response, rate_limit_retries, request_info)
+            if retry_after is not None:
+                rate_limit_retries += 1
+                if self._rate_limiter is not None:
+                    self._rate_limiter.penalize(retry_after)
+                else:
+                    await asyncio.sleep(retry_after)
+                continue
+            delay = self._transient_retry_delay(response, attempt, request_info)
+            if delay is None:
+                break
+            attempt += 1
+            await asyncio.sleep(delay)
+
+        result = self._to_result(response, request_info)
+        if self._response_cache is not None:
+            if http_method == "GET":
+                self._response_cache.put(endpoint, ep_params, result, generation)
+            else:
+                self._response_cache.invalidate_mutation(endpoint, data)
+        return result
+
+    async def fetch_data(self, url: str) -> bytes:
+        http_method = "GET"
+        attempt = 0
+        while True:
+            if self._circuit_breaker is not None:
+                self._circuit_breaker.before_request()
+            self._logger.debug(msg=f"method={http_method}, url={url}")
+            try:
+                response = await self._transport.request(
+                    method=http_method, url=url, timeout=self._timeout
+                )
+            except TransportError as e:
+                delay = self._raw_retry_delay(url, attempt, error=e)
+            else:
+                delay = self._raw_retry_delay(
+                    url, attempt, status_code=response.status_code
+                )
+                if delay is None:
+                    break
+            attempt += 1
+            await asyncio.sleep(delay)
+
+        is_success = 299 >= response.status_code >= 200
+        self._logger.debug(
+            msg=f"success={is_success}, status_code={response.status_code}, message={response.reason}"
+        )
+        if not is_success:
+            raise SpaceTradersApiException(response.reason)
+        return response.content
+
+    async def download(self, url: str, path: str, chunk_size: int = 65536) -> int:
+        tmp_path = f"{path}.part"
+        attempt = 0
+        try:
+            while True:
+                if self._circuit_breaker is not None:
+                    self._circuit_breaker.before_request()
+                self._logger.debug(msg=f"method=GET, url={url}, stream=True")
+                written = 0
+                try:
+                    async with self._transport.stream(
+                        "GET", url, timeout=self._timeout, chunk_size=chunk_size
+                    ) as response:
+                        status_code, reason = response.status_code, response.reason
+                        if 299 >= status_code >= 200:
+                            # Local disk writes are small compared to the network wait
+                            with open(tmp_path, "wb") as file:
+                                async for chunk in response.chunks:
+                                    file.write(chunk)
+                                    written += len(chunk)
+                except TransportError as e:
+                    delay = self._raw_retry_delay(url, attempt, error=e)
+                else:
+                    delay = self._raw_retry_delay(url, attempt, status_code=status_code)
+                    if delay is None:
+                        break
+                attempt += 1
+                await asyncio.sleep(delay)
+            if not 299 >= status_code >= 200:
+                raise SpaceTradersApiException(f"{status_code}: {reason}")
+            os.replace(tmp_path, path)
+        except BaseException:
+            # Never leave a partial download behind
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return written
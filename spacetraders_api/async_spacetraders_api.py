@@ -0,0 +1,464 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Dict
+from spacetraders_api.async_rest_adapter import AsyncRestAdapter
+from spacetraders_api.rate_limiter import RateLimiter
+from spacetraders_api.dispatcher import RequestDispatcher
+from spacetraders_api.metrics import Metrics
+from spacetraders_api.retry import CircuitBreaker, RetryPolicy
+from spacetraders_api.static_cache import StaticCache
+from spacetraders_api.response_cache import ResponseCache
+from spacetraders_api.decoding import Decoder
+from spacetraders_api.server_clock import ServerClock
+from spacetraders_api.pagination import MAX_PAGE_SIZE, aiter_pages
+from spacetraders_api.galaxy_dump import SYSTEMS_DUMP_ENDPOINT
+from spacetraders_api.models import *
+
+
+class AsyncSpaceTradersApi:
+    def __init__(
+        self,
+        access_token,
+        hostname: str = "api.spacetraders.io",
+        ver: str = "v2",
+        ssl_verify: bool = False,
+        logger: logging.Logger = None,
+        page_size: int = 20,
+        pool_size: int = 100,
+        max_connections_per_host: int = 100,
+        timeout=None,
+        http2: bool = False,
+        rate_limit: bool = True,
+        rate_limiter: RateLimiter = None,
+        static_cache: StaticCache = None,
+        response_cache: ResponseCache = None,
+        decode_mode: str = "validate",
+        codec=None,
+        coalesce_gets: bool = True,
+        dispatcher: RequestDispatcher = None,
+        metrics: Metrics = None,
+        scheme: str = "https",
+        transport=None,
+        retry_policy: RetryPolicy = None,
+        circuit_breaker: CircuitBreaker = None,
+        fail_fast: bool = True,
+    ):
+        """
+        asyncio twin of SpaceTradersApi, every API method is a coroutine returning the same models
+        """
+        self._rest_adapter = AsyncRestAdapter(
+            hostname,
+            access_token,
+            ver,
+            ssl_verify,
+            logger,
+            pool_size=pool_size,
+            max_connections_per_host=max_connections_per_host,
+            timeout=timeout,
+            http2=http2,
+            rate_limit=rate_limit,
+            rate_limiter=rate_limiter,
+            response_cache=response_cache,
+            codec=codec,
+            coalesce_gets=coalesce_gets,
+            dispatcher=dispatcher,
+            metrics=metrics,
+            scheme=scheme,
+            transport=transport,
+            retry_policy=retry_policy,
+            circuit_breaker=circuit_breaker,
+            fail_fast=fail_fast,
+        )
+        self._page_size = page_size
+        self._static_cache = static_cache
+        self._static_cache_checked = False
+        # Created on first use, inside the event loop that awaits it
+        self._static_cache_lock = None
+        self._decoder = Decoder(decode_mode, metrics)
+
+    async def close(self):
+        await self._rest_adapter.close()
+        if self._static_cache is not None:
+            self._static_cache.close()
+
+    @property
+    def server_clock(self) -> ServerClock:
+        """
+        Server time estimated from the Date headers of the responses seen so far
+        """
+        return self._rest_adapter.server_clock
+
+    @property
+    def metrics(self) -> Metrics:
+        """
+        Metrics passed to the constructor, None when instrumentation is off
+        """
+        return self._rest_adapter.metrics
+
+    def estimate_wait(self) -> float:
+        """
+        Seconds until the rate limiter would let a request through, 0 when not rate limiting
+        """
+        return self._rest_adapter.estimate_wait()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def _static_get(
+        self, kind: str, key: str, endpoint: str, ep_params: Dict = None, item_kind=None
+    ) -> Dict:
+        """
+        Payload of a static universe endpoint, answered from the static cache when possible.
+        Items of a fetched page are also cached one by one under item_kind, keyed by symbol.
+        SQLite is queried on a worker thread so the event loop keeps running.
+        """
+        if self._static_cache is None:
+            result = await self._rest_adapter.get(
+                endpoint=endpoint, ep_params=ep_params
+            )
+            return result.data
+        if not self._static_cache_checked:
+            if self._static_cache_lock is None:
+                self._static_cache_lock = asyncio.Lock()
+            async with self._static_cache_lock:
+                # Checked only once it succeeded, a failed check is retried by the next call
+                if not self._static_cache_checked:
+                    status = await self.get_status()
+                    await asyncio.to_thread(
+                        self._static_cache.check_reset, status["resetDate"]
+                    )
+                    self._static_cache_checked = True
+        payload = await asyncio.to_thread(self._static_cache.get, kind, key)
+        if payload is None:
+            result = await self._rest_adapter.get(
+                endpoint=endpoint, ep_params=ep_params
+            )
+            payload = result.data
+            await asyncio.to_thread(self._static_cache.put, kind, key, payload)
+            if item_kind is not None:
+                await asyncio.to_thread(
+                    self._static_cache.put_many,
+                    item_kind,
+                    {item["symbol"]: {"data": item} for item in payload["data"]},
+                )
+        return payload
+
+    async def get_status(self) -> Dict:
+        result = await self._rest_adapter.get(endpoint="/", is_private=False)
+
+        return result.data
+
+    async def register_agent(
+        self, callsign: str, faction="COSMIC", is_private=False
+    ) -> RegistrationResult:
+        result = await self._rest_adapter.post(
+            endpoint="/register",
+            data={"symbol": callsign, "faction": faction},
+            is_private=is_private,
+        )
+
+        return self._decoder.one(RegistrationResult, result.data["data"])
+
+    async def get_my_agent(self) -> Agent:
+        result = await self._rest_adapter.get(endpoint=f"/my/agent")
+
+        return self._decoder.one(Agent, result.data["data"])
+
+    async def get_factions(
+        self, page: int = 1, limit: int = None
+    ) -> SearchResultPaginated:
+        limit = limit or self._page_size
+        result = await self._rest_adapter.get(
+            endpoint="/factions", ep_params={"page": page, "limit": limit}
+        )
+
+        _result = SearchResultPaginated(
+            data=self._decoder.many(Faction, result.data["data"]),
+            meta=MetaPagnaition(**result.data["meta"]),
+        )
+
+        return _result
+
+    async def get_contracts(
+        self, page: int = 1, limit: int = None
+    ) -> SearchResultPaginated:
+        limit = limit or self._page_size
+        result = await self._rest_adapter.get(
+            endpoint="/my/contracts", ep_params={"page": page, "limit": limit}
+        )
+
+        _result = SearchResultPaginated(
+            data=self._decoder.many(Contract, result.data["data"]),
+            meta=MetaPagnaition(**result.data["meta"]),
+        )
+
+        return _result
+
+    async def get_systems(
+        self, page: int = 1, limit: int = None
+    ) -> SearchResultPaginated:
+        limit = limit or self._page_size
+        data = await self._static_get(
+            "systems",
+            f"{page}:{limit}",
+            endpoint="/systems",
+            ep_params={"page": page, "limit": limit},
+            item_kind="system",
+        )
+
+        _result = SearchResultPaginated(
+            data=self._decoder.many(System, data["data"]),
+            meta=MetaPagnaition(**data["meta"]),
+        )
+
+        return _result
+
+    async def get_system_waypoints(
+        self, system_symbol: str, page: int = 1, limit: int = None
+    ) -> SearchResultPaginated:
+        limit = limit or self._page_size
+        data = await self._static_get(
+            "waypoints",
+            f"{system_symbol}:{page}:{limit}",
+            endpoint=f"/systems/{system_symbol}/waypoints",
+            ep_params={"page": page, "limit": limit},
+            item_kind="waypoint",
+        )
+
+        _result = SearchResultPaginated(
+            data=self._decoder.many(SystemWaypoint, data["data"]),
+            meta=MetaPagnaition(**data["meta"]),
+        )
+
+        return _result
+
+    async def accept_contract(self, contract_id: str) -> AcceptContractResult:
+        result = await self._rest_adapter.post(
+            endpoint=f"/my/contracts/{contract_id}/accept"
+        )
+
+        return self._decoder.one(AcceptContractResult, result.data["data"])
+
+    async def find_shipyard(
+        self, system_symbol: str, limit: int = 20, page: int = 1
+    ) -> SearchResultPaginated:
+        result = await self._rest_adapter.get(
+            endpoint=f"/systems/{system_symbol}/waypoints",
+            ep_params={"traits": "SHIPYARD", "limit": limit},
+        )
+
+        _result = SearchResultPaginated(
+            data=self._decoder.many(SystemWaypoint, result.data["data"]),
+            meta=MetaPagnaition(**result.data["meta"]),
+        )
+
+        return _result
+
+    async def get_available_ships_at_shipyard(
+        self, system_symbol: str, shipyard_symbol: str
+    ) -> ShipyardShip:
+        # TODO: For some reason the endpoint is not working as expected and returning only 1 ship, not even in a list.
+        result = await self._rest_adapter.get(
+            endpoint=f"/systems/{system_symbol}/waypoints/{shipyard_symbol}/shipyard",
+        )
+        return self._decoder.one(ShipyardShip, result.data["data"])
+
+    async def buy_ship(self, ship_type: str, waypoint_symbol: str):
+        result = await self._rest_adapter.post(
+            endpoint="/my/ships",
+            data={"shipType": ship_type, "waypointSymbol": waypoint_symbol},
+        )
+
+        return result.data["data"]
+
+    # 'https://api.spacetraders.io/v2/systems/:systemSymbol/waypoints/:waypointSymbol'
+    async def get_starting_waypoint(self, system_symbol: str, waypoint_symbol: str):
+        result = await self._rest_adapter.get(
+            endpoint=f"/systems/{system_symbol}/waypoints/{waypoint_symbol}"
+        )
+
+        return result.data["data"]
+
+    async def get_my_ships(self) -> SearchResultPaginated:
+        result = await self._rest_adapter.get(endpoint="/my/ships")
+
+        _result = SearchResultPaginated(
+            data=self._decoder.many(Ship, result.data["data"]),
+            meta=MetaPagnaition(**result.data["meta"]),
+        )
+
+        return _result
+
+    async def get_ship(self, ship_symbol: str) -> Ship:
+        result = await self._rest_adapter.get(endpoint=f"/my/ships/{ship_symbol}")
+
+        return self._decoder.one(Ship, result.data["data"])
+
+    async def navigate_ship_to(
+        self, ship_symbol: str, waypoint_symbol: str
+    ) -> ShipNavigationResponse:
+        result = await self._rest_adapter.post(
+            endpoint=f"/my/ships/{ship_symbol}/navigate",
+            data={"waypointSymbol": waypoint_symbol},
+        )
+
+        return self._decoder.one(ShipNavigationResponse, result.data["data"])
+
+    async def set_ship_flight_mode(
+        self, ship_symbol: str, flight_mode: str
+    ) -> ChangeShipFlightModeResponse:
+        result = await self._rest_adapter.patch(
+            endpoint=f"/my/ships/{ship_symbol}/nav",
+            data={"flightMode": flight_mode},
+        )
+
+        return self._decoder.one(ChangeShipFlightModeResponse, result.data["data"])
+
+    async def orbit_ship(self, ship_symbol: str) -> ChangeShipStatusResponse:
+        result = await self._rest_adapter.post(
+            endpoint=f"/my/ships/{ship_symbol}/orbit",
+        )
+
+        return self._decoder.one(ChangeShipStatusResponse, result.data["data"])
+
+    async def dock_ship(self, ship_symbol: str) -> ChangeShipStatusResponse:
+        result = await self._rest_adapter.post(
+            endpoint=f"/my/ships/{ship_symbol}/dock",
+        )
+
+        return self._decoder.one(ChangeShipStatusResponse, result.data["data"])
+
+    async def refuel_ship(
+        self, ship_symbol: str, units: int = None, from_cargo: bool = False
+    ) -> RefuelShipResponse:
+        data = {"fromCargo": from_cargo}
+        if units is not None:
+            data["units"] = units
+        result = await self._rest_adapter.post(
+            endpoint=f"/my/ships/{ship_symbol}/refuel",
+            data=data,
+        )
+
+        return self._decoder.one(RefuelShipResponse, result.data["data"])
+
+    async def get_agents(
+        self, page: int = 1, limit: int = None
+    ) -> SearchResultPaginated:
+        limit = limit or self._page_size
+        result = await self._rest_adapter.get(
+            endpoint="/agents", ep_params={"page": page, "limit": limit}
+        )
+
+        _result = SearchResultPaginated(
+            data=self._decoder.many(Agent, result.data["data"]),
+            meta=MetaPagnaition(**result.data["meta"]),
+        )
+
+        return _result
+
+    async def get_public_agent(self, agent_symbol: str) -> Agent:
+        result = await self._rest_adapter.get(endpoint=f"/agents/{agent_symbol}")
+
+        return self._decoder.one(Agent, result.data["data"])
+
+    async def get_contract(self, contract_id: str) -> Contract:
+        result = await self._rest_adapter.get(endpoint=f"/my/contracts/{contract_id}")
+
+        return self._decoder.one(Contract, result.data["data"])
+
+    async def deliver_contract(
+        self, contract_id: str, ship_symbol: str, trade_symbol: str, units: int
+    ) -> DeliverCargoToContractResponse:
+        result = await self._rest_adapter.post(
+            endpoint=f"/my/contracts/{contract_id}/deliver",
+            data={
+                "shipSymbol": ship_symbol,
+                "tradeSymbol": trade_symbol,
+                "units": units,
+            },
+        )
+
+        return self._decoder.one(DeliverCargoToContractResponse, result.data["data"])
+
+    async def fulfill_contract(self, contract_id: str) -> AcceptContractResult:
+        result = await self._rest_adapter.post(
+            endpoint=f"/my/contracts/{contract_id}/fulfill",
+        )
+
+        return self._decoder.one(AcceptContractResult, result.data["data"])
+
+    async def get_faction(self, faction_symbol: str) -> Faction:
+        data = await self._static_get(
+            "faction", faction_symbol, endpoint=f"/factions/{faction_symbol}"
+        )
+
+        return self._decoder.one(Faction, data["data"])
+
+    async def get_system(self, system_symbol: str) -> System:
+        data = await self._static_get(
+            "system", system_symbol, endpoint=f"/systems/{system_symbol}"
+        )
+
+        return self._decoder.one(System, data["data"])
+
+    async def get_waypoint(
+        self, system_symbol: str, waypoint_symbol: str
+    ) -> SystemWaypoint:
+        data = await self._static_get(
+            "waypoint",
+            waypoint_symbol,
+            endpoint=f"/systems/{system_symbol}/waypoints/{waypoint_symbol}",
+        )
+
+        return self._decoder.one(SystemWaypoint, data["data"])
+
+    async def get_market(self, system_symbol: str, waypoint_symbol: str) -> Market:
+        """
+        Market of a waypoint, with prices and recent transactions if one of your ships is there
+        """
+        result = await self._rest_adapter.get(
+            endpoint=f"/systems/{system_symbol}/waypoints/{waypoint_symbol}/market"
+        )
+
+        return self._decoder.one(Market, result.data["data"])
+
+    async def get_marketplace_transactions(
+        self, system_symbol: str, waypoint_symbol: str
+    ) -> List[MarketTransaction]:
+        """
+        Recent transactions of a market, the API only serves them as part of the market
+        """
+        market = await self.get_market(system_symbol, waypoint_symbol)
+        # A plain dict under decode_mode("raw")
+        if isinstance(market, dict):
+            return market.get("transactions") or []
+        return market.transactions or []
+
+    def iter_systems(self, prefetch: int = 4) -> AsyncIterator[System]:
+        return aiter_pages(self.get_systems, MAX_PAGE_SIZE, prefetch)
+
+    def iter_system_waypoints(
+        self, system_symbol: str, prefetch: int = 4
+    ) -> AsyncIterator[SystemWaypoint]:
+        return aiter_pages(
+            lambda page, limit: self.get_system_waypoints(system_symbol, page, limit),
+            MAX_PAGE_SIZE,
+            prefetch,
+        )
+
+    def iter_agents(self, prefetch: int = 4) -> AsyncIterator[Agent]:
+        return aiter_pages(self.get_agents, MAX_PAGE_SIZE, prefetch)
+
+    def iter_factions(self, prefetch: int = 4) -> AsyncIterator[Faction]:
+        return aiter_pages(self.get_factions, MAX_PAGE_SIZE, prefetch)
+
+    def iter_contracts(self, prefetch: int = 4) -> AsyncIterator[Contract]:
+        return aiter_pages(self.get_contracts, MAX_PAGE_SIZE, prefetch)
+
+    async def download_systems_dump(self, path: str, chunk_size: int = 65536) -> int:
+        return await self._rest_adapter.download(
+            self._rest_adapter.url + SYSTEMS_DUMP_ENDPOINT, path, chunk_size
+        )
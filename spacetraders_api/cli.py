@@ -0,0 +1,437 @@
+"""
+Command line client for the SpaceTraders API.
+
+    spacetraders agent
+    spacetraders ships
+    spacetraders navigate MY-SHIP-1 X1-RR47-A1
+    spacetraders daemon start
+
+Commands go through the local daemon when it is running, so the connection pool, rate limiter
+and caches stay warm between runs; otherwise the client is imported and called in-process.
+Only the standard library is imported until one of those two paths needs more.
+"""
+
+import argparse
+import json
+import os
+import socket
+import stat
+import sys
+import time
+
+# command: (SpaceTradersApi method, positional arguments, integer --options)
+# A "waypoint" argument also passes its system, as the API wants both
+COMMANDS = {
+    "status": ("get_status", (), ()),
+    "agent": ("get_my_agent", (), ()),
+    "agents": ("get_agents", (), ("page",)),
+    "public-agent": ("get_public_agent", ("agent_symbol",), ()),
+    "ships": ("get_my_ships", (), ()),
+    "contracts": ("get_contracts", (), ("page",)),
+    "contract": ("get_contract", ("contract_id",), ()),
+    "accept": ("accept_contract", ("contract_id",), ()),
+    "fulfill": ("fulfill_contract", ("contract_id",), ()),
+    "factions": ("get_factions", (), ("page",)),
+    "faction": ("get_faction", ("faction_symbol",), ()),
+    "systems": ("get_systems", (), ("page",)),
+    "system": ("get_system", ("system_symbol",), ()),
+    "waypoints": ("get_system_waypoints", ("system_symbol",), ("page",)),
+    "waypoint": ("get_waypoint", ("waypoint",), ()),
+    "market": ("get_market", ("waypoint",), ()),
+    "shipyards": ("find_shipyard", ("system_symbol",), ("page",)),
+    "orbit": ("orbit_ship", ("ship_symbol",), ()),
+    "dock": ("dock_ship", ("ship_symbol",), ()),
+    "navigate": ("navigate_ship_to", ("ship_symbol", "waypoint_symbol"), ()),
+    "flight-mode": ("set_ship_flight_mode", ("ship_symbol", "flight_mode"), ()),
+    "refuel": ("refuel_ship", ("ship_symbol",), ("units",)),
+}
+
+TOKEN_FILE = "secrets"
+_SHUTDOWN = "daemon-shutdown"
+_PING = "daemon-ping"
+# Seconds to wait for the daemon to answer a command, long enough for a rate limited queue
+COMMAND_TIMEOUT = 120.0
+_CONNECT_TIMEOUT = 1.0
+
+
+def socket_path() -> str:
+    """
+    $SPACETRADERS_SOCKET, or a socket in a private per-user directory under $XDG_RUNTIME_DIR or /tmp
+    """
+    path = os.environ.get("SPACETRADERS_SOCKET")
+    if path:
+        return path
+    base = os.environ.get("XDG_RUNTIME_DIR") or "/tmp"
+    return os.path.join(base, f"spacetraders-{os.getuid()}", "daemon.sock")
+
+
+def _private_directory(path: str) -> bool:
+    """
+    Whether the directory of `path` belongs to us and nobody else can enter it
+    """
+    try:
+        info = os.lstat(os.path.dirname(path) or ".")
+    except FileNotFoundError:
+        return False
+    return (
+        stat.S_ISDIR(info.st_mode)
+        and info.st_uid == os.getuid()
+        and not info.st_mode & 0o077
+    )
+
+
+def _trusted_socket(path: str) -> bool:
+    """
+    Whether `path` is a socket created by our own user, so the token is sent to our daemon
+    and not to whoever bound the path first
+    """
+    try:
+        info = os.lstat(path)
+    except FileNotFoundError:
+        return False
+    return stat.S_ISSOCK(info.st_mode) and info.st_uid == os.getuid()
+
+
+def read_token(token: str = None) -> str:
+    """
+    --token, then $SPACETRADERS_TOKEN, then the `secrets` file in the working directory
+    """
+    token = token or os.environ.get("SPACETRADERS_TOKEN")
+    if token:
+        return token.strip()
+    try:
+        with open(TOKEN_FILE) as file:
+            return file.read().strip()
+    except FileNotFoundError:
+        return ""
+
+
+def call_arguments(command: str, arguments: dict) -> dict:
+    """
+    Keyword arguments of the API method behind `command`
+    """
+    _, names, options = COMMANDS[command]
+    kwargs = {}
+    for name in names:
+        if name == "waypoint":
+            kwargs["system_symbol"] = arguments[name].rsplit("-", 1)[0]
+            kwargs["waypoint_symbol"] = arguments[name]
+        else:
+            kwargs[name] = arguments[name]
+    for name in options:
+        if arguments.get(name) is not None:
+            kwargs[name] = arguments[name]
+    return kwargs
+
+
+def to_json(value):
+    """
+    JSON-compatible copy of an API result (models, lists of models, dicts)
+    """
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    if isinstance(value, dict):
+        return {key: to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(item) for item in value]
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def _error(e) -> dict:
+    return {
+        "message": str(e),
+        "status_code": getattr(e, "status_code", None),
+        "code": getattr(e, "code", None),
+        "data": getattr(e, "data", None),
+    }
+
+
+def execute(api, command: str, arguments: dict):
+    method = getattr(api, COMMANDS[command][0])
+    return to_json(method(**call_arguments(command, arguments)))
+
+
+def _new_api(token: str, daemon: bool):
+    from spacetraders_api.spacetraders_api import SpaceTradersApi
+
+    kwargs = {"decode_mode": "raw"}
+    # e.g. SPACETRADERS_HOSTNAME=127.0.0.1:8080 SPACETRADERS_SCHEME=http for the mock server
+    if os.environ.get("SPACETRADERS_HOSTNAME"):
+        kwargs["hostname"] = os.environ["SPACETRADERS_HOSTNAME"]
+    if os.environ.get("SPACETRADERS_SCHEME"):
+        kwargs["scheme"] = os.environ["SPACETRADERS_SCHEME"]
+    if daemon:
+        from spacetraders_api.response_cache import ResponseCache
+
+        kwargs["response_cache"] = ResponseCache()
+    return SpaceTradersApi(token, **kwargs)
+
+
+def run_local(token: str, command: str, arguments: dict) -> dict:
+    from spacetraders_api.exceptions import SpaceTradersApiException
+
+    with _new_api(token, daemon=False) as api:
+        try:
+            return {"ok": True, "data": execute(api, command, arguments)}
+        except SpaceTradersApiException as e:
+            return {"ok": False, "error": _error(e)}
+
+
+def _send(request: dict, timeout: float = COMMAND_TIMEOUT):
+    """
+    Send one request to the daemon
+    :return: None if no daemon could be reached, so the request was never sent and may be run
+    locally; otherwise the daemon's response, or an error response when it failed to answer
+    (the request may have run, so it must not be repeated)
+    """
+    path = socket_path()
+    if not os.path.exists(path):
+        return None
+    if not _trusted_socket(path):
+        print(f"warning: ignoring {path}, it is not our own socket", file=sys.stderr)
+        return None
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    with client:
+        client.settimeout(_CONNECT_TIMEOUT)
+        try:
+            client.connect(path)
+        except (FileNotFoundError, ConnectionError, socket.timeout):
+            # No daemon, a stale socket file, or a daemon that is shutting down
+            return None
+        try:
+            client.sendall(json.dumps(request).encode() + b"\n")
+        except (ConnectionError, socket.timeout):
+            # Closed (e.g. shutting down) before reading anything, so nothing ran
+            return None
+        client.settimeout(timeout)
+        try:
+            with client.makefile("rb") as stream:
+                line = stream.readline()
+        except socket.timeout:
+            return _failed(f"the daemon on {path} did not answer within {timeout}s")
+        except OSError as e:
+            return _failed(f"lost the daemon on {path}: {e}")
+    if not line:
+        return _failed(f"the daemon on {path} closed the connection without answering")
+    return json.loads(line)
+
+
+def _failed(message: str) -> dict:
+    return {
+        "ok": False,
+        "error": {"message": f"{message}; the command may or may not have run"},
+    }
+
+
+def run_daemon(idle_timeout: float = None):
+    """
+    Serve commands on the Unix socket until stopped, one warm client per token.
+    Each connection carries one JSON request line and gets one JSON response line back.
+    :param idle_timeout: (optional) Exit after this many seconds without a request
+    """
+    import socketserver
+    import threading
+
+    from spacetraders_api.exceptions import SpaceTradersApiException
+
+    apis = {}
+    apis_lock = threading.Lock()
+    last_request = [time.monotonic()]
+
+    def api_for(token: str):
+        with apis_lock:
+            api = apis.get(token)
+            if api is None:
+                api = apis[token] = _new_api(token, daemon=True)
+            return api
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            last_request[0] = time.monotonic()
+            line = self.rfile.readline()
+            if not line:
+                return
+            request = json.loads(line)
+            command = request.get("command")
+            if command == _SHUTDOWN:
+                response = {"ok": True, "data": "stopping"}
+                threading.Thread(target=server.shutdown, daemon=True).start()
+            elif command == _PING:
+                response = {
+                    "ok": True,
+                    "data": {"pid": os.getpid(), "tokens": len(apis)},
+                }
+            elif command not in COMMANDS:
+                response = {"ok": False, "error": {"message": f"Unknown {command!r}"}}
+            else:
+                try:
+                    api = api_for(request["token"])
+                    data = execute(api, command, request.get("arguments", {}))
+                    response = {"ok": True, "data": data}
+                except SpaceTradersApiException as e:
+                    response = {"ok": False, "error": _error(e)}
+                except Exception as e:
+                    response = {"ok": False, "error": {"message": repr(e)}}
+            try:
+                encoded = json.dumps(response).encode()
+            except (TypeError, ValueError) as e:
+                encoded = json.dumps(
+                    {"ok": False, "error": {"message": f"Unserializable result: {e!r}"}}
+                ).encode()
+            self.wfile.write(encoded + b"\n")
+
+    path = socket_path()
+    # The daemon holds access tokens, only our user may talk to it
+    os.makedirs(os.path.dirname(path) or ".", mode=0o700, exist_ok=True)
+    if not _private_directory(path):
+        raise SystemExit(
+            f"{os.path.dirname(path)} must be a directory of ours with mode 0700"
+        )
+    if os.path.exists(path):
+        if _send({"command": _PING}, timeout=1) is not None:
+            # Something accepts connections there, even if it did not answer
+            raise SystemExit(f"A daemon is already listening on {path}")
+        os.unlink(path)
+    # Created 0600 from the start, there is no window in which others can connect
+    umask = os.umask(0o177)
+    try:
+        server = socketserver.ThreadingUnixStreamServer(path, Handler)
+    finally:
+        os.umask(umask)
+    server.daemon_threads = True
+
+    if idle_timeout:
+
+        def watch_idle():
+            while time.monotonic() - last_request[0] < idle_timeout:
+                time.sleep(min(idle_timeout, 5.0))
+            server.shutdown()
+
+        threading.Thread(target=watch_idle, daemon=True).start()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+        for api in apis.values():
+            api.close()
+
+
+def start_daemon(idle_timeout: float = None, wait: float = 5.0) -> bool:
+    """
+    Start the daemon in the background and wait until it answers
+    """
+    import subprocess
+
+    command = [sys.executable, "-m", "spacetraders_api.cli", "daemon", "run"]
+    if idle_timeout:
+        command += ["--idle-timeout", str(idle_timeout)]
+    subprocess.Popen(
+        command,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        running = _send({"command": _PING}, timeout=1)
+        if running is not None and running["ok"]:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def _print(data, as_json: bool):
+    if as_json or not sys.stdout.isatty():
+        json.dump(data, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return
+    from rich.console import Console
+
+    Console().print_json(data=data)
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="spacetraders", description=__doc__.strip().splitlines()[0]
+    )
+    parser.add_argument("--token", help="access token, see read_token()")
+    parser.add_argument("--json", action="store_true", help="plain JSON output")
+    parser.add_argument(
+        "--no-daemon", action="store_true", help="never use the running daemon"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    for command, (method, names, options) in COMMANDS.items():
+        sub = commands.add_parser(command, help=method)
+        for name in names:
+            sub.add_argument(name)
+        for name in options:
+            sub.add_argument(f"--{name}", type=int)
+    daemon = commands.add_parser("daemon", help="manage the background daemon")
+    daemon.add_argument("action", choices=("start", "stop", "status", "run"))
+    daemon.add_argument(
+        "--idle-timeout", type=float, help="exit after this many idle seconds"
+    )
+    return parser
+
+
+def _daemon_command(args) -> int:
+    if args.action == "run":
+        run_daemon(args.idle_timeout)
+        return 0
+    running = _send({"command": _PING}, timeout=1)
+    if running is not None and not running["ok"]:
+        print(f"error: {running['error']['message']}", file=sys.stderr)
+        return 1
+    if args.action == "status":
+        print(f"running, pid {running['data']['pid']}" if running else "not running")
+        return 0 if running else 1
+    if args.action == "stop":
+        if running:
+            _send({"command": _SHUTDOWN}, timeout=5)
+        return 0
+    if running:
+        print(f"already running, pid {running['data']['pid']}")
+        return 0
+    if not start_daemon(args.idle_timeout):
+        print(f"daemon did not come up on {socket_path()}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main(argv=None) -> int:
+    args = _parser().parse_args(argv)
+    if args.command == "daemon":
+        return _daemon_command(args)
+    token = read_token(args.token)
+    arguments = {
+        key: value
+        for key, value in vars(args).items()
+        if key not in ("token", "json", "no_daemon", "command")
+    }
+    response = None
+    if not args.no_daemon:
+        response = _send(
+            {"command": args.command, "token": token, "arguments": arguments}
+        )
+    if response is None:
+        # Only when the daemon never got the request, a mutation must not run twice
+        response = run_local(token, args.command, arguments)
+    if not response["ok"]:
+        error = response["error"]
+        print(f"error: {error['message']}", file=sys.stderr)
+        return 1
+    try:
+        _print(response["data"], args.json)
+    except BrokenPipeError:
+        # Output piped into e.g. head, which stopped reading; keep the exit flush quiet
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+import json
+from typing import Any
+
+
+class JsonCodec:
+    """
+    Standard library JSON, always available
+    """
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+        self.dumps = orjson.dumps
+        self.loads = orjson.loads
+
+
+class MsgspecCodec:
+    name = "msgspec"
+
+    def __init__(self):
+        import msgspec
+
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+        self.dumps = self._encoder.encode
+        self.loads = self._decoder.decode
+
+
+def default_codec():
+    """
+    The fastest installed codec: orjson, then msgspec, then the standard library
+    """
+    for codec_cls in (OrjsonCodec, MsgspecCodec):
+        try:
+            return codec_cls()
+        except ImportError:
+            pass
+    return JsonCodec()
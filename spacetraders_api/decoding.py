@@ -0,0 +1,218 @@
+import contextvars
+import datetime
+import time
+import typing
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Dict, List, Type
+
+from pydantic import BaseModel, TypeAdapter
+
+# validate: full pydantic validation (default)
+# construct: build models without validation, trusting the server; nested models are built,
+#            defaults filled in and timestamps parsed, but nothing is checked or coerced
+# lazy: return a proxy that validates on first attribute access
+# raw: return the decoded JSON dicts untouched
+DECODE_MODES = ("validate", "construct", "lazy", "raw")
+
+_mode_override = contextvars.ContextVar("spacetraders_decode_mode", default=None)
+
+
+@contextmanager
+def decode_mode(mode: str):
+    """
+    Override the decode mode of every client for the calls made inside the block
+    (per thread / per asyncio task)
+    """
+    if mode not in DECODE_MODES:
+        raise ValueError(f"Unknown decode mode {mode!r}, use one of {DECODE_MODES}")
+    token = _mode_override.set(mode)
+    try:
+        yield
+    finally:
+        _mode_override.reset(token)
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+# How construct() converts a field, beyond passing the value through
+_MODEL = 1
+_MODELS = 2
+_DATETIME = 3
+
+
+def _field_kind(annotation):
+    """
+    (conversion, nested model) of a field annotation, looking through Optional
+    """
+    if typing.get_origin(annotation) is typing.Union:
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            annotation = args[0]
+    if annotation is datetime.datetime:
+        return _DATETIME, None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _MODEL, annotation
+    if typing.get_origin(annotation) in (list, List):
+        args = typing.get_args(annotation)
+        if args and isinstance(args[0], type) and issubclass(args[0], BaseModel):
+            return _MODELS, args[0]
+    return None, None
+
+
+@lru_cache(maxsize=None)
+def _construct_plan(model: Type[BaseModel]) -> tuple:
+    """
+    (fields passed through, (name, conversion, nested model) of converted fields,
+    (name, FieldInfo) of fields with a default)
+    """
+    passed, converted, optional = [], [], []
+    for name, field in model.model_fields.items():
+        kind, submodel = _field_kind(field.annotation)
+        if kind is None:
+            passed.append(name)
+        else:
+            converted.append((name, kind, submodel))
+        if not field.is_required():
+            optional.append((name, field))
+    return tuple(passed), tuple(converted), tuple(optional)
+
+
+def _parse_datetime(value):
+    if isinstance(value, str):
+        # fromisoformat only learned the Z suffix in 3.11
+        return datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return value
+
+
+_set_fields_set = BaseModel.__pydantic_fields_set__.__set__
+_set_extra = BaseModel.__pydantic_extra__.__set__
+_set_private = BaseModel.__pydantic_private__.__set__
+
+
+def construct(model: Type[BaseModel], data: Dict[str, Any]) -> BaseModel:
+    """
+    Recursively build a model like model_construct(): nested models are built, missing
+    fields get their defaults and timestamps are parsed, but values are otherwise trusted.
+    Keys that are not fields are dropped, as validation would.
+    """
+    passed, converted, optional = _construct_plan(model)
+    values = {name: data[name] for name in passed if name in data}
+    for name, kind, submodel in converted:
+        if name not in data:
+            continue
+        value = data[name]
+        if value is not None:
+            if kind == _MODEL:
+                value = construct(submodel, value)
+            elif kind == _MODELS:
+                value = [construct(submodel, item) for item in value]
+            else:
+                value = _parse_datetime(value)
+        values[name] = value
+    fields_set = set(values)
+    for name, field in optional:
+        if name not in values:
+            values[name] = field.get_default(call_default_factory=True)
+    # The end state of model_construct() for models without extra or private attributes
+    instance = model.__new__(model)
+    object.__setattr__(instance, "__dict__", values)
+    _set_fields_set(instance, fields_set)
+    _set_extra(instance, None)
+    _set_private(instance, None)
+    return instance
+
+
+class LazyModel:
+    """
+    Stand-in for a model that only runs pydantic validation when a field is first read
+    """
+
+    __slots__ = ("_model", "_data", "_instance")
+
+    def __init__(self, model: Type[BaseModel], data: Dict[str, Any]):
+        object.__setattr__(self, "_model", model)
+        object.__setattr__(self, "_data", data)
+        object.__setattr__(self, "_instance", None)
+
+    def validated(self) -> BaseModel:
+        instance = self._instance
+        if instance is None:
+            instance = self._model.model_validate(self._data)
+            object.__setattr__(self, "_instance", instance)
+            object.__setattr__(self, "_data", None)
+        return instance
+
+    def __getattr__(self, name: str):
+        return getattr(self.validated(), name)
+
+    def __setattr__(self, name: str, value):
+        setattr(self.validated(), name, value)
+
+    def __eq__(self, other):
+        if isinstance(other, LazyModel):
+            other = other.validated()
+        return self.validated() == other
+
+    def __repr__(self) -> str:
+        if self._instance is None:
+            return f"LazyModel({self._model.__name__}, unvalidated)"
+        return repr(self._instance)
+
+
+class Decoder:
+    def __init__(self, mode: str = "validate", metrics=None):
+        """
+        Turns response payloads into models according to a decode mode
+        :param mode: One of DECODE_MODES, can be overridden per call with decode_mode()
+        :param metrics: (optional) Metrics recording the time spent per model
+        """
+        if mode not in DECODE_MODES:
+            raise ValueError(f"Unknown decode mode {mode!r}, use one of {DECODE_MODES}")
+        self.mode = mode
+        self.metrics = metrics
+
+    def one(self, model: Type[BaseModel], data: Dict[str, Any]):
+        if self.metrics is None:
+            return self._one(model, data)
+        start = time.perf_counter()
+        try:
+            return self._one(model, data)
+        finally:
+            self.metrics.observe_decode(
+                "model", model.__name__, time.perf_counter() - start
+            )
+
+    def many(self, model: Type[BaseModel], items: List[Dict[str, Any]]) -> list:
+        if self.metrics is None:
+            return self._many(model, items)
+        start = time.perf_counter()
+        try:
+            return self._many(model, items)
+        finally:
+            self.metrics.observe_decode(
+                "model", model.__name__, time.perf_counter() - start
+            )
+
+    def _one(self, model: Type[BaseModel], data: Dict[str, Any]):
+        mode = _mode_override.get() or self.mode
+        if mode == "validate":
+            return model.model_validate(data)
+        if mode == "construct":
+            return construct(model, data)
+        if mode == "lazy":
+            return LazyModel(model, data)
+        return data
+
+    def _many(self, model: Type[BaseModel], items: List[Dict[str, Any]]) -> list:
+        mode = _mode_override.get() or self.mode
+        if mode == "validate":
+            return _list_adapter(model).validate_python(items)
+        if mode == "construct":
+            return [construct(model, item) for item in items]
+        if mode == "lazy":
+            return [LazyModel(model, item) for item in items]
+        return items
@@ -0,0 +1,286 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Hashable, Optional, Tuple
+
+from spacetraders_api.exceptions import RequestCancelled
+from spacetraders_api.rate_limiter import RateLimiter
+
+# Priority classes, lower is served first
+MUTATION = 0
+SHIP = 1
+BULK = 2
+PRIORITY_NAMES = {MUTATION: "mutation", SHIP: "ship", BULK: "bulk"}
+
+_override = contextvars.ContextVar("spacetraders_request_priority", default=None)
+
+
+@contextmanager
+def request_priority(
+    priority: int = None, key: Hashable = None, deadline: float = None
+):
+    """
+    Override how the requests made inside the block are queued (per thread / per asyncio task)
+    :param priority: (optional) MUTATION, SHIP or BULK, instead of the class derived from the request
+    :param key: (optional) Fairness key, e.g. a ship symbol, instead of the one derived from the endpoint
+    :param deadline: (optional) Seconds the request may wait for a slot before RequestCancelled is raised
+    """
+    token = _override.set((priority, key, deadline))
+    try:
+        yield
+    finally:
+        _override.reset(token)
+
+
+def classify(http_method: str, endpoint: str):
+    """
+    Default (priority, fairness key) of a request: mutations first, then polling of the
+    agent's own ships and account, then everything else (universe scans)
+    """
+    parts = endpoint.split("/")
+    ship = parts[3] if len(parts) > 3 and parts[1:3] == ["my", "ships"] else None
+    if http_method != "GET":
+        priority = MUTATION
+    elif parts[1:2] == ["my"]:
+        priority = SHIP
+    else:
+        priority = BULK
+    return priority, ship or endpoint
+
+
+class _Ticket:
+    __slots__ = ("priority", "key", "deadline", "enqueued", "state", "wake", "loop")
+
+    def __init__(self, priority: int, key: Hashable, deadline: Optional[float]):
+        self.priority = priority
+        self.key = key
+        self.deadline = deadline
+        self.enqueued = time.monotonic()
+        self.state = "queued"  # queued, granted, expired, cancelled
+        self.wake = None
+        self.loop = None
+
+    def notify(self):
+        if self.loop is None:
+            self.wake.set()
+        else:
+            self.loop.call_soon_threadsafe(self.wake.set)
+
+
+class RequestDispatcher:
+    def __init__(
+        self,
+        rate_limiter: RateLimiter = None,
+        window: int = 1024,
+        access_token: str = "",
+    ):
+        """
+        Hands out rate limiter slots in priority order instead of first come first served.
+        Within a priority class keys (ship symbols) take turns, so one busy ship cannot starve the others.
+        :param rate_limiter: (optional) Limiter whose slots are dispatched, by default the one shared
+        by every client with access_token
+        :param window: Number of recent wait times kept per class for the percentiles in stats()
+        :param access_token: Agent token whose shared limiter is used when rate_limiter is not given
+        """
+        self.rate_limiter = rate_limiter or RateLimiter.for_token(access_token)
+        self._lock = threading.Lock()
+        self._heap = []
+        self._counter = itertools.count()
+        # Start-time fair queueing: a key's next ticket is served one round after its previous one
+        self._rounds: Dict[Hashable, int] = {}
+        self._current_round = [0] * len(PRIORITY_NAMES)
+        self._queued = [0] * len(PRIORITY_NAMES)
+        self._granted = [0] * len(PRIORITY_NAMES)
+        self._expired = [0] * len(PRIORITY_NAMES)
+        self._cancelled = [0] * len(PRIORITY_NAMES)
+        self._waits = [deque(maxlen=window) for _ in PRIORITY_NAMES]
+
+    def _enqueue(self, http_method: str, endpoint: str) -> _Ticket:
+        priority, key = classify(http_method, endpoint)
+        deadline = None
+        override = _override.get()
+        if override is not None:
+            priority = priority if override[0] is None else override[0]
+            key = key if override[1] is None else override[1]
+            if override[2] is not None:
+                deadline = time.monotonic() + override[2]
+        ticket = _Ticket(priority, key, deadline)
+        with self._lock:
+            round_key = (priority, key)
+            start = max(self._rounds.get(round_key, 0), self._current_round[priority])
+            self._rounds[round_key] = start + 1
+            heapq.heappush(self._heap, (priority, start, next(self._counter), ticket))
+            self._queued[priority] += 1
+        return ticket
+
+    def _head(self) -> Optional[_Ticket]:
+        # Called with the lock held, drops tickets that gave up
+        while self._heap:
+            ticket = self._heap[0][3]
+            if ticket.state == "queued":
+                return ticket
+            heapq.heappop(self._heap)
+        return None
+
+    def _try_grant(self, ticket: _Ticket) -> Tuple[bool, float]:
+        """
+        Grant the ticket if it is at the head of the queue and a slot is free.
+        :return: (granted, seconds to wait), before sending when granted, else before checking again
+        """
+        with self._lock:
+            if ticket.state != "queued":
+                raise RequestCancelled(
+                    f"Request {ticket.state} before it was sent",
+                    data={"key": ticket.key},
+                )
+            now = time.monotonic()
+            remaining = (
+                float("inf") if ticket.deadline is None else ticket.deadline - now
+            )
+            if remaining <= 0:
+                self._drop(ticket, "expired")
+                raise RequestCancelled(
+                    "Deadline passed while waiting for a rate limit slot",
+                    data={"key": ticket.key},
+                )
+            if self._head() is not ticket:
+                return False, remaining
+            wait = self.rate_limiter.estimate_wait()
+            if wait > 0:
+                return False, min(wait, remaining)
+            _, start, _, _ = heapq.heappop(self._heap)
+            # Reserved under the lock so the next head sees the slot as taken.
+            # Another client sharing the limiter may still have taken it, hence the delay.
+            delay = self.rate_limiter.reserve()
+            ticket.state = "granted"
+            priority = ticket.priority
+            self._queued[priority] -= 1
+            self._granted[priority] += 1
+            self._waits[priority].append(now - ticket.enqueued)
+            if start > self._current_round[priority] or not self._queued[priority]:
+                self._current_round[priority] = max(
+                    self._current_round[priority], start
+                )
+                self._prune_rounds(priority)
+            following = self._head()
+        if following is not None and following.wake is not None:
+            following.notify()
+        return True, delay
+
+    def _prune_rounds(self, priority: int):
+        # Called with the lock held. A key whose round has come around starts at the current
+        # round anyway, and with nothing queued no key is ahead of another, so forget those keys
+        # before one-off keys (e.g. universe scan endpoints) pile up
+        current = self._current_round[priority] if self._queued[priority] else None
+        stale = [
+            key
+            for key, round_ in self._rounds.items()
+            if key[0] == priority and (current is None or round_ <= current)
+        ]
+        for key in stale:
+            del self._rounds[key]
+
+    def _drop(self, ticket: _Ticket, state: str):
+        # Called with the lock held
+        ticket.state = state
+        self._queued[ticket.priority] -= 1
+        counters = self._expired if state == "expired" else self._cancelled
+        counters[ticket.priority] += 1
+
+    def acquire(self, http_method: str, endpoint: str):
+        """
+        Block until the request may be sent
+        :raises RequestCancelled: if the deadline passed or cancel() was called while waiting
+        """
+        ticket = self._enqueue(http_method, endpoint)
+        ticket.wake = threading.Event()
+        try:
+            while True:
+                ticket.wake.clear()
+                granted, wait = self._try_grant(ticket)
+                if granted:
+                    break
+                ticket.wake.wait(None if wait == float("inf") else wait)
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, http_method: str, endpoint: str):
+        ticket = self._enqueue(http_method, endpoint)
+        ticket.wake = asyncio.Event()
+        ticket.loop = asyncio.get_running_loop()
+        try:
+            while True:
+                ticket.wake.clear()
+                granted, wait = self._try_grant(ticket)
+                if granted:
+                    break
+                try:
+                    await asyncio.wait_for(
+                        ticket.wake.wait(), None if wait == float("inf") else wait
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def _abandon(self, ticket: _Ticket):
+        # The waiter went away (exception or task cancellation), pass the turn on
+        with self._lock:
+            if ticket.state == "queued":
+                self._drop(ticket, "cancelled")
+            following = self._head()
+        if following is not None and following.wake is not None:
+            following.notify()
+
+    def cancel(self, key: Hashable = None, priority: int = None) -> int:
+        """
+        Cancel queued requests, e.g. stale polls of a ship that was just sent elsewhere.
+        Their callers get RequestCancelled.
+        :param key: (optional) Only requests with this fairness key (ship symbol)
+        :param priority: (optional) Only requests of this class
+        :return: Number of requests cancelled
+        """
+        with self._lock:
+            cancelled = [
+                ticket
+                for _, _, _, ticket in self._heap
+                if ticket.state == "queued"
+                and (key is None or ticket.key == key)
+                and (priority is None or ticket.priority == priority)
+            ]
+            for ticket in cancelled:
+                self._drop(ticket, "cancelled")
+        for ticket in cancelled:
+            if ticket.wake is not None:
+                ticket.notify()
+        return len(cancelled)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Queue depth, outcome counters and wait times (seconds) per priority class
+        """
+        stats = {}
+        with self._lock:
+            for priority, name in PRIORITY_NAMES.items():
+                waits = sorted(self._waits[priority])
+                stats[name] = {
+                    "queued": self._queued[priority],
+                    "granted": self._granted[priority],
+                    "expired": self._expired[priority],
+                    "cancelled": self._cancelled[priority],
+                    "wait_p50": waits[len(waits) // 2] if waits else 0.0,
+                    "wait_p99": waits[int(len(waits) * 0.99)] if waits else 0.0,
+                    "wait_max": waits[-1] if waits else 0.0,
+                }
+        return stats
@@ -0,0 +1,25 @@
+from functools import lru_cache
+
+# Path segments that are followed by a symbol or id, and the placeholder that replaces it
+_COLLECTIONS = {
+    "ships": "{shipSymbol}",
+    "systems": "{systemSymbol}",
+    "waypoints": "{waypointSymbol}",
+    "contracts": "{contractId}",
+    "agents": "{agentSymbol}",
+    "factions": "{factionSymbol}",
+}
+
+
+@lru_cache(maxsize=4096)
+def endpoint_template(endpoint: str) -> str:
+    """
+    Replace symbols and ids in an endpoint with placeholders,
+    e.g. /my/ships/SHIP-1/navigate becomes /my/ships/{shipSymbol}/navigate
+    """
+    parts = endpoint.split("/")
+    for i in range(1, len(parts)):
+        placeholder = _COLLECTIONS.get(parts[i - 1])
+        if placeholder is not None and parts[i]:
+            parts[i] = placeholder
+    return "/".join(parts)
@@ -1,2 +1,44 @@
 class SpaceTradersApiException(Exception):
-    pass
+    def __init__(
+        self,
+        *args,
+        status_code: int = None,
+        code: int = None,
+        message: str = None,
+        data: dict = None,
+    ):
+        """
+        :param status_code: HTTP status of the failed response, if there was one
+        :param code: SpaceTraders error code from the response body
+        :param message: SpaceTraders error message from the response body
+        :param data: Structured error details from the response body
+        """
+        super().__init__(*args)
+        self.status_code = status_code
+        self.code = code
+        self.message = message
+        self.data = data
+
+
+class TransportError(SpaceTradersApiException):
+    def __init__(self, *args, sent: bool = True, retryable: bool = True):
+        """
+        :param sent: False when the request certainly never reached the server
+        (connection refused, DNS failure, connect timeout), so even a mutation can be retried
+        :param retryable: False when trying again cannot help, e.g. the transport is closed
+        """
+        super().__init__(*args)
+        self.sent = sent
+        self.retryable = retryable
+
+
+class RequestCancelled(SpaceTradersApiException):
+    """
+    A queued request was cancelled or missed its deadline before it was sent
+    """
+
+
+class CircuitOpenError(SpaceTradersApiException):
+    """
+    The host failed repeatedly and requests are rejected without being sent until it recovers
+    """
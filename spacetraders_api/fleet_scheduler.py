@@ -0,0 +1,247 @@
+import asyncio
+import datetime
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional, Union
+
+from spacetraders_api.models import Ship, ShipCooldown, ShipNav
+from spacetraders_api.server_clock import ServerClock
+
+# What a handler returns: the next wake-up as a server datetime, a delay in seconds,
+# or None to stop scheduling the ship
+WakeUp = Optional[Union[datetime.datetime, float, int]]
+
+
+def next_action_time(
+    nav: ShipNav = None,
+    cooldown: ShipCooldown = None,
+    clock: ServerClock = None,
+) -> datetime.datetime:
+    """
+    Server time at which a ship can act again, from the nav and cooldown of any response
+    """
+    clock = clock or ServerClock()
+    now = clock.now()
+    moments = [now]
+    if nav is not None and nav.status == "IN_TRANSIT":
+        moments.append(nav.route.arrival)
+    if cooldown is not None and cooldown.remainingSeconds > 0:
+        moments.append(now + datetime.timedelta(seconds=cooldown.remainingSeconds))
+    return max(moments)
+
+
+class FleetScheduler:
+    def __init__(
+        self,
+        clock: ServerClock = None,
+        error_backoff: float = 30.0,
+        logger: logging.Logger = None,
+    ):
+        """
+        Min-heap of ship wake-up times that calls each ship's handler only once the ship can act.
+        The scheduler itself never polls the API, handlers return when they want to run next.
+        A handler that raises is logged and its ship tried again after error_backoff seconds.
+        :param clock: (optional) Server clock, normally api.server_clock so wake-ups follow server time
+        :param error_backoff: Seconds before a ship whose handler raised is dispatched again,
+        None to remove it from the schedule instead
+        :param logger: (optional) Logger for handler exceptions
+        """
+        self._clock = clock or ServerClock()
+        self.error_backoff = error_backoff
+        self._logger = logger or logging.getLogger(__name__)
+        self._heap = []
+        self._counter = itertools.count()
+        self._wake_ups: Dict[str, float] = {}
+        self._handlers: Dict[str, Callable] = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+        self._async_changed: Optional[asyncio.Event] = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopped = False
+        self.dispatched = 0
+        self.failures = 0
+
+    @classmethod
+    def from_api(cls, api, handler: Callable) -> "FleetScheduler":
+        """
+        Schedule every ship of the agent with the same handler, using a single get_my_ships call
+        """
+        scheduler = cls(api.server_clock)
+        for ship in api.get_my_ships().data:
+            scheduler.add_ship(ship, handler)
+        return scheduler
+
+    def __len__(self) -> int:
+        return len(self._wake_ups)
+
+    def add_ship(self, ship: Union[Ship, str], handler: Callable, at: WakeUp = None):
+        """
+        :param ship: Ship model (its nav and cooldown give the first wake-up) or ship symbol
+        :param handler: Called with the ship symbol, a coroutine function when using run_async()
+        :param at: (optional) First wake-up, overrides the one computed from the ship
+        """
+        if isinstance(ship, str):
+            symbol = ship
+        else:
+            symbol = ship.symbol
+            if at is None:
+                at = next_action_time(ship.nav, ship.cooldown, self._clock)
+        self._handlers[symbol] = handler
+        self.wake_at(symbol, at)
+
+    def remove_ship(self, ship_symbol: str):
+        with self._lock:
+            self._handlers.pop(ship_symbol, None)
+            self._wake_ups.pop(ship_symbol, None)
+
+    def _timestamp(self, at: WakeUp) -> float:
+        if at is None:
+            return self._clock.time()
+        if isinstance(at, datetime.datetime):
+            return at.timestamp()
+        return self._clock.time() + float(at)
+
+    def wake_at(self, ship_symbol: str, at: WakeUp = None):
+        """
+        (Re)schedule a ship, replacing its previous wake-up
+        """
+        timestamp = self._timestamp(at)
+        with self._lock:
+            self._wake_ups[ship_symbol] = timestamp
+            heapq.heappush(self._heap, (timestamp, next(self._counter), ship_symbol))
+        self._changed.set()
+        self._notify_async()
+
+    def _notify_async(self):
+        # wake_at() and stop() may be called from any thread, asyncio.Event is not thread-safe
+        changed, loop = self._async_changed, self._async_loop
+        if changed is not None:
+            try:
+                loop.call_soon_threadsafe(changed.set)
+            except RuntimeError:
+                pass  # the loop has closed, there is no run_async() left to wake
+
+    def _reschedule(self, ship_symbol: str, at: WakeUp):
+        if at is None or ship_symbol not in self._handlers:
+            self.remove_ship(ship_symbol)
+        else:
+            self.wake_at(ship_symbol, at)
+
+    def _handler_failed(self, ship_symbol: str, error: Exception):
+        self.failures += 1
+        self._logger.error(
+            f"Handler of {ship_symbol} raised {error!r}",
+            exc_info=(type(error), error, error.__traceback__),
+        )
+        self._reschedule(ship_symbol, self.error_backoff)
+
+    def _pop_due(self):
+        """
+        (ship symbol or None, seconds until the next wake-up or None when nothing is scheduled)
+        """
+        with self._lock:
+            while self._heap:
+                timestamp, _, symbol = self._heap[0]
+                if self._wake_ups.get(symbol) != timestamp:
+                    heapq.heappop(self._heap)  # superseded or removed
+                    continue
+                delay = timestamp - self._clock.time()
+                if delay > 0:
+                    return None, delay
+                heapq.heappop(self._heap)
+                del self._wake_ups[symbol]
+                return symbol, 0.0
+            return None, None
+
+    def stop(self):
+        self._stopped = True
+        self._changed.set()
+        self._notify_async()
+
+    def run(self, until: float = None):
+        """
+        Dispatch handlers on this thread, sleeping until the earliest wake-up
+        :param until: (optional) Stop after this many seconds
+        """
+        self._stopped = False
+        deadline = None if until is None else time.monotonic() + until
+        while not self._stopped:
+            # Cleared before looking, so a wake_at() from another thread after the look
+            # still cuts the wait short
+            self._changed.clear()
+            symbol, delay = self._pop_due()
+            if symbol is not None:
+                self.dispatched += 1
+                try:
+                    at = self._handlers[symbol](symbol)
+                except Exception as e:
+                    self._handler_failed(symbol, e)
+                else:
+                    self._reschedule(symbol, at)
+                continue
+            if delay is None:
+                return
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                delay = min(delay, remaining)
+            self._changed.wait(delay)
+
+    async def run_async(self, until: float = None):
+        """
+        Dispatch coroutine handlers as tasks, so hundreds of ships share one event loop.
+        Once until has passed or stop() is called no new handler is started, and the ones
+        already running are awaited so no mutation is cut off halfway. Cancelling run_async()
+        itself cancels the running handlers too.
+        :param until: (optional) Stop after this many seconds
+        """
+        self._stopped = False
+        loop = asyncio.get_running_loop()
+        self._async_loop = loop
+        self._async_changed = asyncio.Event()
+        deadline = None if until is None else loop.time() + until
+        running = set()
+
+        async def dispatch(ship_symbol: str):
+            try:
+                at = await self._handlers[ship_symbol](ship_symbol)
+            except Exception as e:
+                self._handler_failed(ship_symbol, e)
+            else:
+                self._reschedule(ship_symbol, at)
+
+        try:
+            while not self._stopped:
+                self._async_changed.clear()
+                symbol, delay = self._pop_due()
+                if symbol is not None:
+                    self.dispatched += 1
+                    task = asyncio.ensure_future(dispatch(symbol))
+                    running.add(task)
+                    task.add_done_callback(running.discard)
+                    continue
+                if delay is None and not running:
+                    break
+                if deadline is not None:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    delay = remaining if delay is None else min(delay, remaining)
+                waiters = [asyncio.ensure_future(self._async_changed.wait())]
+                waiters.extend(running)
+                await asyncio.wait(
+                    waiters, timeout=delay, return_when=asyncio.FIRST_COMPLETED
+                )
+                waiters[0].cancel()
+            if running:
+                # Handlers log their own exceptions
+                await asyncio.gather(*running, return_exceptions=True)
+        finally:
+            for task in running:
+                task.cancel()
+            self._async_changed = None
+            self._async_loop = None
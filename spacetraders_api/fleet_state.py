@@ -0,0 +1,287 @@
+import threading
+from typing import Dict, List, Optional
+
+from spacetraders_api.exceptions import SpaceTradersApiException
+from spacetraders_api.models import (
+    AcceptContractResult,
+    Agent,
+    ChangeShipFlightModeResponse,
+    ChangeShipStatusResponse,
+    Contract,
+    DeliverCargoToContractResponse,
+    RefuelShipResponse,
+    Ship,
+    ShipNav,
+    ShipNavigationResponse,
+)
+from spacetraders_api.server_clock import ServerClock
+
+# Client errors that mean our picture of the ship was wrong (e.g. "ship is not in orbit"),
+# as opposed to auth, unknown symbols and rate limiting
+_STALE_STATUSES = frozenset((400, 409, 422))
+
+
+class FleetState:
+    def __init__(self, api, max_age: float = 300.0, clock: ServerClock = None):
+        """
+        Local mirror of our ships, agent and contracts, kept current from the responses of the
+        mutations made through it instead of re-fetching after every action.
+        Exposes the mutation methods of SpaceTradersApi under the same names, so it can be passed
+        wherever an api is used to fly ships (e.g. RoutePlanner.execute).
+        Arrival and cooldown are projected from server time when read. A ship is fetched again
+        only when a request fails because the mirror was wrong about it, when a response
+        disagrees with the mirror, or once it is older than max_age.
+        :param api: SpaceTradersApi, decoding in validate, construct or lazy mode
+        :param max_age: Seconds after which sync() re-fetches a ship anyway
+        :param clock: (optional) Server clock, api.server_clock by default
+        """
+        self.api = api
+        self.max_age = max_age
+        self._clock = clock or api.server_clock
+        self._lock = threading.RLock()
+        self.agent: Optional[Agent] = None
+        self._ships: Dict[str, Ship] = {}
+        self.contracts: Dict[str, Contract] = {}
+        # Server time each ship was last fetched in full
+        self._fetched: Dict[str, float] = {}
+        # (server time the cooldown was seen, remaining seconds then) per ship
+        self._cooldowns: Dict[str, tuple] = {}
+        self._stale = set()
+        self.fetches = 0
+        self.patches = 0
+        self.drifts = 0
+
+    def load(self):
+        """
+        Fetch the agent, every ship and the contracts in full
+        """
+        agent = self.api.get_my_agent()
+        ships = self.api.get_my_ships().data
+        contracts = self.api.get_contracts().data
+        with self._lock:
+            self.agent = agent
+            self.fetches += 3
+            for ship in ships:
+                self._store_ship(ship)
+            self.contracts = {contract.id: contract for contract in contracts}
+        return self
+
+    def _store_ship(self, ship: Ship):
+        now = self._clock.time()
+        self._ships[ship.symbol] = ship
+        self._fetched[ship.symbol] = now
+        self._cooldowns[ship.symbol] = (now, ship.cooldown.remainingSeconds)
+        self._stale.discard(ship.symbol)
+
+    @property
+    def ship_symbols(self) -> List[str]:
+        return list(self._ships)
+
+    def ship(self, ship_symbol: str) -> Ship:
+        """
+        The mirrored ship with arrival and cooldown projected to the current server time
+        """
+        with self._lock:
+            try:
+                ship = self._ships[ship_symbol]
+            except KeyError:
+                raise SpaceTradersApiException(f"Unknown ship {ship_symbol}") from None
+            now = self._clock.time()
+            nav = ship.nav
+            if nav.status == "IN_TRANSIT" and nav.route.arrival.timestamp() <= now:
+                nav.status = "IN_ORBIT"
+            seen, remaining = self._cooldowns[ship_symbol]
+            ship.cooldown.remainingSeconds = max(
+                0, int(round(remaining - (now - seen)))
+            )
+            return ship
+
+    def ships(self) -> List[Ship]:
+        return [self.ship(symbol) for symbol in self.ship_symbols]
+
+    def mark_stale(self, ship_symbol: str):
+        """
+        Have the next sync() fetch the ship again
+        """
+        with self._lock:
+            self._stale.add(ship_symbol)
+
+    def refresh_ship(self, ship_symbol: str) -> Ship:
+        ship = self.api.get_ship(ship_symbol)
+        with self._lock:
+            self.fetches += 1
+            self._store_ship(ship)
+        return ship
+
+    def sync(self) -> int:
+        """
+        Fetch the ships that drifted, are older than max_age or are not mirrored yet, with a
+        single get_my_ships call when more than one needs it
+        :return: Number of ships fetched
+        """
+        with self._lock:
+            now = self._clock.time()
+            due = [
+                symbol
+                for symbol in self._ships
+                if symbol in self._stale or now - self._fetched[symbol] >= self.max_age
+            ]
+            # Ships a response mentioned but the mirror has never fetched, e.g. one just bought
+            due.extend(sorted(self._stale - set(self._ships)))
+        if len(due) == 1:
+            self.refresh_ship(due[0])
+        elif due:
+            ships = self.api.get_my_ships().data
+            with self._lock:
+                self.fetches += 1
+                for ship in ships:
+                    self._store_ship(ship)
+                # Beyond the first page of get_my_ships
+                missed = [symbol for symbol in due if symbol in self._stale]
+            for symbol in missed:
+                self.refresh_ship(symbol)
+        return len(due)
+
+    def _patch(self, ship_symbol: str, **fields):
+        """
+        Replace parts of a mirrored ship with the authoritative copies from a response
+        """
+        with self._lock:
+            ship = self._ships.get(ship_symbol)
+            if ship is None:
+                # Bought or otherwise unknown ship, fetch it in full next sync()
+                self._stale.add(ship_symbol)
+                return
+            for name, value in fields.items():
+                setattr(ship, name, value)
+            self.patches += 1
+
+    def _drifted(self, ship_symbol: str, expected, actual):
+        """
+        A response contradicts the mirror, so something changed the ship behind our back
+        """
+        if expected != actual:
+            with self._lock:
+                self.drifts += 1
+                self._stale.add(ship_symbol)
+
+    def _call(self, ship_symbol: Optional[str], method, *args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        except SpaceTradersApiException as e:
+            if ship_symbol is not None and e.status_code in _STALE_STATUSES:
+                self.mark_stale(ship_symbol)
+            raise
+
+    def apply_navigation(self, ship_symbol: str, response: ShipNavigationResponse):
+        with self._lock:
+            ship = self._ships.get(ship_symbol)
+            if ship is not None and ship.fuel.capacity:
+                expected = ship.fuel.current - response.fuel.consumed.amount
+                self._drifted(ship_symbol, expected, response.fuel.current)
+        self._patch(ship_symbol, nav=response.nav, fuel=response.fuel)
+
+    def apply_nav(self, ship_symbol: str, nav: ShipNav):
+        with self._lock:
+            if ship_symbol in self._ships:
+                location = self.ship(ship_symbol).nav.waypointSymbol
+                self._drifted(ship_symbol, location, nav.waypointSymbol)
+        self._patch(ship_symbol, nav=nav)
+
+    def apply_refuel(self, ship_symbol: str, response: RefuelShipResponse):
+        self._patch(ship_symbol, fuel=response.fuel)
+        self.apply_agent(response.agent)
+
+    def apply_delivery(
+        self, ship_symbol: str, response: DeliverCargoToContractResponse
+    ):
+        self._patch(ship_symbol, cargo=response.cargo)
+        self.apply_contract(response.contract)
+
+    def apply_agent(self, agent: Agent):
+        with self._lock:
+            self.agent = agent
+            self.patches += 1
+
+    def apply_contract(self, contract: Contract):
+        with self._lock:
+            self.contracts[contract.id] = contract
+            self.patches += 1
+
+    def navigate_ship_to(
+        self, ship_symbol: str, waypoint_symbol: str
+    ) -> ShipNavigationResponse:
+        response = self._call(
+            ship_symbol, self.api.navigate_ship_to, ship_symbol, waypoint_symbol
+        )
+        self.apply_navigation(ship_symbol, response)
+        return response
+
+    def orbit_ship(self, ship_symbol: str) -> ChangeShipStatusResponse:
+        response = self._call(ship_symbol, self.api.orbit_ship, ship_symbol)
+        self.apply_nav(ship_symbol, response.nav)
+        return response
+
+    def dock_ship(self, ship_symbol: str) -> ChangeShipStatusResponse:
+        response = self._call(ship_symbol, self.api.dock_ship, ship_symbol)
+        self.apply_nav(ship_symbol, response.nav)
+        return response
+
+    def set_ship_flight_mode(
+        self, ship_symbol: str, flight_mode: str
+    ) -> ChangeShipFlightModeResponse:
+        response = self._call(
+            ship_symbol, self.api.set_ship_flight_mode, ship_symbol, flight_mode
+        )
+        self.apply_nav(
+            ship_symbol,
+            ShipNav(
+                systemSymbol=response.systemSymbol,
+                waypointSymbol=response.waypointSymbol,
+                route=response.route,
+                status=response.status,
+                flightMode=response.flightMode,
+            ),
+        )
+        return response
+
+    def refuel_ship(
+        self, ship_symbol: str, units: int = None, from_cargo: bool = False
+    ) -> RefuelShipResponse:
+        response = self._call(
+            ship_symbol, self.api.refuel_ship, ship_symbol, units, from_cargo
+        )
+        self.apply_refuel(ship_symbol, response)
+        return response
+
+    def deliver_contract(
+        self, contract_id: str, ship_symbol: str, trade_symbol: str, units: int
+    ) -> DeliverCargoToContractResponse:
+        response = self._call(
+            ship_symbol,
+            self.api.deliver_contract,
+            contract_id,
+            ship_symbol,
+            trade_symbol,
+            units,
+        )
+        self.apply_delivery(ship_symbol, response)
+        return response
+
+    def accept_contract(self, contract_id: str) -> AcceptContractResult:
+        response = self._call(None, self.api.accept_contract, contract_id)
+        self.apply_contract(response.contract)
+        self.apply_agent(response.agent)
+        return response
+
+    def fulfill_contract(self, contract_id: str) -> AcceptContractResult:
+        response = self._call(None, self.api.fulfill_contract, contract_id)
+        self.apply_contract(response.contract)
+        self.apply_agent(response.agent)
+        return response
+
+    def __getattr__(self, name: str):
+        # Reads and anything not mirrored go straight to the api
+        if name == "api":
+            raise AttributeError(name)
+        return getattr(self.api, name)
@@ -0,0 +1,254 @@
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Tuple
+
+from spacetraders_api.decoding import decode_mode
+from spacetraders_api.dispatcher import BULK, request_priority
+from spacetraders_api.exceptions import CircuitOpenError, SpaceTradersApiException
+from spacetraders_api.pagination import MAX_PAGE_SIZE
+
+# Task keys, also the lines of the checkpoint:
+#   systems:<page>  waypoints:<system>:<page>  shipyard:<waypoint>  market:<waypoint>
+_ROOT = "systems:1"
+
+
+def _get(record, name: str):
+    return record[name] if isinstance(record, dict) else getattr(record, name)
+
+
+def _system_of(waypoint_symbol: str) -> str:
+    return waypoint_symbol.rsplit("-", 1)[0]
+
+
+class JsonLinesSink:
+    def __init__(self, path: str):
+        """
+        Appends every crawled payload to a JSON Lines file as {"kind", "key", "data"}.
+        After a crash the payloads of tasks not yet checkpointed are written again on resume,
+        so a key can appear more than once; the last line wins.
+        """
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, kind: str, key: str, payload: Any):
+        self._file.write(
+            json.dumps(
+                {"kind": kind, "key": key, "data": payload}, separators=(",", ":")
+            )
+            + "\n"
+        )
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class GalaxyCrawler:
+    def __init__(
+        self,
+        api,
+        sink,
+        checkpoint_path: str,
+        workers: int = 4,
+        shipyards: bool = True,
+        markets: bool = True,
+        max_attempts: int = 3,
+        logger: logging.Logger = None,
+    ):
+        """
+        Charts every system, waypoint, shipyard and market of the universe.
+        Systems and waypoints are listed page by page; waypoints with the SHIPYARD or MARKETPLACE
+        trait are then fetched in detail. Requests run on a pool of worker threads at bulk
+        priority, so the api's rate limiter (and dispatcher, if any) paces them behind ship work.
+        Every finished task is appended to the checkpoint with the tasks it discovered, so a run
+        resumes where the last one stopped. A checkpoint from before a server reset is discarded.
+        An api with a static_cache also fills that cache with every system and waypoint crawled.
+        :param api: SpaceTradersApi
+        :param sink: Object with write(kind, key, payload), flush() and close(), e.g. JsonLinesSink;
+        payloads are the decoded JSON of the API
+        :param checkpoint_path: Checkpoint file, created if missing
+        :param workers: Requests in flight at once
+        :param shipyards: Fetch the shipyard of every waypoint that has one
+        :param markets: Fetch the market of every waypoint that has one
+        :param max_attempts: Attempts per task in one run; tasks that still fail are retried
+        on the next run
+        :param logger: (optional) Logger for progress and failed tasks
+        """
+        self.api = api
+        self.sink = sink
+        self.checkpoint_path = checkpoint_path
+        self.workers = workers
+        self.shipyards = shipyards
+        self.markets = markets
+        self.max_attempts = max_attempts
+        self._logger = logger or logging.getLogger(__name__)
+        self._done = set()
+        self._pending = deque()
+        self._attempts: Dict[str, int] = {}
+        self._stopped = False
+        self.failed: Dict[str, str] = {}
+        self.completed = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def stop(self):
+        """
+        Finish the requests in flight, checkpoint them and return from run()
+        """
+        self._stopped = True
+
+    def _load_checkpoint(self, reset_date: str):
+        self._done = set()
+        self._pending = deque()
+        self._attempts = {}
+        self.failed = {}
+        found = []
+        lines = []
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "rb+") as file:
+                content = file.read()
+                # The last line is only complete once it is followed by a newline. Cut off a
+                # line torn by a crash, or the next entry would be appended to it.
+                complete = content.rfind(b"\n") + 1
+                if complete < len(content):
+                    file.truncate(complete)
+            lines = content[:complete].decode("utf-8").split("\n")
+        header = json.loads(lines[0]) if len(lines) > 1 else None
+        if header is None or header.get("resetDate") != reset_date:
+            if header is not None:
+                self._logger.info("Server was reset, discarding the crawl checkpoint")
+            with open(self.checkpoint_path, "w", encoding="utf-8") as file:
+                file.write(json.dumps({"resetDate": reset_date}) + "\n")
+            lines = []
+        for line in lines[1:-1]:
+            entry = json.loads(line)
+            self._done.add(entry["done"])
+            found.extend(entry["found"])
+        seen = set()
+        for key in [_ROOT] + found:
+            if key not in self._done and key not in seen:
+                seen.add(key)
+                self._pending.append(key)
+
+    def _run_task(self, key: str) -> Tuple[List[Tuple[str, str, Any]], List[str]]:
+        """
+        Fetch one task on a worker thread
+        :return: (payloads for the sink as (kind, key, payload), newly discovered task keys)
+        """
+        kind, _, argument = key.partition(":")
+        with request_priority(BULK), decode_mode("raw"):
+            if kind == "systems":
+                page = int(argument)
+                result = self.api.get_systems(page=page, limit=MAX_PAGE_SIZE)
+                found = [f"waypoints:{_get(s, 'symbol')}:1" for s in result.data]
+                if page == 1:
+                    found += [f"systems:{p}" for p in range(2, self._pages(result) + 1)]
+                return [("system", _get(s, "symbol"), s) for s in result.data], found
+            if kind == "waypoints":
+                system, page = argument.rsplit(":", 1)
+                page = int(page)
+                result = self.api.get_system_waypoints(
+                    system, page=page, limit=MAX_PAGE_SIZE
+                )
+                found = []
+                if page == 1:
+                    found += [
+                        f"waypoints:{system}:{p}"
+                        for p in range(2, self._pages(result) + 1)
+                    ]
+                for waypoint in result.data:
+                    traits = {_get(t, "symbol") for t in _get(waypoint, "traits")}
+                    symbol = _get(waypoint, "symbol")
+                    if self.shipyards and "SHIPYARD" in traits:
+                        found.append(f"shipyard:{symbol}")
+                    if self.markets and "MARKETPLACE" in traits:
+                        found.append(f"market:{symbol}")
+                return [("waypoint", _get(w, "symbol"), w) for w in result.data], found
+            try:
+                if kind == "shipyard":
+                    payload = self.api.get_available_ships_at_shipyard(
+                        _system_of(argument), argument
+                    )
+                else:
+                    payload = self.api.get_market(_system_of(argument), argument)
+            except SpaceTradersApiException as e:
+                # Listed with the trait but gone, nothing to chart
+                if e.status_code == 404:
+                    return [], []
+                raise
+            return [(kind, argument, payload)], []
+
+    @staticmethod
+    def _pages(result) -> int:
+        meta = result.meta
+        return max(1, -(-meta.total // max(1, meta.limit)))
+
+    def run(self, max_tasks: int = None) -> Dict[str, int]:
+        """
+        Crawl until everything is charted, stop() is called or max_tasks tasks have finished
+        :return: Counts of completed, failed and pending tasks
+        """
+        self._stopped = False
+        self._load_checkpoint(self.api.get_status()["resetDate"])
+        checkpoint = open(self.checkpoint_path, "a", encoding="utf-8")
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        in_flight = {}
+        finished = 0
+        try:
+            while True:
+                while (
+                    self._pending
+                    and len(in_flight) < self.workers
+                    and not self._stopped
+                    and (max_tasks is None or finished + len(in_flight) < max_tasks)
+                ):
+                    key = self._pending.popleft()
+                    in_flight[pool.submit(self._run_task, key)] = key
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = in_flight.pop(future)
+                    try:
+                        payloads, found = future.result()
+                    except CircuitOpenError as e:
+                        # Not the task's fault, wait for the host instead of using up attempts
+                        self._pending.append(key)
+                        time.sleep((e.data or {}).get("retryAfter", 1.0))
+                        continue
+                    except Exception as e:
+                        # Whatever went wrong, the rest of the crawl goes on
+                        attempts = self._attempts[key] = self._attempts.get(key, 0) + 1
+                        if attempts < self.max_attempts:
+                            self._pending.append(key)
+                        else:
+                            self.failed[key] = repr(e)
+                            self._logger.warning(f"Giving up on {key} for now: {e!r}")
+                        continue
+                    for kind, symbol, payload in payloads:
+                        self.sink.write(kind, symbol, payload)
+                    # The sink first, so a checkpointed task is never missing from the sink
+                    self.sink.flush()
+                    new = [k for k in found if k not in self._done]
+                    checkpoint.write(json.dumps({"done": key, "found": new}) + "\n")
+                    checkpoint.flush()
+                    self._done.add(key)
+                    # Children first keeps the pending queue short
+                    self._pending.extendleft(reversed(new))
+                    self.completed += 1
+                    finished += 1
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            checkpoint.close()
+        return {
+            "completed": self.completed,
+            "failed": len(self.failed),
+            "pending": len(self._pending),
+        }
@@ -0,0 +1,132 @@
+import codecs
+import json
+import re
+from typing import Iterator, Tuple
+from spacetraders_api.exceptions import SpaceTradersApiException
+from spacetraders_api.models import System, Waypoint
+
+# Full galaxy dump published next to the paginated /systems endpoint
+SYSTEMS_DUMP_ENDPOINT = "/systems.json"
+
+_WHITESPACE = " \t\n\r"
+# Rest of a buffer that may still belong to a number cut at the chunk boundary
+_NUMBER_TAIL = re.compile(r"[0-9.eE+-]*\Z")
+
+
+def iter_json_array(
+    path: str, chunk_size: int = 65536, max_element_size: int = 64 * 1024 * 1024
+) -> Iterator:
+    """
+    Incrementally parse a file holding one top-level JSON array, yielding one element at a time.
+    Memory is bounded by chunk_size plus the largest single element, not by the file size.
+    :param path: File to read
+    :param chunk_size: Bytes read from disk at a time
+    :param max_element_size: Characters a single element may span before the dump is rejected
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    eof = False
+    started = False
+    # Scan state of the element at pos, kept across fills so each character is scanned once
+    scanned = 0
+    depth = 0
+    in_string = False
+    escaped = False
+
+    with open(path, "rb") as file:
+
+        def fill() -> bool:
+            nonlocal buffer, pos, eof
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + utf8.decode(chunk, final=eof)
+            pos = 0
+            return not eof
+
+        def terminated() -> bool:
+            # True once the "," or "]" closing the element at pos is buffered, i.e. the
+            # element is complete and a decode error is a real syntax error
+            nonlocal scanned, depth, in_string, escaped
+            for i in range(pos + scanned, len(buffer)):
+                char = buffer[i]
+                if in_string:
+                    if escaped:
+                        escaped = False
+                    elif char == "\\":
+                        escaped = True
+                    elif char == '"':
+                        in_string = False
+                elif char == '"':
+                    in_string = True
+                elif char in "[{":
+                    depth += 1
+                elif char in "]}":
+                    if depth == 0:
+                        return True
+                    depth -= 1
+                elif char == "," and depth == 0:
+                    return True
+            scanned = len(buffer) - pos
+            return False
+
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos >= len(buffer):
+                if eof or not fill():
+                    raise SpaceTradersApiException("Truncated JSON array in dump")
+                continue
+
+            char = buffer[pos]
+            if not started:
+                if char != "[":
+                    raise SpaceTradersApiException("Dump is not a JSON array")
+                started = True
+                pos += 1
+                continue
+            if char == "]":
+                return
+            if char == ",":
+                pos += 1
+                continue
+
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                if eof or terminated():
+                    raise SpaceTradersApiException("Bad JSON in dump") from e
+                if len(buffer) - pos > max_element_size:
+                    raise SpaceTradersApiException(
+                        f"JSON element in dump exceeds {max_element_size} characters"
+                    ) from e
+                fill()
+                continue
+            # A number cut at the chunk boundary decodes fine but short ("12" of "123", 1 of "1."),
+            # make sure it is terminated
+            if not eof and _NUMBER_TAIL.match(buffer, end):
+                fill()
+                continue
+            pos = end
+            scanned, depth, in_string, escaped = 0, 0, False, False
+            yield element
+
+
+def iter_systems_dump(path: str, chunk_size: int = 65536) -> Iterator[System]:
+    """
+    Yield every System of a downloaded systems.json dump
+    """
+    for system in iter_json_array(path, chunk_size):
+        yield System(**system)
+
+
+def iter_waypoints_dump(
+    path: str, chunk_size: int = 65536
+) -> Iterator[Tuple[str, Waypoint]]:
+    """
+    Yield (system symbol, Waypoint) for every waypoint of a downloaded systems.json dump
+    """
+    for system in iter_json_array(path, chunk_size):
+        for waypoint in system.get("waypoints", []):
+            yield system["symbol"], Waypoint(**waypoint)
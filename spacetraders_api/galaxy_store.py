@@ -0,0 +1,244 @@
+import os
+from typing import Dict, Iterable, Union
+
+import numpy as np
+from spacetraders_api.exceptions import SpaceTradersApiException
+from spacetraders_api.galaxy_dump import iter_json_array
+from spacetraders_api.models import Reference, System, Waypoint
+
+# String columns hold ids into the sorted, interned `strings` table
+SYSTEM_DTYPE = np.dtype(
+    [
+        ("symbol", np.int32),
+        ("sector", np.int32),
+        ("type", np.int32),
+        ("x", np.int32),
+        ("y", np.int32),
+    ]
+)
+WAYPOINT_DTYPE = np.dtype(
+    [
+        ("symbol", np.int32),
+        ("system", np.int32),
+        ("type", np.int32),
+        ("x", np.int32),
+        ("y", np.int32),
+    ]
+)
+
+_ARRAYS = (
+    "strings",
+    "systems",
+    "waypoint_offsets",
+    "waypoints",
+    "waypoint_order",
+    "orbital_offsets",
+    "orbitals",
+    "faction_offsets",
+    "factions",
+)
+
+
+def _get(record, name: str):
+    return record[name] if isinstance(record, dict) else getattr(record, name)
+
+
+class GalaxyStore:
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        """
+        Compact array-backed galaxy: systems and waypoints as NumPy structured arrays,
+        waypoints/orbitals/factions as CSR adjacency, strings interned in one sorted table.
+        Build it with from_systems(), from_dump() or from_api(), and reopen it with load().
+        """
+        for name in _ARRAYS:
+            setattr(self, name, arrays[name])
+
+    def __len__(self) -> int:
+        return len(self.systems)
+
+    @classmethod
+    def from_systems(cls, systems: Iterable[Union[System, dict]]) -> "GalaxyStore":
+        """
+        Build the store from System models or raw system dicts (as found in the systems.json dump)
+        """
+        system_rows, waypoint_rows, orbital_lists, faction_lists = [], [], [], []
+        waypoint_counts = []
+        strings = set()
+        for system in systems:
+            symbol = _get(system, "symbol")
+            sector = _get(system, "sectorSymbol")
+            system_type = _get(system, "type")
+            strings.update((symbol, sector, system_type))
+            system_rows.append(
+                (symbol, sector, system_type, _get(system, "x"), _get(system, "y"))
+            )
+            factions = [_get(faction, "symbol") for faction in _get(system, "factions")]
+            strings.update(factions)
+            faction_lists.append(factions)
+            waypoints = _get(system, "waypoints")
+            waypoint_counts.append(len(waypoints))
+            for waypoint in waypoints:
+                wp_symbol = _get(waypoint, "symbol")
+                wp_type = _get(waypoint, "type")
+                orbitals = [
+                    _get(orbital, "symbol") for orbital in _get(waypoint, "orbitals")
+                ]
+                strings.update(orbitals)
+                strings.update((wp_symbol, wp_type))
+                waypoint_rows.append(
+                    (wp_symbol, wp_type, _get(waypoint, "x"), _get(waypoint, "y"))
+                )
+                orbital_lists.append(orbitals)
+
+        # Symbols are ASCII, so byte order matches str order and ids index the table directly
+        strings = sorted(strings)
+        table = np.array(strings, dtype=bytes) if strings else np.array([], "S1")
+        ids = {string: i for i, string in enumerate(strings)}
+
+        # Systems are stored sorted by symbol id so lookups are a binary search
+        order = sorted(range(len(system_rows)), key=lambda i: ids[system_rows[i][0]])
+        systems = np.empty(len(system_rows), dtype=SYSTEM_DTYPE)
+        waypoints = np.empty(len(waypoint_rows), dtype=WAYPOINT_DTYPE)
+        waypoint_offsets = np.zeros(len(system_rows) + 1, dtype=np.int64)
+        faction_offsets = np.zeros(len(system_rows) + 1, dtype=np.int64)
+        orbital_offsets = np.zeros(len(waypoint_rows) + 1, dtype=np.int64)
+        orbitals, factions = [], []
+        first_waypoint = np.concatenate(([0], np.cumsum(waypoint_counts))).astype(int)
+        row = 0
+        for new_index, old_index in enumerate(order):
+            symbol, sector, system_type, x, y = system_rows[old_index]
+            systems[new_index] = (ids[symbol], ids[sector], ids[system_type], x, y)
+            factions.extend(ids[faction] for faction in faction_lists[old_index])
+            faction_offsets[new_index + 1] = len(factions)
+            for wp in range(first_waypoint[old_index], first_waypoint[old_index + 1]):
+                wp_symbol, wp_type, wx, wy = waypoint_rows[wp]
+                waypoints[row] = (ids[wp_symbol], new_index, ids[wp_type], wx, wy)
+                orbitals.extend(ids[orbital] for orbital in orbital_lists[wp])
+                row += 1
+                orbital_offsets[row] = len(orbitals)
+            waypoint_offsets[new_index + 1] = row
+
+        return cls(
+            {
+                "strings": table,
+                "systems": systems,
+                "waypoint_offsets": waypoint_offsets,
+                "waypoints": waypoints,
+                "waypoint_order": np.argsort(waypoints["symbol"], kind="stable"),
+                "orbital_offsets": orbital_offsets,
+                "orbitals": np.array(orbitals, dtype=np.int32),
+                "faction_offsets": faction_offsets,
+                "factions": np.array(factions, dtype=np.int32),
+            }
+        )
+
+    @classmethod
+    def from_dump(cls, path: str, chunk_size: int = 65536) -> "GalaxyStore":
+        """
+        Build the store straight from a systems.json dump without creating pydantic models
+        """
+        return cls.from_systems(iter_json_array(path, chunk_size))
+
+    @classmethod
+    def from_api(cls, api, prefetch: int = 4) -> "GalaxyStore":
+        return cls.from_systems(api.iter_systems(prefetch=prefetch))
+
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "GalaxyStore":
+        """
+        Open a saved store, memory-mapping the arrays so nothing is read until it is used
+        """
+        mode = "r" if mmap else None
+        try:
+            return cls(
+                {
+                    name: np.load(
+                        os.path.join(directory, f"{name}.npy"), mmap_mode=mode
+                    )
+                    for name in _ARRAYS
+                }
+            )
+        except FileNotFoundError as e:
+            raise SpaceTradersApiException(f"No galaxy store in {directory}") from e
+
+    def string(self, string_id: int) -> str:
+        return self.strings[string_id].decode()
+
+    def string_id(self, string: str) -> int:
+        """
+        Id of an interned string, or -1 if the store has never seen it
+        """
+        key = string.encode()
+        i = int(np.searchsorted(self.strings, key))
+        return i if i < len(self.strings) and self.strings[i] == key else -1
+
+    def system_index(self, symbol: str) -> int:
+        symbol_id = self.string_id(symbol)
+        i = int(np.searchsorted(self.systems["symbol"], symbol_id))
+        if (
+            symbol_id < 0
+            or i >= len(self.systems)
+            or self.systems["symbol"][i] != symbol_id
+        ):
+            raise SpaceTradersApiException(f"Unknown system {symbol}")
+        return i
+
+    def waypoint_index(self, symbol: str) -> int:
+        symbol_id = self.string_id(symbol)
+        column = self.waypoints["symbol"]
+        i = int(np.searchsorted(column, symbol_id, sorter=self.waypoint_order))
+        if (
+            symbol_id < 0
+            or i >= len(column)
+            or column[self.waypoint_order[i]] != symbol_id
+        ):
+            raise SpaceTradersApiException(f"Unknown waypoint {symbol}")
+        return int(self.waypoint_order[i])
+
+    def system_waypoints(self, symbol: str) -> np.ndarray:
+        """
+        Structured array view of the waypoints of one system
+        """
+        i = self.system_index(symbol)
+        return self.waypoints[self.waypoint_offsets[i] : self.waypoint_offsets[i + 1]]
+
+    def waypoint(self, symbol: str) -> Waypoint:
+        return self._waypoint(self.waypoint_index(symbol))
+
+    def _waypoint(self, row: int) -> Waypoint:
+        record = self.waypoints[row]
+        orbitals = self.orbitals[
+            self.orbital_offsets[row] : self.orbital_offsets[row + 1]
+        ]
+        return Waypoint(
+            symbol=self.string(record["symbol"]),
+            type=self.string(record["type"]),
+            x=int(record["x"]),
+            y=int(record["y"]),
+            orbitals=[Reference(symbol=self.string(o)) for o in orbitals],
+        )
+
+    def system(self, symbol: str) -> System:
+        """
+        Materialise a single System model from the arrays
+        """
+        i = self.system_index(symbol)
+        record = self.systems[i]
+        factions = self.factions[self.faction_offsets[i] : self.faction_offsets[i + 1]]
+        return System(
+            symbol=symbol,
+            sectorSymbol=self.string(record["sector"]),
+            type=self.string(record["type"]),
+            x=int(record["x"]),
+            y=int(record["y"]),
+            waypoints=[
+                self._waypoint(row)
+                for row in range(self.waypoint_offsets[i], self.waypoint_offsets[i + 1])
+            ],
+            factions=[Reference(symbol=self.string(f)) for f in factions],
+        )
@@ -0,0 +1,453 @@
+import datetime
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+from spacetraders_api.exceptions import SpaceTradersApiException
+from spacetraders_api.models import Market, Ship
+
+SUPPLY_LEVELS = ("SCARCE", "LIMITED", "MODERATE", "HIGH", "ABUNDANT")
+ACTIVITY_LEVELS = ("WEAK", "GROWING", "STRONG", "RESTRICTED")
+TRADE_TYPES = ("EXPORT", "IMPORT", "EXCHANGE")
+
+# One row per good per market snapshot. Timestamps are epoch milliseconds, string columns hold
+# ids into the append-only strings file and enum columns index the tuples above (-1 if unknown).
+MARKET_DTYPE = np.dtype(
+    [
+        ("timestamp", np.int64),
+        ("waypoint", np.int32),
+        ("good", np.int32),
+        ("purchase", np.int32),
+        ("sell", np.int32),
+        ("volume", np.int32),
+        ("supply", np.int8),
+        ("activity", np.int8),
+        ("type", np.int8),
+    ]
+)
+WINDOW_DTYPE = np.dtype(
+    [
+        ("waypoint", np.int32),
+        ("count", np.int64),
+        ("purchase_min", np.int32),
+        ("purchase_max", np.int32),
+        ("purchase_mean", np.float64),
+        ("sell_min", np.int32),
+        ("sell_max", np.int32),
+        ("sell_mean", np.float64),
+    ]
+)
+
+_ROWS = "rows.bin"
+_STRINGS = "strings.txt"
+# Rows appended since the last index build are scanned linearly until there are this many,
+# or an eighth of the indexed rows, whichever is larger
+_MIN_TAIL = 65536
+
+Moment = Union[datetime.datetime, float, None]
+
+
+def _ms(moment: Moment, default: int) -> int:
+    if moment is None:
+        return default
+    if isinstance(moment, datetime.datetime):
+        return int(moment.timestamp() * 1000)
+    return int(moment * 1000)
+
+
+def _get(record, name: str, default=None):
+    # Models, lazy models and the plain dicts of decode_mode("raw") alike
+    if isinstance(record, dict):
+        return record.get(name, default)
+    return getattr(record, name, default)
+
+
+def _timestamp(moment) -> float:
+    if isinstance(moment, str):
+        moment = datetime.datetime.fromisoformat(moment.replace("Z", "+00:00"))
+    return moment.timestamp()
+
+
+def _level(levels: Tuple[str, ...], value: Optional[str]) -> int:
+    return levels.index(value) if value in levels else -1
+
+
+class _Index:
+    """
+    Row numbers grouped by key id in append order, with CSR offsets per key id
+    """
+
+    def __init__(self, order: np.ndarray, offsets: np.ndarray):
+        self.order = order
+        self.offsets = offsets
+
+    @property
+    def covered(self) -> int:
+        return len(self.order)
+
+    @classmethod
+    def build(cls, rows: np.ndarray, key: str, key_count: int) -> "_Index":
+        order = np.argsort(rows[key], kind="stable").astype(np.int64)
+        counts = np.bincount(rows[key], minlength=key_count)
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(order, offsets)
+
+    @classmethod
+    def load(cls, directory: str, key: str) -> Optional["_Index"]:
+        try:
+            order = np.load(os.path.join(directory, f"{key}_order.npy"), mmap_mode="r")
+            offsets = np.load(os.path.join(directory, f"{key}_offsets.npy"))
+        except (FileNotFoundError, ValueError):
+            return None
+        # Both files are replaced separately, a mismatch means a rebuild was interrupted
+        return cls(order, offsets) if offsets[-1] == len(order) else None
+
+    def save(self, directory: str, key: str):
+        for name, array in (("order", self.order), ("offsets", self.offsets)):
+            path = os.path.join(directory, f"{key}_{name}.npy")
+            np.save(path + ".tmp.npy", array)
+            os.replace(path + ".tmp.npy", path)
+
+    def rows(self, key_id: int) -> np.ndarray:
+        if key_id < 0 or key_id + 1 >= len(self.offsets):
+            return self.order[:0]
+        return self.order[self.offsets[key_id] : self.offsets[key_id + 1]]
+
+
+class MarketStore:
+    def __init__(self, directory: str):
+        """
+        Append-only columnar store of market prices.
+        Rows live in a flat binary file of MARKET_DTYPE records that is memory-mapped for reading,
+        so the store can grow to millions of rows without being loaded. Per-good and per-waypoint
+        indexes are saved next to it and rebuilt once enough unindexed rows have been appended.
+        One process appends; others may open the same directory and call refresh() to see new rows.
+        :param directory: Store directory, created if missing
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._rows_path = os.path.join(directory, _ROWS)
+        self._strings_path = os.path.join(directory, _STRINGS)
+        self._strings: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._rows = np.empty(0, dtype=MARKET_DTYPE)
+        self._by_good: Optional[_Index] = None
+        self._by_waypoint: Optional[_Index] = None
+        for path in (self._rows_path, self._strings_path):
+            open(path, "ab").close()
+        self.refresh()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def rows(self) -> np.ndarray:
+        """
+        Every row in append order, as a read-only memory-mapped structured array
+        """
+        return self._rows
+
+    def refresh(self):
+        """
+        Pick up rows and strings appended since the store was opened, by this or another process
+        """
+        with self._lock:
+            with open(self._strings_path, encoding="utf-8") as file:
+                file.seek(0)
+                lines = file.read().split("\n")
+            # The last line is only complete once it is followed by a newline
+            for string in lines[len(self._strings) : -1]:
+                self._ids[string] = len(self._strings)
+                self._strings.append(string)
+            count = os.path.getsize(self._rows_path) // MARKET_DTYPE.itemsize
+            if count != len(self._rows):
+                self._rows = (
+                    np.memmap(
+                        self._rows_path, dtype=MARKET_DTYPE, mode="r", shape=count
+                    )
+                    if count
+                    else np.empty(0, dtype=MARKET_DTYPE)
+                )
+            self._ensure_indexes()
+
+    def _ensure_indexes(self):
+        if self._by_good is None:
+            self._by_good = _Index.load(self.directory, "good")
+            self._by_waypoint = _Index.load(self.directory, "waypoint")
+        indexed = min(
+            self._by_good.covered if self._by_good else -1,
+            self._by_waypoint.covered if self._by_waypoint else -1,
+        )
+        tail = len(self._rows) - indexed
+        if indexed < 0 or tail < 0 or tail > max(_MIN_TAIL, indexed // 8):
+            self.reindex()
+
+    def reindex(self):
+        """
+        Index every row now instead of waiting for the unindexed tail to grow
+        """
+        with self._lock:
+            rows = self._rows
+            key_count = len(self._strings)
+            self._by_good = _Index.build(rows, "good", key_count)
+            self._by_waypoint = _Index.build(rows, "waypoint", key_count)
+            self._by_good.save(self.directory, "good")
+            self._by_waypoint.save(self.directory, "waypoint")
+
+    def string(self, string_id: int) -> str:
+        return self._strings[string_id]
+
+    def string_id(self, string: str) -> int:
+        """
+        Id of an interned symbol, or -1 if the store has never seen it
+        """
+        return self._ids.get(string, -1)
+
+    def _intern(self, strings: Iterable[str], new: List[str]) -> List[int]:
+        ids = []
+        for string in strings:
+            string_id = self._ids.get(string)
+            if string_id is None:
+                if "\n" in string:
+                    raise SpaceTradersApiException(f"Invalid symbol {string!r}")
+                string_id = self._ids[string] = len(self._strings)
+                self._strings.append(string)
+                new.append(string)
+            ids.append(string_id)
+        return ids
+
+    def append_rows(self, rows: Iterable[Tuple]):
+        """
+        Append rows of (timestamp ms, waypoint, good, purchase, sell, volume, supply, activity, type)
+        with waypoint and good as symbols and the enums as strings
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        with self._lock:
+            # Single appender, so the interned strings are already current
+            new = []
+            waypoints = self._intern((row[1] for row in rows), new)
+            goods = self._intern((row[2] for row in rows), new)
+            array = np.empty(len(rows), dtype=MARKET_DTYPE)
+            array["timestamp"] = [row[0] for row in rows]
+            array["waypoint"] = waypoints
+            array["good"] = goods
+            for column, position in (("purchase", 3), ("sell", 4), ("volume", 5)):
+                array[column] = [row[position] for row in rows]
+            for column, position, levels in (
+                ("supply", 6, SUPPLY_LEVELS),
+                ("activity", 7, ACTIVITY_LEVELS),
+                ("type", 8, TRADE_TYPES),
+            ):
+                array[column] = [_level(levels, row[position]) for row in rows]
+            # Strings first, so a concurrent reader never sees a row with an unknown id
+            if new:
+                with open(self._strings_path, "a", encoding="utf-8") as file:
+                    file.write("".join(string + "\n" for string in new))
+            with open(self._rows_path, "ab") as file:
+                array.tofile(file)
+            self.refresh()
+
+    def append_market(self, market: Market, timestamp: Moment = None) -> int:
+        """
+        Append a snapshot of a market's trade goods
+        :param timestamp: (optional) When the prices were seen, now by default
+        :return: Number of rows appended, 0 if no ship was at the market to see prices
+        """
+        stamp = _ms(timestamp, int(time.time() * 1000))
+        goods = _get(market, "tradeGoods") or []
+        market_symbol = _get(market, "symbol")
+        self.append_rows(
+            (
+                stamp,
+                market_symbol,
+                _get(good, "symbol"),
+                _get(good, "purchasePrice"),
+                _get(good, "sellPrice"),
+                _get(good, "tradeVolume"),
+                _get(good, "supply"),
+                _get(good, "activity"),
+                _get(good, "type"),
+            )
+            for good in goods
+        )
+        return len(goods)
+
+    def _select(self, index: _Index, key: str, key_id: int) -> np.ndarray:
+        """
+        Rows with `key` == key_id in append order: indexed ones, then the unindexed tail
+        """
+        indexed = self._rows[index.rows(key_id)]
+        tail = self._rows[index.covered :]
+        tail = tail[tail[key] == key_id]
+        if not len(tail):
+            return indexed
+        return np.concatenate((indexed, tail))
+
+    def _good_rows(
+        self, good: str, since: Moment, until: Moment, waypoint: str = None
+    ) -> np.ndarray:
+        good_id = self.string_id(good)
+        if good_id < 0:
+            return self._rows[:0]
+        if waypoint is not None:
+            rows = self._select(self._by_waypoint, "waypoint", self.string_id(waypoint))
+            rows = rows[rows["good"] == good_id]
+        else:
+            rows = self._select(self._by_good, "good", good_id)
+        start, end = _ms(since, np.iinfo(np.int64).min), _ms(
+            until, np.iinfo(np.int64).max
+        )
+        stamps = rows["timestamp"]
+        return rows[(stamps >= start) & (stamps < end)]
+
+    def history(
+        self,
+        good: str,
+        waypoint: str = None,
+        since: Moment = None,
+        until: Moment = None,
+    ) -> np.ndarray:
+        """
+        Rows of a good in time order, optionally at one waypoint and within [since, until)
+        """
+        rows = self._good_rows(good, since, until, waypoint)
+        return rows[np.argsort(rows["timestamp"], kind="stable")]
+
+    def latest(self, good: str, since: Moment = None) -> np.ndarray:
+        """
+        Most recent row of a good at every waypoint that trades it
+        :param since: (optional) Ignore waypoints whose last price is older than this
+        """
+        rows = self._good_rows(good, since, None)
+        if not len(rows):
+            return rows
+        rows = rows[np.lexsort((rows["timestamp"], rows["waypoint"]))]
+        last = np.ones(len(rows), dtype=bool)
+        last[:-1] = rows["waypoint"][1:] != rows["waypoint"][:-1]
+        return rows[last]
+
+    def latest_prices(
+        self, good: str, since: Moment = None
+    ) -> Dict[str, Tuple[int, int]]:
+        """
+        {waypoint symbol: (purchase price, sell price)} from latest()
+        """
+        return {
+            self._strings[row["waypoint"]]: (int(row["purchase"]), int(row["sell"]))
+            for row in self.latest(good, since)
+        }
+
+    def window(
+        self,
+        good: str,
+        since: Moment = None,
+        until: Moment = None,
+        waypoint: str = None,
+    ) -> np.ndarray:
+        """
+        Per-waypoint count, min, max and mean of purchase and sell prices within [since, until)
+        :return: Structured array of WINDOW_DTYPE sorted by waypoint id
+        """
+        rows = self._good_rows(good, since, until, waypoint)
+        result = np.empty(0, dtype=WINDOW_DTYPE)
+        if not len(rows):
+            return result
+        rows = rows[np.argsort(rows["waypoint"], kind="stable")]
+        waypoints, starts, counts = np.unique(
+            rows["waypoint"], return_index=True, return_counts=True
+        )
+        result = np.empty(len(waypoints), dtype=WINDOW_DTYPE)
+        result["waypoint"] = waypoints
+        result["count"] = counts
+        for column in ("purchase", "sell"):
+            values = rows[column]
+            result[f"{column}_min"] = np.minimum.reduceat(values, starts)
+            result[f"{column}_max"] = np.maximum.reduceat(values, starts)
+            result[f"{column}_mean"] = (
+                np.add.reduceat(values.astype(np.int64), starts) / counts
+            )
+        return result
+
+
+class MarketCollector:
+    def __init__(self, api, store: MarketStore, min_interval: float = 60.0):
+        """
+        Snapshots the markets our ships are at into a MarketStore.
+        Prices are timestamped with the server clock of the api.
+        :param api: SpaceTradersApi, in any decode mode
+        :param min_interval: Seconds before the same market is snapshotted again
+        """
+        self.api = api
+        self.store = store
+        self.min_interval = min_interval
+        self._collected: Dict[str, float] = {}
+        # Whether a waypoint has a marketplace, from its traits; waypoints never gain or lose one
+        self._is_market: Dict[str, bool] = {}
+
+    def collect(self, waypoint_symbol: str) -> Market:
+        """
+        Fetch a market and append its prices to the store
+        """
+        system_symbol = waypoint_symbol.rsplit("-", 1)[0]
+        market = self.api.get_market(system_symbol, waypoint_symbol)
+        now = self.api.server_clock.time()
+        self.store.append_market(market, now)
+        self._collected[waypoint_symbol] = now
+        return market
+
+    def is_market(self, waypoint_symbol: str) -> bool:
+        """
+        Whether a waypoint has the MARKETPLACE trait, looked up once per waypoint
+        (from the api's static cache when it has one)
+        """
+        if waypoint_symbol not in self._is_market:
+            system_symbol = waypoint_symbol.rsplit("-", 1)[0]
+            try:
+                waypoint = self.api.get_waypoint(system_symbol, waypoint_symbol)
+            except SpaceTradersApiException as e:
+                if e.status_code != 404:
+                    raise
+                self._is_market[waypoint_symbol] = False
+            else:
+                self._is_market[waypoint_symbol] = any(
+                    _get(trait, "symbol") == "MARKETPLACE"
+                    for trait in _get(waypoint, "traits") or []
+                )
+        return self._is_market[waypoint_symbol]
+
+    def collect_fleet(self, ships: Iterable[Ship] = None) -> List[Market]:
+        """
+        Snapshot every market a ship is currently at, once per waypoint
+        :param ships: (optional) Ships to look at, all of ours by default
+        """
+        ships = self.api.get_my_ships().data if ships is None else ships
+        now = self.api.server_clock.time()
+        waypoints = set()
+        for ship in ships:
+            nav = _get(ship, "nav")
+            # A ship whose arrival has passed is at its destination, whatever it last said
+            if _get(nav, "status") == "IN_TRANSIT" and (
+                _timestamp(_get(_get(nav, "route"), "arrival")) > now
+            ):
+                continue
+            waypoint_symbol = _get(nav, "waypointSymbol")
+            if now - self._collected.get(waypoint_symbol, -np.inf) >= self.min_interval:
+                waypoints.add(waypoint_symbol)
+        markets = []
+        for waypoint_symbol in sorted(waypoints):
+            if not self.is_market(waypoint_symbol):
+                continue
+            try:
+                markets.append(self.collect(waypoint_symbol))
+            except SpaceTradersApiException as e:
+                # Listed with the trait but gone, never ask again
+                if e.status_code != 404:
+                    raise
+                self._is_market[waypoint_symbol] = False
+        return markets
@@ -0,0 +1,266 @@
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Mapping, Optional, Tuple
+
+from spacetraders_api.endpoints import endpoint_template
+
+# Upper bounds (seconds) of the request latency histogram buckets, +Inf is implied
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Rate limit response headers exported as gauges
+RATE_LIMIT_HEADERS = {
+    "x-ratelimit-limit-per-second": "limit_per_second",
+    "x-ratelimit-limit-burst": "limit_burst",
+    "x-ratelimit-burst-time": "burst_time",
+    "x-ratelimit-remaining": "remaining",
+}
+
+
+class _EndpointStats:
+    __slots__ = ("statuses", "errors", "buckets", "seconds", "bytes_in", "bytes_out")
+
+    def __init__(self):
+        self.statuses: Dict[int, int] = {}
+        self.errors = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.seconds = 0.0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    @property
+    def count(self) -> int:
+        return sum(self.buckets)
+
+    def quantile(self, q: float) -> float:
+        """
+        Upper bound of the bucket holding the q-quantile (inf if it falls past the last bucket)
+        """
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else float("inf")
+        return 0.0
+
+
+class Metrics:
+    def __init__(self, namespace: str = "spacetraders"):
+        """
+        Request, decoding and rate limit instrumentation of a client.
+        Requests are grouped by method and endpoint template (/my/ships/{shipSymbol}/navigate),
+        never by symbol, so the number of series stays bounded.
+        Clients without a Metrics object skip every measurement.
+        :param namespace: Prefix of the exported Prometheus metric names
+        """
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._endpoints: Dict[Tuple[str, str], _EndpointStats] = {}
+        # stage (json or model) -> name -> [count, seconds]
+        self._decode: Dict[str, Dict[str, list]] = {"json": {}, "model": {}}
+        self._rate_limit: Dict[str, float] = {}
+
+    def _stats(self, http_method: str, endpoint: str) -> _EndpointStats:
+        # Called with the lock held
+        key = (http_method, endpoint_template(endpoint))
+        stats = self._endpoints.get(key)
+        if stats is None:
+            stats = self._endpoints[key] = _EndpointStats()
+        return stats
+
+    def observe_request(
+        self,
+        http_method: str,
+        endpoint: str,
+        status_code: int,
+        seconds: float,
+        bytes_out: int = 0,
+        bytes_in: int = 0,
+    ):
+        """
+        Record one HTTP exchange, seconds being the time spent on the network
+        """
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            stats = self._stats(http_method, endpoint)
+            stats.statuses[status_code] = stats.statuses.get(status_code, 0) + 1
+            stats.buckets[bucket] += 1
+            stats.seconds += seconds
+            stats.bytes_out += bytes_out
+            stats.bytes_in += bytes_in
+
+    def observe_error(self, http_method: str, endpoint: str):
+        """
+        Record a request that failed without a response (connection error, timeout)
+        """
+        with self._lock:
+            self._stats(http_method, endpoint).errors += 1
+
+    def observe_decode(self, stage: str, name: str, seconds: float):
+        """
+        Record time spent decoding, stage is "json" (bytes to dicts) or "model" (dicts to models)
+        """
+        with self._lock:
+            entry = self._decode[stage].get(name)
+            if entry is None:
+                entry = self._decode[stage][name] = [0, 0.0]
+            entry[0] += 1
+            entry[1] += seconds
+
+    def observe_rate_limit(self, headers: Optional[Mapping[str, str]]):
+        if not headers:
+            return
+        gauges = {}
+        for header, name in RATE_LIMIT_HEADERS.items():
+            value = headers.get(header)
+            if value is not None:
+                try:
+                    gauges[name] = float(value)
+                except ValueError:
+                    pass
+        if gauges:
+            with self._lock:
+                self._rate_limit.update(gauges)
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._decode = {"json": {}, "model": {}}
+            self._rate_limit.clear()
+
+    def snapshot(self) -> Dict:
+        """
+        Copy of every metric as plain dicts, requests keyed by "METHOD /endpoint/{template}"
+        """
+        with self._lock:
+            requests = {}
+            for (http_method, template), stats in self._endpoints.items():
+                count = stats.count
+                requests[f"{http_method} {template}"] = {
+                    "count": count,
+                    "errors": stats.errors,
+                    "statuses": dict(stats.statuses),
+                    "seconds": stats.seconds,
+                    "mean": stats.seconds / count if count else 0.0,
+                    "p50": stats.quantile(0.5),
+                    "p99": stats.quantile(0.99),
+                    "buckets": dict(
+                        zip(LATENCY_BUCKETS + (float("inf"),), stats.buckets)
+                    ),
+                    "bytes_in": stats.bytes_in,
+                    "bytes_out": stats.bytes_out,
+                }
+            decode = {
+                stage: {
+                    name: {"count": count, "seconds": seconds}
+                    for name, (count, seconds) in entries.items()
+                }
+                for stage, entries in self._decode.items()
+            }
+            network = sum(stats.seconds for stats in self._endpoints.values())
+            return {
+                "requests": requests,
+                "decode": decode,
+                "rate_limit": dict(self._rate_limit),
+                "seconds": {
+                    "network": network,
+                    "json": sum(s for _, s in self._decode["json"].values()),
+                    "model": sum(s for _, s in self._decode["model"].values()),
+                },
+            }
+
+    def prometheus(self) -> str:
+        """
+        Every metric in the Prometheus text exposition format
+        """
+        ns = self.namespace
+        lines = []
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+
+            lines.append(f"# TYPE {ns}_requests_total counter")
+            for (http_method, template), stats in endpoints:
+                for status_code, count in sorted(stats.statuses.items()):
+                    lines.append(
+                        f'{ns}_requests_total{{method="{http_method}",endpoint="{template}",'
+                        f'status="{status_code}"}} {count}'
+                    )
+            lines.append(f"# TYPE {ns}_request_errors_total counter")
+            for (http_method, template), stats in endpoints:
+                lines.append(
+                    f'{ns}_request_errors_total{{method="{http_method}",endpoint="{template}"}} '
+                    f"{stats.errors}"
+                )
+
+            lines.append(f"# TYPE {ns}_request_duration_seconds histogram")
+            for (http_method, template), stats in endpoints:
+                labels = f'method="{http_method}",endpoint="{template}"'
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                    cumulative += count
+                    lines.append(
+                        f'{ns}_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}'
+                    )
+                cumulative += stats.buckets[-1]
+                lines.append(
+                    f'{ns}_request_duration_seconds_bucket{{{labels},le="+Inf"}} {cumulative}'
+                )
+                lines.append(
+                    f"{ns}_request_duration_seconds_sum{{{labels}}} {stats.seconds}"
+                )
+                lines.append(
+                    f"{ns}_request_duration_seconds_count{{{labels}}} {cumulative}"
+                )
+
+            for direction in ("in", "out"):
+                lines.append(f"# TYPE {ns}_bytes_{direction}_total counter")
+                for (http_method, template), stats in endpoints:
+                    value = stats.bytes_in if direction == "in" else stats.bytes_out
+                    lines.append(
+                        f'{ns}_bytes_{direction}_total{{method="{http_method}",endpoint="{template}"}} '
+                        f"{value}"
+                    )
+
+            decodes = [
+                (f'stage="{stage}",name="{name}"', count, seconds)
+                for stage, entries in sorted(self._decode.items())
+                for name, (count, seconds) in sorted(entries.items())
+            ]
+            lines.append(f"# TYPE {ns}_decode_seconds_total counter")
+            for labels, _, seconds in decodes:
+                lines.append(f"{ns}_decode_seconds_total{{{labels}}} {seconds}")
+            lines.append(f"# TYPE {ns}_decode_total counter")
+            for labels, count, _ in decodes:
+                lines.append(f"{ns}_decode_total{{{labels}}} {count}")
+
+            for name, value in sorted(self._rate_limit.items()):
+                lines.append(f"# TYPE {ns}_rate_limit_{name} gauge")
+                lines.append(f"{ns}_rate_limit_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int = 9108, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Serve prometheus() on http://host:port/metrics from a daemon thread
+        :return: The server, call shutdown() on it to stop
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
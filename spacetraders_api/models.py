@@ -1,3 +1,4 @@
+import copy
 import os
 import datetime
 from typing import List, Dict, Optional, Union, TypeVar
@@ -27,6 +28,14 @@ class Result:
         self.message = str(message)
         self.data = data if data else []
 
+    def copy(self) -> "Result":
+        """
+        Copy whose data can be modified without affecting this result
+        """
+        return Result(
+            self.status_code, self.headers, self.message, copy.deepcopy(self.data)
+        )
+
 
 class Reference(BaseModel):
     symbol: str
@@ -301,11 +310,7 @@ class AcceptContractResult(BaseModel):
 
 
 class ChangeShipStatusResponse(BaseModel):
-    systemSymbol: str
-    waypointSymbol: str
-    route: ShipRoute
-    status: str
-    flightMode: str
+    nav: ShipNav
 
 
 class ChangeShipFlightModeResponse(BaseModel):
@@ -333,3 +338,46 @@ class ShipNavigationResponse(BaseModel):
 class DeliverCargoToContractResponse(BaseModel):
     contract: Contract
     cargo: ShipCargo
+
+
+class MarketTransaction(BaseModel):
+    waypointSymbol: str
+    shipSymbol: str
+    tradeSymbol: str
+    type: str
+    units: int
+    pricePerUnit: int
+    totalPrice: int
+    timestamp: datetime.datetime
+
+
+class RefuelShipResponse(BaseModel):
+    agent: Agent
+    fuel: ShipFuel
+    transaction: MarketTransaction
+
+
+class TradeGood(BaseModel):
+    symbol: str
+    name: str
+    description: str
+
+
+class MarketTradeGood(BaseModel):
+    symbol: str
+    type: str
+    tradeVolume: int
+    supply: str
+    activity: Optional[str] = None
+    purchasePrice: int
+    sellPrice: int
+
+
+class Market(BaseModel):
+    symbol: str
+    exports: List[TradeGood]
+    imports: List[TradeGood]
+    exchange: List[TradeGood]
+    # Prices and recent transactions are only shown while one of your ships is at the market
+    transactions: Optional[List[MarketTransaction]] = None
+    tradeGoods: Optional[List[MarketTradeGood]] = None
@@ -0,0 +1,83 @@
+import asyncio
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Awaitable, Callable, Iterator
+from spacetraders_api.models import SearchResultPaginated
+
+# Largest page the SpaceTraders API will serve
+MAX_PAGE_SIZE = 20
+
+
+def _page_count(first: SearchResultPaginated) -> int:
+    return max(1, math.ceil(first.meta.total / max(1, first.meta.limit)))
+
+
+def iter_pages(
+    fetch_page: Callable[[int, int], SearchResultPaginated],
+    page_size: int = MAX_PAGE_SIZE,
+    prefetch: int = 4,
+) -> Iterator:
+    """
+    Yield every item of a paginated endpoint, fetching up to `prefetch` pages ahead on worker threads.
+    At most prefetch + 1 pages are held in memory at any time.
+    :param fetch_page: Callable taking (page, limit) and returning a SearchResultPaginated
+    :param page_size: Items requested per page
+    :param prefetch: Number of pages requested ahead of the one being consumed
+    """
+    first = fetch_page(1, page_size)
+    pages = _page_count(first)
+    if pages == 1 or prefetch < 1:
+        yield from first.data
+        for page in range(2, pages + 1):
+            yield from fetch_page(page, page_size).data
+        return
+
+    pool = ThreadPoolExecutor(max_workers=prefetch)
+    window = deque()
+    next_page = 2
+    try:
+        while next_page <= pages and len(window) < prefetch:
+            window.append(pool.submit(fetch_page, next_page, page_size))
+            next_page += 1
+        yield from first.data
+        del first
+        while window:
+            result = window.popleft().result()
+            if next_page <= pages:
+                window.append(pool.submit(fetch_page, next_page, page_size))
+                next_page += 1
+            yield from result.data
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def aiter_pages(
+    fetch_page: Callable[[int, int], Awaitable[SearchResultPaginated]],
+    page_size: int = MAX_PAGE_SIZE,
+    prefetch: int = 4,
+) -> AsyncIterator:
+    """
+    asyncio twin of iter_pages, the prefetched pages are tasks instead of threads
+    """
+    first = await fetch_page(1, page_size)
+    pages = _page_count(first)
+    window = deque()
+    next_page = 2
+    try:
+        while next_page <= pages and len(window) < max(prefetch, 1):
+            window.append(asyncio.ensure_future(fetch_page(next_page, page_size)))
+            next_page += 1
+        for item in first.data:
+            yield item
+        del first
+        while window:
+            result = await window.popleft()
+            if next_page <= pages:
+                window.append(asyncio.ensure_future(fetch_page(next_page, page_size)))
+                next_page += 1
+            for item in result.data:
+                yield item
+    finally:
+        for task in window:
+            task.cancel()
@@ -0,0 +1,157 @@
+import time
+import threading
+import datetime
+from typing import Dict, Mapping, Optional
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter modelled on the SpaceTraders limits: a steady per-second
+    rate plus a burst pool that refills over the burst window.
+    The limits are refreshed from the x-ratelimit-* response headers.
+    """
+
+    _shared: Dict[str, "RateLimiter"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        per_second: float = 2.0,
+        burst: int = 30,
+        burst_time: float = 60.0,
+        clock=time.monotonic,
+    ):
+        """
+        Constructor for RateLimiter
+        :param per_second: Steady requests per second
+        :param burst: Size of the burst pool
+        :param burst_time: Seconds it takes the burst pool to fully refill
+        :param clock: (optional) Monotonic clock, replaceable for testing
+        """
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.per_second = float(per_second)
+        self.burst = int(burst)
+        self.burst_time = float(burst_time)
+        self._steady = self.per_second
+        self._burst = float(self.burst)
+        self._blocked_until = 0.0
+        self._updated = clock()
+
+    @classmethod
+    def for_token(cls, access_token: str, **kwargs) -> "RateLimiter":
+        """
+        Return the limiter shared by every client that uses the same token
+        :param access_token: Agent token (an empty string means the anonymous/IP budget)
+        :param kwargs: Constructor arguments used when the limiter is first created
+        """
+        with cls._shared_lock:
+            limiter = cls._shared.get(access_token)
+            if limiter is None:
+                limiter = cls._shared[access_token] = cls(**kwargs)
+            return limiter
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._steady = min(
+                self.per_second, self._steady + elapsed * self.per_second
+            )
+            self._burst = min(
+                float(self.burst), self._burst + elapsed * self.burst / self.burst_time
+            )
+            self._updated = now
+
+    def reserve(self) -> float:
+        """
+        Take one request slot and return how long the caller has to wait before sending.
+        Waits are reserved, so concurrent callers are queued behind each other instead of racing.
+        """
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            delay = max(0.0, self._blocked_until - now)
+            if delay == 0.0 and self._steady >= 1:
+                self._steady -= 1
+                return 0.0
+            if delay == 0.0 and self._burst >= 1:
+                self._burst -= 1
+                return 0.0
+            # Queue on the steady rate, the debt is paid back by _refill
+            self._steady -= 1
+            return max(delay, -self._steady / self.per_second)
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def estimate_wait(self) -> float:
+        """
+        Seconds until a slot would be free, without reserving it
+        """
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            delay = max(0.0, self._blocked_until - now)
+            if self._steady >= 1 or self._burst >= 1:
+                return delay
+            return max(delay, (1 - self._steady) / self.per_second)
+
+    def penalize(self, retry_after: float):
+        """
+        Block every caller for retry_after seconds, used after a 429 response
+        """
+        with self._lock:
+            now = self._clock()
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+            self._steady = min(self._steady, 0.0)
+            self._burst = 0.0
+
+    def update(self, headers: Optional[Mapping[str, str]]):
+        """
+        Align the limiter with the x-ratelimit-* headers of a response
+        """
+        if not headers or "x-ratelimit-limit-per-second" not in headers:
+            return
+        try:
+            per_second = float(headers["x-ratelimit-limit-per-second"])
+            burst = int(headers.get("x-ratelimit-limit-burst", self.burst))
+            burst_time = float(headers.get("x-ratelimit-burst-time", self.burst_time))
+            remaining = headers.get("x-ratelimit-remaining")
+            remaining = int(remaining) if remaining is not None else None
+        except ValueError:
+            return
+        with self._lock:
+            self._refill(self._clock())
+            self.per_second = per_second or self.per_second
+            self.burst = burst
+            self.burst_time = burst_time or self.burst_time
+            self._steady = min(self._steady, self.per_second)
+            # Requests from other processes share the budget, trust the server when it knows less
+            if remaining is not None:
+                self._burst = min(self._burst, float(remaining))
+
+
+def parse_retry_after(headers: Optional[Mapping[str, str]], body: Dict = None) -> float:
+    """
+    Seconds to wait after a 429, from the Retry-After header or the error payload
+    """
+    value = headers.get("retry-after") if headers else None
+    if value is not None:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                retry_at = datetime.datetime.strptime(
+                    value, "%a, %d %b %Y %H:%M:%S GMT"
+                ).replace(tzinfo=datetime.timezone.utc)
+            except ValueError:
+                pass
+            else:
+                now = datetime.datetime.now(datetime.timezone.utc)
+                return max(0.0, (retry_at - now).total_seconds())
+    try:
+        return max(0.0, float(body["error"]["data"]["retryAfter"]))
+    except (KeyError, TypeError, ValueError):
+        return 1.0
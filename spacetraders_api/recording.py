@@ -0,0 +1,422 @@
+import asyncio
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import formatdate, parsedate_to_datetime
+from typing import AsyncIterator, Dict, Iterator, List, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from requests.structures import CaseInsensitiveDict
+from spacetraders_api.exceptions import TransportError
+from spacetraders_api.transport import StreamingResponse, Timeout, TransportResponse
+
+MAGIC = b"STREC1\n"
+# Each record: metadata length, request body length, response body length,
+# then the three byte strings. Metadata is compact JSON.
+_RECORD_HEADER = struct.Struct("<III")
+
+
+def _records(buffer, size: int) -> Iterator[Tuple[int, int, int, int]]:
+    """
+    (metadata, request body, response body, end) offsets of every complete record in buffer
+    """
+    position = len(MAGIC)
+    while position + _RECORD_HEADER.size <= size:
+        meta_len, request_len, response_len = _RECORD_HEADER.unpack_from(
+            buffer, position
+        )
+        meta_at = position + _RECORD_HEADER.size
+        request_at = meta_at + meta_len
+        response_at = request_at + request_len
+        end = response_at + response_len
+        if end > size:
+            return
+        yield meta_at, request_at, response_at, end
+        position = end
+
+
+def request_key(method: str, url: str, params: Dict = None) -> Tuple:
+    """
+    Host-independent lookup key of a request: method, path and sorted query parameters
+    """
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query)
+    if params:
+        query.extend((str(k), str(v)) for k, v in params.items() if v is not None)
+    return method.upper(), parts.path, tuple(sorted(query))
+
+
+class RecordedExchange:
+    __slots__ = ("meta", "_buffer", "_request_at", "_response_at", "_end")
+
+    def __init__(self, meta: Dict, buffer, request_at: int, response_at: int, end: int):
+        self.meta = meta
+        self._buffer = buffer
+        self._request_at = request_at
+        self._response_at = response_at
+        self._end = end
+
+    @property
+    def key(self) -> Tuple:
+        return request_key(self.meta["method"], self.meta["url"], self.meta["params"])
+
+    @property
+    def elapsed(self) -> float:
+        """
+        Seconds the live request took
+        """
+        return self.meta["elapsed"]
+
+    @property
+    def request_content(self) -> bytes:
+        return bytes(self._buffer[self._request_at : self._response_at])
+
+    def response(self) -> TransportResponse:
+        return TransportResponse(
+            self.meta["status"],
+            reason=self.meta["reason"],
+            headers=CaseInsensitiveDict(self.meta["headers"]),
+            content=bytes(self._buffer[self._response_at : self._end]),
+        )
+
+
+class Recording:
+    def __init__(self, path: str):
+        """
+        Read-only view of a recording file, memory-mapped so only the metadata is parsed up front.
+        Bodies are copied out of the map when a response is replayed.
+        A truncated last record (the recorder was killed mid-write) is ignored.
+        """
+        self.path = path
+        self.exchanges: List[RecordedExchange] = []
+        self._index: Dict[Tuple, List[RecordedExchange]] = {}
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = (
+            mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        )
+        if size and self._map[: len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a SpaceTraders recording")
+        for meta_at, request_at, response_at, end in _records(self._map, size):
+            meta = json.loads(self._map[meta_at:request_at])
+            exchange = RecordedExchange(meta, self._map, request_at, response_at, end)
+            self.exchanges.append(exchange)
+            self._index.setdefault(exchange.key, []).append(exchange)
+
+    def __len__(self) -> int:
+        return len(self.exchanges)
+
+    def lookup(
+        self, method: str, url: str, params: Dict = None
+    ) -> List[RecordedExchange]:
+        """
+        Recorded exchanges of a request in recording order, empty if it was never recorded
+        """
+        return self._index.get(request_key(method, url, params), [])
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+
+class RecordingTransport:
+    def __init__(self, transport, path: str):
+        """
+        Wraps a transport and appends every request/response pair, headers included, to `path`.
+        Streamed downloads are passed through without being recorded.
+        :param transport: Transport doing the real requests, e.g. RequestsTransport()
+        :param path: Recording file, created if missing and appended to otherwise.
+        A truncated last record (the recorder was killed mid-write) is cut off first.
+        """
+        self._transport = transport
+        self._lock = threading.Lock()
+        self._file = open(path, "a+b")
+        size = self._file.tell()
+        complete = 0
+        if size >= len(MAGIC):
+            self._file.seek(0)
+            with mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                if buffer[: len(MAGIC)] != MAGIC:
+                    self._file.close()
+                    raise ValueError(f"{path} is not a SpaceTraders recording")
+                complete = len(MAGIC)
+                for *_, end in _records(buffer, size):
+                    complete = end
+        if complete < size:
+            self._file.truncate(complete)
+        if complete == 0:
+            self._file.write(MAGIC)
+            self._file.flush()
+        self.recorded = 0
+
+    def _append(
+        self,
+        method: str,
+        url: str,
+        params: Dict,
+        content: bytes,
+        response: TransportResponse,
+        started: float,
+        elapsed: float,
+    ):
+        meta = json.dumps(
+            {
+                "method": method,
+                "url": url,
+                "params": params,
+                "time": started,
+                "elapsed": elapsed,
+                "status": response.status_code,
+                "reason": response.reason,
+                "headers": dict(response.headers),
+            },
+            separators=(",", ":"),
+        ).encode()
+        content = content or b""
+        record = (
+            _RECORD_HEADER.pack(len(meta), len(content), len(response.content))
+            + meta
+            + content
+            + response.content
+        )
+        with self._lock:
+            # One write per record keeps concurrent recorders from interleaving
+            self._file.write(record)
+            self._file.flush()
+            self.recorded += 1
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        params: Dict = None,
+        content: bytes = None,
+        headers: Dict = None,
+        timeout: Timeout = None,
+    ) -> TransportResponse:
+        started = time.time()
+        start = time.perf_counter()
+        response = self._transport.request(
+            method,
+            url,
+            params=params,
+            content=content,
+            headers=headers,
+            timeout=timeout,
+        )
+        elapsed = time.perf_counter() - start
+        self._append(method, url, params, content, response, started, elapsed)
+        return response
+
+    def stream(
+        self, method: str, url: str, timeout: Timeout = None, chunk_size: int = 65536
+    ):
+        return self._transport.stream(
+            method, url, timeout=timeout, chunk_size=chunk_size
+        )
+
+    def close(self):
+        self._transport.close()
+        with self._lock:
+            self._file.close()
+
+
+class AsyncRecordingTransport(RecordingTransport):
+    """
+    RecordingTransport for asyncio transports such as AsyncHttpxTransport
+    """
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        params: Dict = None,
+        content: bytes = None,
+        headers: Dict = None,
+        timeout: Timeout = None,
+    ) -> TransportResponse:
+        started = time.time()
+        start = time.perf_counter()
+        response = await self._transport.request(
+            method,
+            url,
+            params=params,
+            content=content,
+            headers=headers,
+            timeout=timeout,
+        )
+        elapsed = time.perf_counter() - start
+        self._append(method, url, params, content, response, started, elapsed)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+        with self._lock:
+            self._file.close()
+
+
+class ReplayTransport:
+    def __init__(self, recording, speed: float = None, repeat_last: bool = True):
+        """
+        Answers requests from a recording instead of the network.
+        Repeated requests get their recorded responses in order, e.g. successive polls of a ship.
+        :param recording: Recording or path to a recording file
+        :param speed: (optional) None answers instantly. 1.0 reproduces the recorded timing:
+        each response is due as long after the first replayed request as it came after the start
+        of the recording, gaps between requests included. 10.0 replays ten times faster.
+        Date headers are shifted by the time between the recording and the replay, so the
+        server clock keeps the skew that was recorded
+        :param repeat_last: Keep answering with the last recorded response once a request's
+        responses are used up, instead of raising TransportError
+        """
+        self.recording = (
+            recording if isinstance(recording, Recording) else Recording(recording)
+        )
+        self.speed = speed
+        self.repeat_last = repeat_last
+        self._lock = threading.Lock()
+        self._cursors: Dict[Tuple, int] = {}
+        exchanges = self.recording.exchanges
+        self._recorded_start = (
+            min(e.meta["time"] for e in exchanges) if exchanges else 0.0
+        )
+        # Wall time of the first replayed request
+        self._replay_start = None
+        self.replayed = 0
+        self.misses = 0
+
+    def _next(self, method: str, url: str, params: Dict) -> RecordedExchange:
+        exchanges = self.recording.lookup(method, url, params)
+        if not exchanges:
+            self.misses += 1
+            raise TransportError(
+                f"No recorded response for {method} {url} {params}", retryable=False
+            )
+        key = exchanges[0].key
+        with self._lock:
+            cursor = self._cursors.get(key, 0)
+            if cursor >= len(exchanges):
+                if not self.repeat_last:
+                    self.misses += 1
+                    raise TransportError(
+                        f"Recorded responses for {method} {url} {params} are used up",
+                        retryable=False,
+                    )
+                cursor = len(exchanges) - 1
+            self._cursors[key] = cursor + 1
+            self.replayed += 1
+            if self._replay_start is None:
+                self._replay_start = time.time()
+        return exchanges[cursor]
+
+    def _delay(self, exchange: RecordedExchange) -> float:
+        """
+        Seconds until the response is due, on the recorded schedule scaled by speed
+        """
+        if not self.speed:
+            return 0.0
+        recorded = exchange.meta["time"] + exchange.elapsed - self._recorded_start
+        return self._replay_start + recorded / self.speed - time.time()
+
+    def _response(self, exchange: RecordedExchange) -> TransportResponse:
+        response = exchange.response()
+        date = response.headers.get("Date")
+        if date:
+            # Moved to replay time, or the server clock would jump back to the recording
+            try:
+                recorded = parsedate_to_datetime(date).timestamp()
+            except (TypeError, ValueError):
+                return response
+            shift = self._replay_start - self._recorded_start
+            response.headers["Date"] = formatdate(recorded + shift, usegmt=True)
+        return response
+
+    def rewind(self):
+        """
+        Start replaying every request from its first recorded response again
+        """
+        with self._lock:
+            self._cursors.clear()
+            self._replay_start = None
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        params: Dict = None,
+        content: bytes = None,
+        headers: Dict = None,
+        timeout: Timeout = None,
+    ) -> TransportResponse:
+        exchange = self._next(method, url, params)
+        delay = self._delay(exchange)
+        if delay > 0:
+            time.sleep(delay)
+        return self._response(exchange)
+
+    @staticmethod
+    def _chunks(content: bytes, chunk_size: int) -> Iterator[bytes]:
+        for start in range(0, len(content), chunk_size):
+            yield content[start : start + chunk_size]
+
+    @contextmanager
+    def stream(
+        self, method: str, url: str, timeout: Timeout = None, chunk_size: int = 65536
+    ) -> Iterator[StreamingResponse]:
+        response = self.request(method, url, timeout=timeout)
+        yield StreamingResponse(
+            response.status_code,
+            reason=response.reason,
+            headers=response.headers,
+            chunks=self._chunks(response.content, chunk_size),
+        )
+
+    def close(self):
+        self.recording.close()
+
+
+class AsyncReplayTransport(ReplayTransport):
+    """
+    ReplayTransport for AsyncRestAdapter
+    """
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        params: Dict = None,
+        content: bytes = None,
+        headers: Dict = None,
+        timeout: Timeout = None,
+    ) -> TransportResponse:
+        exchange = self._next(method, url, params)
+        delay = self._delay(exchange)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return self._response(exchange)
+
+    @staticmethod
+    async def _achunks(content: bytes, chunk_size: int) -> AsyncIterator[bytes]:
+        for start in range(0, len(content), chunk_size):
+            yield content[start : start + chunk_size]
+
+    @asynccontextmanager
+    async def stream(
+        self, method: str, url: str, timeout: Timeout = None, chunk_size: int = 65536
+    ) -> AsyncIterator[StreamingResponse]:
+        response = await self.request(method, url, timeout=timeout)
+        yield StreamingResponse(
+            response.status_code,
+            reason=response.reason,
+            headers=response.headers,
+            chunks=self._achunks(response.content, chunk_size),
+        )
+
+    async def aclose(self):
+        self.close()
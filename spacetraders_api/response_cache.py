@@ -0,0 +1,140 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+from spacetraders_api.endpoints import endpoint_template
+from spacetraders_api.models import Result
+
+# Seconds a GET response stays fresh, per endpoint template. Endpoints not listed are never cached.
+DEFAULT_TTLS = {
+    "/my/agent": 5.0,
+    "/my/ships": 5.0,
+    "/my/ships/{shipSymbol}": 5.0,
+    "/my/contracts": 10.0,
+    "/my/contracts/{contractId}": 10.0,
+}
+# Ship actions that charge or pay the agent, e.g. /my/ships/{shipSymbol}/refuel
+CREDIT_SHIP_ACTIONS = frozenset(
+    ("refuel", "purchase", "sell", "repair", "scrap", "mounts", "modules", "jump")
+)
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttls: Dict[str, float] = None,
+        clock=time.monotonic,
+    ):
+        """
+        Bounded in-process TTL/LRU cache for GET responses, invalidated by mutations.
+        Results are deep-copied on the way in and out, so callers may modify what they get.
+        A GET that was sent before a mutation invalidated the cache is not stored, see generation.
+        :param max_entries: Responses kept before the least recently used one is evicted
+        :param ttls: (optional) Seconds to cache each endpoint template, replaces DEFAULT_TTLS
+        :param clock: (optional) Monotonic clock, replaceable for testing
+        """
+        self._max_entries = max_entries
+        self._ttls = DEFAULT_TTLS if ttls is None else ttls
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Bumped by every invalidation, a response fetched under an older one may be stale
+        self.generation = 0
+
+    @staticmethod
+    def _key(endpoint: str, ep_params: Dict = None):
+        return endpoint, tuple(sorted(ep_params.items())) if ep_params else ()
+
+    def get(self, endpoint: str, ep_params: Dict = None) -> Optional[Result]:
+        key = self._key(endpoint, ep_params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < self._clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            result = entry[1]
+        # Raw decoding hands the cached data itself to the caller
+        return result.copy()
+
+    def put(
+        self, endpoint: str, ep_params: Dict, result: Result, generation: int = None
+    ):
+        """
+        :param generation: (optional) The generation read before the request was sent,
+        the result is dropped if the cache has been invalidated since
+        """
+        ttl = self._ttls.get(endpoint_template(endpoint))
+        if not ttl:
+            return
+        key = self._key(endpoint, ep_params)
+        # The caller keeps the original, so copy before another thread can see it
+        result = result.copy()
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (self._clock() + ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, endpoint: str, subtree: bool = True):
+        """
+        Drop cached responses of an endpoint, and of everything below it when subtree is True
+        """
+        prefix = endpoint + "/"
+        with self._lock:
+            self.generation += 1
+            stale = [
+                key
+                for key in self._entries
+                if key[0] == endpoint or (subtree and key[0].startswith(prefix))
+            ]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def invalidate_mutation(self, endpoint: str, data: Dict = None):
+        """
+        Drop the responses a POST/PATCH/DELETE on endpoint may have made stale
+        """
+        template = endpoint_template(endpoint)
+        parts = endpoint.split("/")
+        if template.startswith("/my/ships/{shipSymbol}"):
+            self.invalidate(f"/my/ships/{parts[3]}")
+            self.invalidate("/my/ships", subtree=False)
+            if len(parts) > 4 and parts[4] in CREDIT_SHIP_ACTIONS:
+                self.invalidate("/my/agent")
+        elif template.startswith("/my/contracts/{contractId}"):
+            self.invalidate(f"/my/contracts/{parts[3]}")
+            self.invalidate("/my/contracts", subtree=False)
+            self.invalidate("/my/agent")
+            if data and "shipSymbol" in data:
+                self.invalidate(f"/my/ships/{data['shipSymbol']}")
+                self.invalidate("/my/ships", subtree=False)
+        else:
+            self.invalidate("/my")
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+            }
@@ -1,9 +1,26 @@
+import os
+import time
 import requests
 import logging
-from typing import List, Dict
-from json import JSONDecodeError
-from spacetraders_api.exceptions import SpaceTradersApiException
+from typing import List, Dict, Optional
+from spacetraders_api.exceptions import SpaceTradersApiException, TransportError
+from spacetraders_api.retry import CircuitBreaker, RetryPolicy
 from spacetraders_api.models import Result
+from spacetraders_api.rate_limiter import RateLimiter, parse_retry_after
+from spacetraders_api.response_cache import ResponseCache
+from spacetraders_api.codec import default_codec
+from spacetraders_api.single_flight import SingleFlight
+from spacetraders_api.server_clock import ServerClock
+from spacetraders_api.dispatcher import RequestDispatcher
+from spacetraders_api.metrics import Metrics
+from spacetraders_api.endpoints import endpoint_template
+from spacetraders_api.transport import (
+    DEFAULT_TIMEOUT,
+    HttpxTransport,
+    RequestsTransport,
+    Timeout,
+    TransportResponse,
+)
 
 
 class RestAdapter:
@@ -14,6 +31,23 @@ class RestAdapter:
         ver: str = "v2",
         ssl_verify: bool = True,
         logger: logging.Logger = None,
+        pool_size: int = 10,
+        max_connections_per_host: int = 10,
+        timeout: Timeout = None,
+        http2: bool = False,
+        transport=None,
+        rate_limit: bool = True,
+        rate_limiter: RateLimiter = None,
+        max_rate_limit_retries: int = 3,
+        response_cache: ResponseCache = None,
+        codec=None,
+        coalesce_gets: bool = True,
+        dispatcher: RequestDispatcher = None,
+        metrics: Metrics = None,
+        scheme: str = "https",
+        retry_policy: RetryPolicy = None,
+        circuit_breaker: CircuitBreaker = None,
+        fail_fast: bool = True,
     ):
         """
         Constructor for RestAdapter
@@ -22,14 +56,71 @@ class RestAdapter:
         :param ver: v2
         :param ssl_verify: Normally set to True, but if having SSL/TLS cert validation issues, can turn off with False
         :param logger: (optional) If your app has a logger, pass it in here.
+        :param pool_size: Number of connection pools kept alive by the transport
+        :param max_connections_per_host: Keep-alive connections reused per host, size it to your thread count
+        :param timeout: (optional) Default timeout in seconds, or a (connect, read) tuple, DEFAULT_TIMEOUT if omitted
+        :param http2: Use the HTTP/2-capable httpx transport instead of requests (needs httpx[http2])
+        :param transport: (optional) Ready-made transport, overrides the pool settings above
+        :param rate_limit: Pace requests client-side to the server's published rate limits
+        :param rate_limiter: (optional) Limiter to use, defaults to the one shared by every client with this token
+        :param max_rate_limit_retries: How many 429 responses are waited out before raising
+        :param response_cache: (optional) In-memory cache answering repeated GETs, invalidated by mutations
+        :param codec: (optional) JSON codec for request and response bodies, defaults to the fastest installed
+        :param coalesce_gets: Share one upstream request between concurrent identical GETs
+        :param dispatcher: (optional) Queue handing out rate limit slots by priority, it brings its own limiter
+        :param metrics: (optional) Collects per-endpoint latency, status, size and rate limit metrics
+        :param scheme: https, or http for a local stand-in server
+        :param retry_policy: (optional) Retries of transient failures, RetryPolicy() by default
+        :param circuit_breaker: (optional) Breaker to use, defaults to the one shared by every client of this host
+        :param fail_fast: Reject requests without sending them while the host's circuit is open
         """
         self._logger = logger or logging.getLogger(__name__)
-        self.url = f"https://{hostname}/{ver}"
+        self.url = f"{scheme}://{hostname}/{ver}"
         self._access_token = access_token
         self._ssl_verify = ssl_verify
+        self._timeout = timeout if timeout is not None else DEFAULT_TIMEOUT
         if not ssl_verify:
             # noinspection PyUnresolvedReferences
             requests.packages.urllib3.disable_warnings()
+        if transport is None:
+            transport_cls = HttpxTransport if http2 else RequestsTransport
+            transport = transport_cls(
+                pool_size=pool_size,
+                max_connections_per_host=max_connections_per_host,
+                ssl_verify=ssl_verify,
+            )
+        self._transport = transport
+        if dispatcher is not None:
+            rate_limiter = dispatcher.rate_limiter
+        elif rate_limit and rate_limiter is None:
+            rate_limiter = RateLimiter.for_token(access_token)
+        self._rate_limiter = rate_limiter if rate_limit else None
+        self._dispatcher = dispatcher if rate_limit else None
+        self._max_rate_limit_retries = max_rate_limit_retries
+        self._response_cache = response_cache
+        self._codec = codec or default_codec()
+        # Raw decoding hands the data itself to each caller, so each gets a copy
+        self._single_flight = (
+            SingleFlight(copy_result=Result.copy) if coalesce_gets else None
+        )
+        self.server_clock = ServerClock()
+        self.metrics = metrics
+        self._retry_policy = retry_policy or RetryPolicy()
+        if fail_fast and circuit_breaker is None:
+            circuit_breaker = CircuitBreaker.for_host(hostname)
+        self._circuit_breaker = circuit_breaker if fail_fast else None
+
+    def close(self):
+        """
+        Close every pooled connection held by the transport
+        """
+        self._transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
     def _do(
         self,
@@ -38,6 +129,7 @@ class RestAdapter:
         ep_params: Dict = None,
         data: Dict = None,
         is_private: bool = True,
+        timeout: Timeout = None,
     ) -> Result:
         """
         Private method for get(), post(), delete(), etc. methods
@@ -45,68 +137,277 @@ class RestAdapter:
         :param endpoint: URL Endpoint as a string
         :param ep_params: Dictionary of Endpoint parameters (Optional)
         :param data: Dictionary of data to pass to SpaceTraders API (Optional)
+        :param timeout: Per-request timeout overriding the adapter default (Optional)
         :return: a Result object
         """
+        if http_method == "GET":
+            if self._response_cache is not None:
+                cached = self._response_cache.get(endpoint, ep_params)
+                if cached is not None:
+                    return cached
+            if self._single_flight is not None:
+                # Identical GETs already in flight share that request's outcome
+                return self._single_flight.do(
+                    self._coalescing_key(endpoint, ep_params, is_private),
+                    lambda: self._send(
+                        http_method, endpoint, ep_params, data, is_private, timeout
+                    ),
+                )
+        return self._send(http_method, endpoint, ep_params, data, is_private, timeout)
+
+    def _send(
+        self,
+        http_method: str,
+        endpoint: str,
+        ep_params: Dict,
+        data: Dict,
+        is_private: bool,
+        timeout: Timeout,
+    ) -> Result:
         full_url = self.url + endpoint
-        headers = {"Authorization": f"Bearer {self._access_token}"}
-        log_line_pre = f"method={http_method}, url={full_url}, params={ep_params}"
-        log_line_post = ", ".join(
-            (log_line_pre, "success={}, status_code={}, message={}")
+        headers, body = self._encode_request(data, is_private)
+        request_info = (http_method, endpoint, ep_params)
+        metrics = self.metrics
+        if self._response_cache is not None:
+            generation = self._response_cache.generation
+
+        # Pace the request through the rate limiter, then log HTTP params and perform an HTTP request,
+        # catching and re-raising any exceptions. A 429 is waited out and retried,
+        # transient failures are retried according to the retry policy.
+        rate_limit_retries = 0
+        attempt = 0
+        while True:
+            if self._circuit_breaker is not None:
+                self._circuit_breaker.before_request()
+            if self._dispatcher is not None:
+                self._dispatcher.acquire(http_method, endpoint)
+            elif self._rate_limiter is not None:
+                self._rate_limiter.acquire()
+            try:
+                if self._logger.isEnabledFor(logging.DEBUG):
+                    self._logger.debug(msg=self._log_line_pre(request_info))
+
+                start = time.perf_counter() if metrics is not None else 0.0
+                response = self._transport.request(
+                    method=http_method,
+                    url=full_url,
+                    params=ep_params,
+                    content=body,
+                    headers=headers,
+                    timeout=timeout if timeout is not None else self._timeout,
+                )
+            except TransportError as e:
+                delay = self._on_transport_error(e, attempt, request_info)
+                if delay is None:
+                    raise SpaceTradersApiException("Request failed") from e
+                attempt += 1
+                time.sleep(delay)
+                continue
+            if metrics is not None:
+                self._observe(request_info, response, body, time.perf_counter() - start)
+
+            retry_after = self._retry_after(response, rate_limit_retries, request_info)
+            if retry_after is not None:
+                rate_limit_retries += 1
+                if self._rate_limiter is not None:
+                    self._rate_limiter.penalize(retry_after)
+                else:
+                    time.sleep(retry_after)
+                continue
+            delay = self._transient_retry_delay(response, attempt, request_info)
+            if delay is None:
+                break
+            attempt += 1
+            time.sleep(delay)
+
+        result = self._to_result(response, request_info)
+        if self._response_cache is not None:
+            if http_method == "GET":
+                self._response_cache.put(endpoint, ep_params, result, generation)
+            else:
+                self._response_cache.invalidate_mutation(endpoint, data)
+        return result
+
+    def _on_transport_error(
+        self, error: TransportError, attempt: int, request_info
+    ) -> Optional[float]:
+        """
+        Log and record a failed request
+        :return: seconds to wait before retrying, or None when the error should be raised
+        """
+        http_method, endpoint, _ = request_info
+        self._logger.error(msg=(str(error)))
+        if self.metrics is not None:
+            self.metrics.observe_error(http_method, endpoint)
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.record_failure()
+        if not self._retry_policy.should_retry(http_method, attempt, error=error):
+            return None
+        delay = self._retry_policy.delay(attempt)
+        self._logger.warning(
+            msg=f"{self._log_line_pre(request_info)}, {error}, retrying in {delay:.2f}s"
+        )
+        return delay
+
+    def _transient_retry_delay(
+        self, response: TransportResponse, attempt: int, request_info
+    ) -> Optional[float]:
+        """
+        Decide whether a 5xx should be retried
+        :return: seconds to wait before retrying, or None when the response is final
+        """
+        if not self._retry_policy.should_retry(
+            request_info[0], attempt, status_code=response.status_code
+        ):
+            return None
+        delay = self._retry_policy.delay(attempt)
+        self._logger.warning(
+            msg=f"{self._log_line_pre(request_info)}, status_code={response.status_code}, "
+            f"retrying in {delay:.2f}s"
+        )
+        return delay
+
+    def _log_line_pre(self, request_info) -> str:
+        http_method, endpoint, ep_params = request_info
+        return f"method={http_method}, url={self.url + endpoint}, params={ep_params}"
+
+    def _observe(
+        self, request_info, response: TransportResponse, body: bytes, seconds: float
+    ):
+        http_method, endpoint, _ = request_info
+        self.metrics.observe_request(
+            http_method,
+            endpoint,
+            response.status_code,
+            seconds,
+            bytes_out=len(body) if body else 0,
+            bytes_in=len(response.content),
         )
+        self.metrics.observe_rate_limit(response.headers)
 
-        # Log HTTP params and perform an HTTP request, catching and re-raising any exceptions
+    def _retry_after(
+        self, response: TransportResponse, attempt: int, request_info
+    ) -> Optional[float]:
+        """
+        Feed the response to the rate limiter, server clock and circuit breaker, and decide whether a 429 should be retried
+        :return: seconds to wait before retrying, or None when the response is final
+        """
+        self.server_clock.observe(response.headers)
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.record(response.status_code)
+        if self._rate_limiter is not None:
+            self._rate_limiter.update(response.headers)
+        if response.status_code != 429 or attempt == self._max_rate_limit_retries:
+            return None
         try:
-            self._logger.debug(msg=log_line_pre)
+            error_body = self._codec.loads(response.content)
+        except Exception:
+            error_body = None
+        retry_after = parse_retry_after(response.headers, error_body)
+        self._logger.warning(
+            msg=f"{self._log_line_pre(request_info)}, rate limited, retrying in {retry_after:.2f}s"
+        )
+        return retry_after
+
+    def estimate_wait(self) -> float:
+        """
+        Seconds until the rate limiter would let a request through, 0 when not rate limiting
+        """
+        if self._rate_limiter is None:
+            return 0.0
+        return self._rate_limiter.estimate_wait()
 
-            args = {"headers": headers} if is_private else {}
+    @staticmethod
+    def _coalescing_key(endpoint: str, ep_params: Dict, is_private: bool):
+        params = tuple(sorted(ep_params.items())) if ep_params else ()
+        return endpoint, params, is_private
 
-            response = requests.request(
-                method=http_method,
-                url=full_url,
-                verify=self._ssl_verify,
-                params=ep_params,
-                json=data,
-                **args,
+    def coalescing_stats(self) -> Dict[str, int]:
+        """
+        How many GETs were sent upstream and how many were served by a request already in flight
+        """
+        if self._single_flight is None:
+            return {"executed": 0, "coalesced": 0, "in_flight": 0}
+        return self._single_flight.stats()
+
+    def _encode_request(self, data: Dict, is_private: bool):
+        """
+        Request headers and the JSON body encoded once with the adapter's codec
+        """
+        headers = (
+            {"Authorization": f"Bearer {self._access_token}"} if is_private else {}
+        )
+        if data is None:
+            return headers, None
+        headers["Content-Type"] = "application/json"
+        return headers, self._codec.dumps(data)
+
+    def _to_result(self, response: TransportResponse, request_info) -> Result:
+        # Log lines are only formatted when they are going to be emitted
+        def log_line_post(success, status_code, message) -> str:
+            return (
+                f"{self._log_line_pre(request_info)}, success={success}, "
+                f"status_code={status_code}, message={message}"
             )
-        except requests.exceptions.RequestException as e:
-            self._logger.error(msg=(str(e)))
-            raise SpaceTradersApiException("Request failed") from e
 
-        # Deserialize JSON output to Python object, or return failed Result on exception
+        # Deserialize JSON output to Python object exactly once, or raise on bad JSON
+        metrics = self.metrics
+        start = time.perf_counter() if metrics is not None else 0.0
         try:
-            data_out = response.json()
-        except (ValueError, TypeError, JSONDecodeError) as e:
-            self._logger.error(msg=log_line_post.format(False, None, e))
+            data_out = self._codec.loads(response.content)
+        except Exception as e:
+            self._logger.error(msg=log_line_post(False, None, e))
             raise SpaceTradersApiException("Bad JSON in response") from e
+        if metrics is not None:
+            metrics.observe_decode(
+                "json",
+                endpoint_template(request_info[1]),
+                time.perf_counter() - start,
+            )
 
         # If status_code in 200-299 range, return success Result with data, otherwise raise exception
         is_success = 299 >= response.status_code >= 200  # 200 to 299 is OK
-        # log_line = log_line_post.format(
-        #     is_success, response.status_code, response.reason
-        # )
         if is_success:
-            # self._logger.debug(msg=log_line)
+            if self._logger.isEnabledFor(logging.DEBUG):
+                self._logger.debug(
+                    msg=log_line_post(True, response.status_code, response.reason)
+                )
             return Result(
                 response.status_code,
                 headers=response.headers,
                 message=response.reason,
                 data=data_out,
             )
-        # self._logger.error(msg=log_line)
+        error = data_out.get("error") if isinstance(data_out, dict) else None
+        error = error if isinstance(error, dict) else {}
+        message = error.get("message", response.reason)
+        self._logger.error(msg=log_line_post(False, response.status_code, message))
         raise SpaceTradersApiException(
-            f"{response.status_code}: {response.json()['error']['message']}"
+            f"{response.status_code}: {message}",
+            status_code=response.status_code,
+            code=error.get("code"),
+            message=message,
+            data=error.get("data"),
         )
 
-    def get(self, endpoint: str, ep_params: Dict = None, is_private=True) -> Result:
+    def get(
+        self, endpoint: str, ep_params: Dict = None, is_private=True, timeout=None
+    ) -> Result:
         return self._do(
             http_method="GET",
             endpoint=endpoint,
             ep_params=ep_params,
             is_private=is_private,
+            timeout=timeout,
         )
 
     def post(
-        self, endpoint: str, ep_params: Dict = None, data: Dict = None, is_private=True
+        self,
+        endpoint: str,
+        ep_params: Dict = None,
+        data: Dict = None,
+        is_private=True,
+        timeout=None,
     ) -> Result:
         return self._do(
             http_method="POST",
@@ -114,10 +415,16 @@ class RestAdapter:
             ep_params=ep_params,
             data=data,
             is_private=is_private,
+            timeout=timeout,
         )
 
     def delete(
-        self, endpoint: str, ep_params: Dict = None, data: Dict = None, is_private=True
+        self,
+        endpoint: str,
+        ep_params: Dict = None,
+        data: Dict = None,
+        is_private=True,
+        timeout=None,
     ) -> Result:
         return self._do(
             http_method="DELETE",
@@ -125,10 +432,16 @@ class RestAdapter:
             ep_params=ep_params,
             data=data,
             is_private=is_private,
+            timeout=timeout,
         )
 
     def patch(
-        self, endpoint: str, ep_params: Dict = None, data: Dict = None, is_private=True
+        self,
+        endpoint: str,
+        ep_params: Dict = None,
+        data: Dict = None,
+        is_private=True,
+        timeout=None,
     ) -> Result:
         return self._do(
             http_method="PATCH",
@@ -136,20 +449,63 @@ class RestAdapter:
             ep_params=ep_params,
             data=data,
             is_private=is_private,
+            timeout=timeout,
+        )
+
+    def _raw_retry_delay(
+        self,
+        url: str,
+        attempt: int,
+        error: TransportError = None,
+        status_code: int = None,
+    ) -> Optional[float]:
+        """
+        Feed a fetch_data() or download() attempt to the circuit breaker and retry policy,
+        as _send() does for API requests
+        :return: seconds to wait before retrying, or None when the response is final
+        :raises SpaceTradersApiException: for a transport error that is not retried
+        """
+        if error is not None:
+            self._logger.error(msg=(str(error)))
+            if self._circuit_breaker is not None:
+                self._circuit_breaker.record_failure()
+        elif self._circuit_breaker is not None:
+            self._circuit_breaker.record(status_code)
+        if not self._retry_policy.should_retry(
+            "GET", attempt, error=error, status_code=status_code
+        ):
+            if error is not None:
+                raise SpaceTradersApiException(str(error)) from error
+            return None
+        delay = self._retry_policy.delay(attempt)
+        reason = error if error is not None else f"status_code={status_code}"
+        self._logger.warning(
+            msg=f"method=GET, url={url}, {reason}, retrying in {delay:.2f}s"
         )
+        return delay
 
     def fetch_data(self, url: str) -> bytes:
-        # GET URL; catching, logging, and re-raising any exceptions
+        # GET URL with retries; catching, logging, and re-raising any exceptions
         http_method = "GET"
-        try:
-            log_line = f"method={http_method}, url={url}"
-            self._logger.debug(msg=log_line)
-            response = requests.request(
-                method=http_method, url=url, verify=self._ssl_verify
-            )
-        except requests.exceptions.RequestException as e:
-            self._logger.error(msg=(str(e)))
-            raise SpaceTradersApiException(str(e)) from e
+        attempt = 0
+        while True:
+            if self._circuit_breaker is not None:
+                self._circuit_breaker.before_request()
+            self._logger.debug(msg=f"method={http_method}, url={url}")
+            try:
+                response = self._transport.request(
+                    method=http_method, url=url, timeout=self._timeout
+                )
+            except TransportError as e:
+                delay = self._raw_retry_delay(url, attempt, error=e)
+            else:
+                delay = self._raw_retry_delay(
+                    url, attempt, status_code=response.status_code
+                )
+                if delay is None:
+                    break
+            attempt += 1
+            time.sleep(delay)
 
         # If status_code in 200-299 range, return byte stream, otherwise raise exception
         is_success = 299 >= response.status_code >= 200
@@ -158,3 +514,48 @@ class RestAdapter:
         if not is_success:
             raise SpaceTradersApiException(response.reason)
         return response.content
+
+    def download(self, url: str, path: str, chunk_size: int = 65536) -> int:
+        """
+        Stream a GET response body to disk without holding it in memory.
+        Failed attempts are retried from the start like any other GET.
+        :param url: Full URL to download
+        :param path: Destination file, written atomically through a temporary file
+        :param chunk_size: Bytes read from the socket at a time
+        :return: Number of bytes written
+        """
+        tmp_path = f"{path}.part"
+        attempt = 0
+        try:
+            while True:
+                if self._circuit_breaker is not None:
+                    self._circuit_breaker.before_request()
+                self._logger.debug(msg=f"method=GET, url={url}, stream=True")
+                written = 0
+                try:
+                    with self._transport.stream(
+                        "GET", url, timeout=self._timeout, chunk_size=chunk_size
+                    ) as response:
+                        status_code, reason = response.status_code, response.reason
+                        if 299 >= status_code >= 200:
+                            with open(tmp_path, "wb") as file:
+                                for chunk in response.chunks:
+                                    file.write(chunk)
+                                    written += len(chunk)
+                except TransportError as e:
+                    delay = self._raw_retry_delay(url, attempt, error=e)
+                else:
+                    delay = self._raw_retry_delay(url, attempt, status_code=status_code)
+                    if delay is None:
+                        break
+                attempt += 1
+                time.sleep(delay)
+            if not 299 >= status_code >= 200:
+                raise SpaceTradersApiException(f"{status_code}: {reason}")
+            os.replace(tmp_path, path)
+        except BaseException:
+            # Never leave a partial download behind
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return written
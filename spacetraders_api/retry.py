@@ -0,0 +1,149 @@
+import random
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from spacetraders_api.exceptions import CircuitOpenError, TransportError
+
+# Methods that can be sent twice without changing the outcome
+IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+
+class RetryPolicy:
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        backoff: float = 0.5,
+        max_backoff: float = 10.0,
+        retry_statuses: Tuple[int, ...] = (500, 502, 503, 504),
+    ):
+        """
+        Which failed requests are tried again, and after how long.
+        Idempotent requests are retried on transport errors and on retry_statuses; mutations only
+        when the connection failed before anything was sent, so an action is never applied twice.
+        429 responses are handled separately by the rate limiter.
+        :param max_attempts: Total attempts including the first one, 1 disables retries
+        :param backoff: Base delay in seconds, doubled after every attempt
+        :param max_backoff: Upper bound of a single delay
+        :param retry_statuses: HTTP statuses treated as transient for idempotent requests
+        """
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_statuses = frozenset(retry_statuses)
+
+    def should_retry(
+        self,
+        http_method: str,
+        attempt: int,
+        error: TransportError = None,
+        status_code: int = None,
+    ) -> bool:
+        """
+        :param attempt: Number of attempts made so far minus one (0 after the first failure)
+        """
+        if attempt + 1 >= self.max_attempts:
+            return False
+        idempotent = http_method in IDEMPOTENT_METHODS
+        if error is not None:
+            return error.retryable and (idempotent or not error.sent)
+        return idempotent and status_code in self.retry_statuses
+
+    def delay(self, attempt: int) -> float:
+        """
+        Exponential backoff with full jitter, so clients failing together do not retry together
+        """
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a host after consecutive failures (transport errors and 5xx).
+    Once recovery_time has passed a single probe request is let through: success closes the
+    circuit, failure opens it again.
+    """
+
+    _shared: Dict[str, "CircuitBreaker"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        recovery_time: float = 30.0,
+        clock=time.monotonic,
+    ):
+        """
+        :param failure_threshold: Consecutive failures that open the circuit
+        :param recovery_time: Seconds the circuit stays open before a probe is allowed
+        :param clock: (optional) Monotonic clock, replaceable for testing
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @classmethod
+    def for_host(cls, hostname: str, **kwargs) -> "CircuitBreaker":
+        """
+        Return the breaker shared by every client talking to the same host
+        """
+        with cls._shared_lock:
+            breaker = cls._shared.get(hostname)
+            if breaker is None:
+                breaker = cls._shared[hostname] = cls(**kwargs)
+            return breaker
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._probing:
+                return "half-open"
+            return "open"
+
+    def before_request(self):
+        """
+        :raises CircuitOpenError: while the circuit is open, or while the probe is in flight
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return
+            now = self._clock()
+            remaining = self.recovery_time - (now - self._opened_at)
+            if remaining <= 0:
+                # Let one probe through; if it never reports back another one is allowed
+                # after recovery_time again
+                self._opened_at = now
+                self._probing = True
+                return
+        raise CircuitOpenError(
+            f"Circuit open after {self._failures} consecutive failures, "
+            f"retry in {max(0.0, remaining):.1f}s",
+            data={"retryAfter": max(0.0, remaining)},
+        )
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+            self._probing = False
+
+    def record(self, status_code: int):
+        """
+        Record a response: 5xx counts as a failure, anything else proves the host is up
+        """
+        if status_code >= 500:
+            self.record_failure()
+        else:
+            self.record_success()
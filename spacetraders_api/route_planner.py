@@ -0,0 +1,232 @@
+import heapq
+import time
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+from pydantic import BaseModel
+from spacetraders_api.exceptions import SpaceTradersApiException
+from spacetraders_api.models import Ship, ShipNavigationResponse, SystemWaypoint
+
+# Travel time multiplier per flight mode, time = 15 + distance * multiplier / engine speed
+FLIGHT_MODE_MULTIPLIERS = {
+    "CRUISE": 25.0,
+    "BURN": 12.5,
+    "DRIFT": 250.0,
+    "STEALTH": 30.0,
+}
+
+
+def fuel_cost(flight_mode: str, distance):
+    """
+    Fuel burned over a distance (scalar or array) in a flight mode
+    """
+    distance = np.maximum(1, np.rint(distance))
+    if flight_mode == "DRIFT":
+        return np.ones_like(distance)
+    if flight_mode == "BURN":
+        return 2 * distance
+    return distance
+
+
+def travel_time(flight_mode: str, distance, speed: int):
+    """
+    Seconds needed to fly a distance (scalar or array) in a flight mode
+    """
+    distance = np.maximum(1, np.rint(distance))
+    return np.rint(15 + distance * FLIGHT_MODE_MULTIPLIERS[flight_mode] / speed)
+
+
+class RouteLeg(BaseModel):
+    origin: str
+    destination: str
+    flightMode: str
+    distance: float
+    fuelCost: int
+    travelTime: int
+    refuel: bool
+
+
+class RoutePlan(BaseModel):
+    origin: str
+    destination: str
+    legs: List[RouteLeg]
+    totalTime: int
+    totalFuel: int
+    # The origin sells fuel and the plan counts on leaving it with a full tank
+    refuelAtOrigin: bool = False
+
+
+class RoutePlanner:
+    def __init__(
+        self,
+        waypoints: Iterable[SystemWaypoint],
+        refuel_traits: Sequence[str] = ("MARKETPLACE",),
+    ):
+        """
+        Fuel-constrained multi-hop route planner over the waypoints of one system
+        :param waypoints: Every waypoint of the system, e.g. from iter_system_waypoints()
+        :param refuel_traits: Traits marking a waypoint where ships can buy fuel
+        """
+        self._waypoints = list(waypoints)
+        self._index = {wp.symbol: i for i, wp in enumerate(self._waypoints)}
+        refuel_traits = set(refuel_traits)
+        self._refuel = np.array(
+            [
+                any(trait.symbol in refuel_traits for trait in wp.traits)
+                for wp in self._waypoints
+            ],
+            dtype=bool,
+        )
+        coordinates = np.array(
+            [(wp.x, wp.y) for wp in self._waypoints], dtype=np.float64
+        ).reshape(-1, 2)
+        delta = coordinates[:, None, :] - coordinates[None, :, :]
+        self._distances = np.sqrt((delta**2).sum(axis=-1))
+
+    def _edge_matrices(self, ship: Ship, flight_modes: Sequence[str], objective: str):
+        """
+        Per flight mode, the cost, travel time and fuel of flying between every waypoint pair
+        :return: (cost, time, fuel) arrays shaped (mode, origin, destination)
+        """
+        capacity = ship.fuel.capacity
+        speed = max(1, ship.engine.speed)
+        shape = (len(flight_modes),) + self._distances.shape
+        times = np.empty(shape)
+        fuels = np.empty(shape)
+        for m, mode in enumerate(flight_modes):
+            times[m] = travel_time(mode, self._distances, speed)
+            # Ships without a fuel tank (probes) fly for free
+            fuels[m] = fuel_cost(mode, self._distances) if capacity else 0
+        if objective == "time":
+            costs = times.copy()
+        elif objective == "fuel":
+            # Fuel first, break ties on time
+            costs = fuels * 1e6 + times
+        else:
+            raise ValueError(f"Unknown objective {objective!r}, use 'time' or 'fuel'")
+        return costs, times, fuels
+
+    def plan(
+        self,
+        ship: Ship,
+        destination: str,
+        objective: str = "time",
+        flight_modes: Sequence[str] = ("CRUISE", "BURN", "DRIFT"),
+    ) -> RoutePlan:
+        """
+        Fastest (objective="time") or cheapest (objective="fuel") path from the ship's
+        current waypoint to destination, stopping to refuel at refuel-capable waypoints.
+        The tank is assumed to be filled at every refuel stop, the origin included.
+        """
+        origin = ship.nav.waypointSymbol
+        try:
+            start = self._index[origin]
+            goal = self._index[destination]
+        except KeyError as e:
+            raise SpaceTradersApiException(f"Unknown waypoint {e.args[0]}") from e
+
+        costs, times, fuels = self._edge_matrices(ship, flight_modes, objective)
+        capacity = ship.fuel.capacity
+        refuel_at_origin = bool(self._refuel[start]) and ship.fuel.current < capacity
+        fuel_at_start = capacity if self._refuel[start] else ship.fuel.current
+
+        # A* over refuel stops, with the straight-line time at the fastest mode as heuristic
+        if objective == "time":
+            fastest = min(FLIGHT_MODE_MULTIPLIERS[m] for m in flight_modes)
+            # Distances are rounded before use, so shave half a unit to stay admissible
+            straight = np.maximum(0, self._distances[:, goal] - 0.5)
+            heuristic = np.floor(
+                15 * (self._distances[:, goal] > 0)
+                + straight * fastest / max(1, ship.engine.speed)
+            )
+        else:
+            heuristic = np.zeros(len(self._waypoints))
+
+        best = {start: 0.0}
+        previous: Dict[int, tuple] = {}
+        queue = [(heuristic[start], 0.0, start)]
+        while queue:
+            _, cost, node = heapq.heappop(queue)
+            if node == goal:
+                break
+            if cost > best.get(node, np.inf):
+                continue
+            tank = fuel_at_start if node == start else capacity
+            # A leg may only end at a refuel stop, unless it ends at the destination
+            feasible = np.where(fuels[:, node, :] <= tank, costs[:, node, :], np.inf)
+            modes = feasible.argmin(axis=0)
+            leg_costs = feasible[modes, np.arange(len(modes))]
+            reachable = np.isfinite(leg_costs) & (
+                self._refuel | (np.arange(len(modes)) == goal)
+            )
+            reachable[node] = False
+            for target in np.flatnonzero(reachable):
+                new_cost = cost + leg_costs[target]
+                if new_cost < best.get(target, np.inf):
+                    best[target] = new_cost
+                    previous[target] = (node, modes[target])
+                    heapq.heappush(
+                        queue, (new_cost + heuristic[target], new_cost, target)
+                    )
+        if goal != start and goal not in previous:
+            raise SpaceTradersApiException(
+                f"No route from {origin} to {destination} within fuel capacity {capacity}"
+            )
+
+        legs = []
+        node = goal
+        while node != start:
+            source, mode = previous[node]
+            legs.append(
+                RouteLeg(
+                    origin=self._waypoints[source].symbol,
+                    destination=self._waypoints[node].symbol,
+                    flightMode=flight_modes[mode],
+                    distance=float(self._distances[source, node]),
+                    fuelCost=int(fuels[mode, source, node]),
+                    travelTime=int(times[mode, source, node]),
+                    refuel=bool(self._refuel[node]) and node != goal,
+                )
+            )
+            node = source
+        legs.reverse()
+        return RoutePlan(
+            origin=origin,
+            destination=destination,
+            legs=legs,
+            totalTime=sum(leg.travelTime for leg in legs),
+            totalFuel=sum(leg.fuelCost for leg in legs),
+            refuelAtOrigin=refuel_at_origin and bool(legs),
+        )
+
+    @staticmethod
+    def execute(
+        api, ship_symbol: str, plan: RoutePlan, sleep=time.sleep
+    ) -> List[ShipNavigationResponse]:
+        """
+        Fly a plan leg by leg with navigate/dock/orbit, waiting for each arrival and refuelling at stops.
+        Arrivals are awaited on the server clock, so a skewed local clock neither cuts the wait short
+        nor drags it out.
+        :param api: SpaceTradersApi used to issue the commands
+        :param sleep: (optional) Waiting function, replaceable for testing
+        :return: the navigation response of every leg
+        """
+        responses = []
+        flight_mode = None
+        if plan.refuelAtOrigin:
+            api.dock_ship(ship_symbol)
+            api.refuel_ship(ship_symbol)
+        for leg in plan.legs:
+            api.orbit_ship(ship_symbol)
+            if leg.flightMode != flight_mode:
+                api.set_ship_flight_mode(ship_symbol, leg.flightMode)
+                flight_mode = leg.flightMode
+            response = api.navigate_ship_to(ship_symbol, leg.destination)
+            responses.append(response)
+            remaining = api.server_clock.seconds_until(response.nav.route.arrival)
+            if remaining > 0:
+                sleep(remaining)
+            if leg.refuel:
+                api.dock_ship(ship_symbol)
+                api.refuel_ship(ship_symbol)
+        return responses
@@ -0,0 +1,65 @@
+import datetime
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+
+
+class ServerClock:
+    def __init__(self, window: int = 32):
+        """
+        Estimates the offset between the local clock and the server clock from Date response headers.
+        Date only has second resolution, so every response bounds the offset to a one second interval;
+        the estimate is the middle of the intersection of the recent intervals.
+        :param window: Number of recent responses kept
+        """
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)
+        self._offset = 0.0
+
+    @property
+    def offset(self) -> float:
+        """
+        Seconds to add to the local clock to get server time
+        """
+        return self._offset
+
+    def observe(self, headers: Optional[Mapping[str, str]], received: float = None):
+        """
+        Record the Date header of a response received at local time `received` (epoch seconds)
+        """
+        value = headers.get("date") if headers else None
+        if not value:
+            return
+        try:
+            server_time = parsedate_to_datetime(value).timestamp()
+        except (TypeError, ValueError):
+            return
+        received = time.time() if received is None else received
+        with self._lock:
+            self._samples.append(server_time - received)
+            # The server stamped the response somewhere in [date, date + 1)
+            low = max(self._samples)
+            high = min(self._samples) + 1.0
+            if low > high:
+                # Clock jump on either side, start over from this response
+                self._samples.clear()
+                self._samples.append(server_time - received)
+                low, high = server_time - received, server_time - received + 1.0
+            self._offset = (low + high) / 2
+
+    def time(self) -> float:
+        """
+        Current server time as epoch seconds
+        """
+        return time.time() + self._offset
+
+    def now(self) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(self.time(), tz=datetime.timezone.utc)
+
+    def seconds_until(self, moment: datetime.datetime) -> float:
+        """
+        Seconds from now until a server timestamp (negative if it is in the past)
+        """
+        return moment.timestamp() - self.time()
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, copy_result: Optional[Callable[[Any], Any]] = None):
+        """
+        Coalesces concurrent calls sharing a key into one execution whose outcome
+        (result or exception) is handed to every caller. Works for threads (do) and asyncio (ado).
+        :param copy_result: (optional) Gives every coalesced caller its own copy of the result,
+        for results that callers may modify; without it they all share the leader's object
+        """
+        self._copy_result = copy_result
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._futures: Dict[Hashable, asyncio.Future] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return self._share(call.result)
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._futures.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield: one waiter being cancelled must not cancel the shared request
+            return self._share(await asyncio.shield(future))
+
+        self.executed += 1
+        future = asyncio.ensure_future(fn())
+        self._futures[key] = future
+        future.add_done_callback(lambda _: self._futures.pop(key, None))
+        return await asyncio.shield(future)
+
+    def _share(self, result: Any) -> Any:
+        return result if self._copy_result is None else self._copy_result(result)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls) + len(self._futures),
+        }
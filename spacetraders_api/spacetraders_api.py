@@ -1,5 +1,16 @@
 import logging
+from typing import Dict, Iterator
 from spacetraders_api.rest_adapter import RestAdapter
+from spacetraders_api.rate_limiter import RateLimiter
+from spacetraders_api.dispatcher import RequestDispatcher
+from spacetraders_api.metrics import Metrics
+from spacetraders_api.retry import CircuitBreaker, RetryPolicy
+from spacetraders_api.static_cache import StaticCache
+from spacetraders_api.response_cache import ResponseCache
+from spacetraders_api.decoding import Decoder
+from spacetraders_api.server_clock import ServerClock
+from spacetraders_api.pagination import MAX_PAGE_SIZE, iter_pages
+from spacetraders_api.galaxy_dump import SYSTEMS_DUMP_ENDPOINT, iter_systems_dump
 from spacetraders_api.models import *
 
 
@@ -12,11 +23,114 @@ class SpaceTradersApi:
         ssl_verify: bool = False,
         logger: logging.Logger = None,
         page_size: int = 20,
+        pool_size: int = 10,
+        max_connections_per_host: int = 10,
+        timeout=None,
+        http2: bool = False,
+        rate_limit: bool = True,
+        rate_limiter: RateLimiter = None,
+        static_cache: StaticCache = None,
+        response_cache: ResponseCache = None,
+        decode_mode: str = "validate",
+        codec=None,
+        coalesce_gets: bool = True,
+        dispatcher: RequestDispatcher = None,
+        metrics: Metrics = None,
+        scheme: str = "https",
+        transport=None,
+        retry_policy: RetryPolicy = None,
+        circuit_breaker: CircuitBreaker = None,
+        fail_fast: bool = True,
     ):
         self._rest_adapter = RestAdapter(
-            hostname, access_token, ver, ssl_verify, logger
+            hostname,
+            access_token,
+            ver,
+            ssl_verify,
+            logger,
+            pool_size=pool_size,
+            max_connections_per_host=max_connections_per_host,
+            timeout=timeout,
+            http2=http2,
+            rate_limit=rate_limit,
+            rate_limiter=rate_limiter,
+            response_cache=response_cache,
+            codec=codec,
+            coalesce_gets=coalesce_gets,
+            dispatcher=dispatcher,
+            metrics=metrics,
+            scheme=scheme,
+            transport=transport,
+            retry_policy=retry_policy,
+            circuit_breaker=circuit_breaker,
+            fail_fast=fail_fast,
         )
         self._page_size = page_size
+        self._static_cache = static_cache
+        self._static_cache_checked = False
+        self._decoder = Decoder(decode_mode, metrics)
+
+    def close(self):
+        self._rest_adapter.close()
+        if self._static_cache is not None:
+            self._static_cache.close()
+
+    @property
+    def server_clock(self) -> ServerClock:
+        """
+        Server time estimated from the Date headers of the responses seen so far
+        """
+        return self._rest_adapter.server_clock
+
+    @property
+    def metrics(self) -> Metrics:
+        """
+        Metrics passed to the constructor, None when instrumentation is off
+        """
+        return self._rest_adapter.metrics
+
+    def estimate_wait(self) -> float:
+        """
+        Seconds until the rate limiter would let a request through, 0 when not rate limiting
+        """
+        return self._rest_adapter.estimate_wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _static_get(
+        self, kind: str, key: str, endpoint: str, ep_params: Dict = None, item_kind=None
+    ) -> Dict:
+        """
+        Payload of a static universe endpoint, answered from the static cache when possible.
+        Items of a fetched page are also cached one by one under item_kind, keyed by symbol.
+        """
+        if self._static_cache is None:
+            result = self._rest_adapter.get(endpoint=endpoint, ep_params=ep_params)
+            return result.data
+        if not self._static_cache_checked:
+            status = self.get_status()
+            self._static_cache.check_reset(status["resetDate"])
+            self._static_cache_checked = True
+        payload = self._static_cache.get(kind, key)
+        if payload is None:
+            result = self._rest_adapter.get(endpoint=endpoint, ep_params=ep_params)
+            payload = result.data
+            self._static_cache.put(kind, key, payload)
+            if item_kind is not None:
+                self._static_cache.put_many(
+                    item_kind,
+                    {item["symbol"]: {"data": item} for item in payload["data"]},
+                )
+        return payload
+
+    def get_status(self) -> Dict:
+        result = self._rest_adapter.get(endpoint="/", is_private=False)
+
+        return result.data
 
     def register_agent(
         self, callsign: str, faction="COSMIC", is_private=False
@@ -27,60 +141,71 @@ class SpaceTradersApi:
             is_private=is_private,
         )
 
-        return RegistrationResult(**result.data["data"])
+        return self._decoder.one(RegistrationResult, result.data["data"])
 
     def get_my_agent(self) -> Agent:
         result = self._rest_adapter.get(endpoint=f"/my/agent")
 
-        return Agent(**result.data["data"])
+        return self._decoder.one(Agent, result.data["data"])
 
-    def get_factions(self, page: int = 1, limit: int = 20) -> SearchResultPaginated:
+    def get_factions(self, page: int = 1, limit: int = None) -> SearchResultPaginated:
+        limit = limit or self._page_size
         result = self._rest_adapter.get(
             endpoint="/factions", ep_params={"page": page, "limit": limit}
         )
 
         _result = SearchResultPaginated(
-            data=[Faction(**faction) for faction in result.data["data"]],
+            data=self._decoder.many(Faction, result.data["data"]),
             meta=MetaPagnaition(**result.data["meta"]),
         )
 
         return _result
 
-    def get_contracts(self, page: int = 1, limit: int = 20) -> SearchResultPaginated:
+    def get_contracts(self, page: int = 1, limit: int = None) -> SearchResultPaginated:
+        limit = limit or self._page_size
         result = self._rest_adapter.get(
             endpoint="/my/contracts", ep_params={"page": page, "limit": limit}
         )
 
         _result = SearchResultPaginated(
-            data=[Contract(**contract) for contract in result.data["data"]],
+            data=self._decoder.many(Contract, result.data["data"]),
             meta=MetaPagnaition(**result.data["meta"]),
         )
 
         return _result
 
-    def get_systems(self, page: int = 1, limit: int = 20) -> SearchResultPaginated:
-        result = self._rest_adapter.get(
-            endpoint="/systems", ep_params={"page": page, "limit": limit}
+    def get_systems(self, page: int = 1, limit: int = None) -> SearchResultPaginated:
+        limit = limit or self._page_size
+        data = self._static_get(
+            "systems",
+            f"{page}:{limit}",
+            endpoint="/systems",
+            ep_params={"page": page, "limit": limit},
+            item_kind="system",
         )
 
         _result = SearchResultPaginated(
-            data=[System(**system) for system in result.data["data"]],
-            meta=MetaPagnaition(**result.data["meta"]),
+            data=self._decoder.many(System, data["data"]),
+            meta=MetaPagnaition(**data["meta"]),
         )
 
         return _result
 
     def get_system_waypoints(
-        self, system_symbol: str, page: int = 1, limit: int = 20
+        self, system_symbol: str, page: int = 1, limit: int = None
     ) -> SearchResultPaginated:
-        result = self._rest_adapter.get(
+        limit = limit or self._page_size
+        data = self._static_get(
+            "waypoints",
+            f"{system_symbol}:{page}:{limit}",
             endpoint=f"/systems/{system_symbol}/waypoints",
             ep_params={"page": page, "limit": limit},
+            item_kind="waypoint",
         )
 
         _result = SearchResultPaginated(
-            data=[SystemWaypoint(**waypoint) for waypoint in result.data["data"]],
-            meta=MetaPagnaition(**result.data["meta"]),
+            data=self._decoder.many(SystemWaypoint, data["data"]),
+            meta=MetaPagnaition(**data["meta"]),
         )
 
         return _result
@@ -88,11 +213,7 @@ class SpaceTradersApi:
     def accept_contract(self, contract_id: str) -> AcceptContractResult:
         result = self._rest_adapter.post(endpoint=f"/my/contracts/{contract_id}/accept")
 
-        # TODO: Workaround for the accepted contract model
-        return AcceptContractResult(
-            contract=Contract(**result.data["data"]["contract"]),
-            agent=Agent(**result.data["data"]["agent"]),
-        )
+        return self._decoder.one(AcceptContractResult, result.data["data"])
 
     def find_shipyard(
         self, system_symbol: str, limit: int = 20, page: int = 1
@@ -103,7 +224,7 @@ class SpaceTradersApi:
         )
 
         _result = SearchResultPaginated(
-            data=[SystemWaypoint(**waypoint) for waypoint in result.data["data"]],
+            data=self._decoder.many(SystemWaypoint, result.data["data"]),
             meta=MetaPagnaition(**result.data["meta"]),
         )
 
@@ -116,7 +237,7 @@ class SpaceTradersApi:
         result = self._rest_adapter.get(
             endpoint=f"/systems/{system_symbol}/waypoints/{shipyard_symbol}/shipyard",
         )
-        return ShipyardShip(**result.data["data"])
+        return self._decoder.one(ShipyardShip, result.data["data"])
 
     def buy_ship(self, ship_type: str, waypoint_symbol: str):
         result = self._rest_adapter.post(
@@ -138,12 +259,17 @@ class SpaceTradersApi:
         result = self._rest_adapter.get(endpoint="/my/ships")
 
         _result = SearchResultPaginated(
-            data=[Ship(**ship) for ship in result.data["data"]],
+            data=self._decoder.many(Ship, result.data["data"]),
             meta=MetaPagnaition(**result.data["meta"]),
         )
 
         return _result
 
+    def get_ship(self, ship_symbol: str) -> Ship:
+        result = self._rest_adapter.get(endpoint=f"/my/ships/{ship_symbol}")
+
+        return self._decoder.one(Ship, result.data["data"])
+
     def navigate_ship_to(
         self, ship_symbol: str, waypoint_symbol: str
     ) -> ShipNavigationResponse:
@@ -152,7 +278,7 @@ class SpaceTradersApi:
             data={"waypointSymbol": waypoint_symbol},
         )
 
-        return ShipNavigationResponse(**result.data["data"])
+        return self._decoder.one(ShipNavigationResponse, result.data["data"])
 
     def set_ship_flight_mode(
         self, ship_symbol: str, flight_mode: str
@@ -162,29 +288,43 @@ class SpaceTradersApi:
             data={"flightMode": flight_mode},
         )
 
-        return ChangeShipFlightModeResponse(**result.data["data"])
+        return self._decoder.one(ChangeShipFlightModeResponse, result.data["data"])
 
     def orbit_ship(self, ship_symbol: str) -> ChangeShipStatusResponse:
         result = self._rest_adapter.post(
             endpoint=f"/my/ships/{ship_symbol}/orbit",
         )
 
-        return ChangeShipStatusResponse(**result.data["data"])
+        return self._decoder.one(ChangeShipStatusResponse, result.data["data"])
 
     def dock_ship(self, ship_symbol: str) -> ChangeShipStatusResponse:
         result = self._rest_adapter.post(
             endpoint=f"/my/ships/{ship_symbol}/dock",
         )
 
-        return ChangeShipStatusResponse(**result.data["data"])
+        return self._decoder.one(ChangeShipStatusResponse, result.data["data"])
 
-    def get_agents(self, page: int = 1, limit: int = 20) -> SearchResultPaginated:
+    def refuel_ship(
+        self, ship_symbol: str, units: int = None, from_cargo: bool = False
+    ) -> RefuelShipResponse:
+        data = {"fromCargo": from_cargo}
+        if units is not None:
+            data["units"] = units
+        result = self._rest_adapter.post(
+            endpoint=f"/my/ships/{ship_symbol}/refuel",
+            data=data,
+        )
+
+        return self._decoder.one(RefuelShipResponse, result.data["data"])
+
+    def get_agents(self, page: int = 1, limit: int = None) -> SearchResultPaginated:
+        limit = limit or self._page_size
         result = self._rest_adapter.get(
             endpoint="/agents", ep_params={"page": page, "limit": limit}
         )
 
         _result = SearchResultPaginated(
-            data=[Agent(**agent) for agent in result.data["data"]],
+            data=self._decoder.many(Agent, result.data["data"]),
             meta=MetaPagnaition(**result.data["meta"]),
         )
 
@@ -193,12 +333,12 @@ class SpaceTradersApi:
     def get_public_agent(self, agent_symbol: str) -> Agent:
         result = self._rest_adapter.get(endpoint=f"/agents/{agent_symbol}")
 
-        return Agent(**result.data["data"])
+        return self._decoder.one(Agent, result.data["data"])
 
     def get_contract(self, contract_id: str) -> Contract:
         result = self._rest_adapter.get(endpoint=f"/my/contracts/{contract_id}")
 
-        return Contract(**result.data["data"])
+        return self._decoder.one(Contract, result.data["data"])
 
     def deliver_contract(
         self, contract_id: str, ship_symbol: str, trade_symbol: str, units: int
@@ -212,16 +352,101 @@ class SpaceTradersApi:
             },
         )
 
-        return DeliverCargoToContractResponse(**result.data["data"])
+        return self._decoder.one(DeliverCargoToContractResponse, result.data["data"])
 
     def fulfill_contract(self, contract_id: str) -> AcceptContractResult:
         result = self._rest_adapter.post(
             endpoint=f"/my/contracts/{contract_id}/fulfill",
         )
 
-        return AcceptContractResult(**result.data["data"])
+        return self._decoder.one(AcceptContractResult, result.data["data"])
 
     def get_faction(self, faction_symbol: str) -> Faction:
-        result = self._rest_adapter.get(endpoint=f"/factions/{faction_symbol}")
+        data = self._static_get(
+            "faction", faction_symbol, endpoint=f"/factions/{faction_symbol}"
+        )
+
+        return self._decoder.one(Faction, data["data"])
+
+    def get_system(self, system_symbol: str) -> System:
+        data = self._static_get(
+            "system", system_symbol, endpoint=f"/systems/{system_symbol}"
+        )
+
+        return self._decoder.one(System, data["data"])
+
+    def get_waypoint(self, system_symbol: str, waypoint_symbol: str) -> SystemWaypoint:
+        data = self._static_get(
+            "waypoint",
+            waypoint_symbol,
+            endpoint=f"/systems/{system_symbol}/waypoints/{waypoint_symbol}",
+        )
+
+        return self._decoder.one(SystemWaypoint, data["data"])
+
+    def get_market(self, system_symbol: str, waypoint_symbol: str) -> Market:
+        """
+        Market of a waypoint, with prices and recent transactions if one of your ships is there
+        """
+        result = self._rest_adapter.get(
+            endpoint=f"/systems/{system_symbol}/waypoints/{waypoint_symbol}/market"
+        )
+
+        return self._decoder.one(Market, result.data["data"])
+
+    def get_marketplace_transactions(
+        self, system_symbol: str, waypoint_symbol: str
+    ) -> List[MarketTransaction]:
+        """
+        Recent transactions of a market, the API only serves them as part of the market
+        """
+        market = self.get_market(system_symbol, waypoint_symbol)
+        # A plain dict under decode_mode("raw")
+        if isinstance(market, dict):
+            return market.get("transactions") or []
+        return market.transactions or []
+
+    def iter_systems(self, prefetch: int = 4) -> Iterator[System]:
+        """
+        Walk every system page by page, prefetching `prefetch` pages ahead
+        """
+        return iter_pages(self.get_systems, MAX_PAGE_SIZE, prefetch)
+
+    def iter_system_waypoints(
+        self, system_symbol: str, prefetch: int = 4
+    ) -> Iterator[SystemWaypoint]:
+        return iter_pages(
+            lambda page, limit: self.get_system_waypoints(system_symbol, page, limit),
+            MAX_PAGE_SIZE,
+            prefetch,
+        )
+
+    def iter_agents(self, prefetch: int = 4) -> Iterator[Agent]:
+        return iter_pages(self.get_agents, MAX_PAGE_SIZE, prefetch)
+
+    def iter_factions(self, prefetch: int = 4) -> Iterator[Faction]:
+        return iter_pages(self.get_factions, MAX_PAGE_SIZE, prefetch)
+
+    def iter_contracts(self, prefetch: int = 4) -> Iterator[Contract]:
+        return iter_pages(self.get_contracts, MAX_PAGE_SIZE, prefetch)
+
+    def download_systems_dump(self, path: str, chunk_size: int = 65536) -> int:
+        """
+        Download the full systems.json galaxy dump to `path` in a single streamed request
+        :return: Number of bytes written
+        """
+        return self._rest_adapter.download(
+            self._rest_adapter.url + SYSTEMS_DUMP_ENDPOINT, path, chunk_size
+        )
 
-        return Faction(**result.data["data"])
+    def import_systems(
+        self, path: str, chunk_size: int = 65536, download: bool = True
+    ) -> Iterator[System]:
+        """
+        Yield every System of the galaxy from the systems.json dump, parsed incrementally
+        :param path: Where the dump is (or will be) stored
+        :param download: Fetch a fresh dump first, set to False to reuse the file on disk
+        """
+        if download:
+            self.download_systems_dump(path, chunk_size)
+        return iter_systems_dump(path, chunk_size)
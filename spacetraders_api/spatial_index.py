@@ -0,0 +1,187 @@
+import heapq
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class _Entry:
+    __slots__ = ("x", "y", "item", "type", "traits")
+
+    def __init__(self, item):
+        self.x = item.x
+        self.y = item.y
+        self.item = item
+        self.type = getattr(item, "type", None)
+        self.traits = frozenset(
+            trait.symbol for trait in (getattr(item, "traits", None) or [])
+        )
+
+
+class SpatialIndex:
+    def __init__(self, cell_size: float = 200.0):
+        """
+        Uniform grid over System, SystemWaypoint or Waypoint models for nearest and radius queries.
+        Systems live in galaxy coordinates and waypoints in their system's coordinates,
+        so keep one index per coordinate space (the galaxy, or one system).
+        :param cell_size: Side of a grid cell, about the typical query radius works best
+        """
+        self._cell_size = float(cell_size)
+        self._cells: Dict[Tuple[int, int], List[_Entry]] = {}
+        self._by_symbol: Dict[str, _Entry] = {}
+        self._bounds = None
+
+    @classmethod
+    def from_models(cls, items: Iterable, cell_size: float = 200.0) -> "SpatialIndex":
+        index = cls(cell_size)
+        index.add_many(items)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._by_symbol)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._by_symbol
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return math.floor(x / self._cell_size), math.floor(y / self._cell_size)
+
+    def add(self, item):
+        """
+        Insert a model, replacing the one with the same symbol (e.g. a freshly charted waypoint)
+        """
+        if item.symbol in self._by_symbol:
+            self.remove(item.symbol)
+        entry = _Entry(item)
+        cell = self._cell(entry.x, entry.y)
+        self._cells.setdefault(cell, []).append(entry)
+        self._by_symbol[item.symbol] = entry
+        if self._bounds is None:
+            self._bounds = [cell[0], cell[1], cell[0], cell[1]]
+        else:
+            bounds = self._bounds
+            bounds[0] = min(bounds[0], cell[0])
+            bounds[1] = min(bounds[1], cell[1])
+            bounds[2] = max(bounds[2], cell[0])
+            bounds[3] = max(bounds[3], cell[1])
+
+    def add_many(self, items: Iterable):
+        for item in items:
+            self.add(item)
+
+    def remove(self, symbol: str):
+        entry = self._by_symbol.pop(symbol)
+        cell = self._cell(entry.x, entry.y)
+        bucket = self._cells[cell]
+        bucket.remove(entry)
+        if not bucket:
+            del self._cells[cell]
+
+    def get(self, symbol: str):
+        entry = self._by_symbol.get(symbol)
+        return entry.item if entry is not None else None
+
+    @staticmethod
+    def _matches(
+        entry: _Entry,
+        traits: Optional[frozenset],
+        waypoint_type: Optional[str],
+        exclude: Optional[str],
+    ) -> bool:
+        if waypoint_type is not None and entry.type != waypoint_type:
+            return False
+        if traits and not traits <= entry.traits:
+            return False
+        return exclude is None or entry.item.symbol != exclude
+
+    def _ring(self, cx: int, cy: int, r: int) -> Iterable[List[_Entry]]:
+        cells = self._cells
+        if r == 0:
+            bucket = cells.get((cx, cy))
+            if bucket:
+                yield bucket
+            return
+        for dx in range(-r, r + 1):
+            for cell in ((cx + dx, cy - r), (cx + dx, cy + r)):
+                bucket = cells.get(cell)
+                if bucket:
+                    yield bucket
+        for dy in range(-r + 1, r):
+            for cell in ((cx - r, cy + dy), (cx + r, cy + dy)):
+                bucket = cells.get(cell)
+                if bucket:
+                    yield bucket
+
+    def nearest(
+        self,
+        x: float,
+        y: float,
+        k: int = 1,
+        traits: Iterable[str] = None,
+        waypoint_type: str = None,
+        exclude: str = None,
+    ) -> List[Tuple[float, object]]:
+        """
+        k nearest models to (x, y), closest first
+        :param traits: (optional) Only return models having all of these traits, e.g. ["SHIPYARD"]
+        :param waypoint_type: (optional) Only return models of this type, e.g. "ASTEROID"
+        :param exclude: (optional) Symbol to skip, typically the origin itself
+        :return: list of (distance, model)
+        """
+        if not self._by_symbol or k < 1:
+            return []
+        traits = frozenset(traits) if traits else None
+        cx, cy = self._cell(x, y)
+        bounds = self._bounds
+        max_ring = max(
+            abs(cx - bounds[0]),
+            abs(cx - bounds[2]),
+            abs(cy - bounds[1]),
+            abs(cy - bounds[3]),
+        )
+        best = []  # max-heap of (-distance, tiebreak, entry)
+        for r in range(max_ring + 1):
+            for bucket in self._ring(cx, cy, r):
+                for entry in bucket:
+                    if not self._matches(entry, traits, waypoint_type, exclude):
+                        continue
+                    distance = math.hypot(entry.x - x, entry.y - y)
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, id(entry), entry))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, id(entry), entry))
+            # Every unvisited cell is at least r cells away from the query point
+            if len(best) == k and -best[0][0] <= r * self._cell_size:
+                break
+        return [(-d, entry.item) for d, _, entry in sorted(best, reverse=True)]
+
+    def within(
+        self,
+        x: float,
+        y: float,
+        radius: float,
+        traits: Iterable[str] = None,
+        waypoint_type: str = None,
+        exclude: str = None,
+    ) -> List[Tuple[float, object]]:
+        """
+        Every model within radius of (x, y), closest first
+        :return: list of (distance, model)
+        """
+        if not self._by_symbol:
+            return []
+        traits = frozenset(traits) if traits else None
+        x0, y0 = self._cell(x - radius, y - radius)
+        x1, y1 = self._cell(x + radius, y + radius)
+        bounds = self._bounds
+        x0, y0 = max(x0, bounds[0]), max(y0, bounds[1])
+        x1, y1 = min(x1, bounds[2]), min(y1, bounds[3])
+        found = []
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                for entry in self._cells.get((cx, cy), ()):
+                    if not self._matches(entry, traits, waypoint_type, exclude):
+                        continue
+                    distance = math.hypot(entry.x - x, entry.y - y)
+                    if distance <= radius:
+                        found.append((distance, entry.item))
+        found.sort(key=lambda pair: pair[0])
+        return found
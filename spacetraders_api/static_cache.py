@@ -0,0 +1,93 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Seconds each kind of payload stays valid, the universe only changes on server resets
+DEFAULT_TTLS = {
+    "systems": 24 * 3600,
+    "system": 7 * 24 * 3600,
+    "waypoints": 24 * 3600,
+    "waypoint": 24 * 3600,
+    "faction": 7 * 24 * 3600,
+}
+
+
+class StaticCache:
+    def __init__(
+        self,
+        path: str = "spacetraders_cache.sqlite3",
+        ttls: Dict[str, float] = None,
+    ):
+        """
+        SQLite-backed cache for static universe data (systems, waypoints, factions)
+        :param path: Database file, ":memory:" keeps the cache for the process only
+        :param ttls: (optional) Seconds to keep each kind of payload, merged over DEFAULT_TTLS
+        """
+        self._ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "kind TEXT NOT NULL, key TEXT NOT NULL, fetched_at REAL NOT NULL, "
+                "payload TEXT NOT NULL, PRIMARY KEY (kind, key))"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)"
+            )
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, kind: str, key: str) -> Optional[Any]:
+        """
+        Return the cached payload, or None when it is missing or older than the kind's TTL
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT fetched_at, payload FROM entries WHERE kind = ? AND key = ?",
+                (kind, key),
+            ).fetchone()
+            if row is None or time.time() - row[0] > self._ttls.get(kind, 0):
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[1])
+
+    def put(self, kind: str, key: str, payload: Any):
+        self.put_many(kind, {key: payload})
+
+    def put_many(self, kind: str, payloads: Dict[str, Any]):
+        now = time.time()
+        rows = [(kind, key, now, json.dumps(value)) for key, value in payloads.items()]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)", rows
+            )
+
+    def check_reset(self, reset_date: str) -> bool:
+        """
+        Drop every entry when the server has been reset since the cache was filled
+        :param reset_date: resetDate reported by the server status endpoint
+        :return: True if the cache was invalidated
+        """
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT value FROM meta WHERE name = 'reset_date'"
+            ).fetchone()
+            if row is not None and row[0] == reset_date:
+                return False
+            self._connection.execute("DELETE FROM entries")
+            self._connection.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('reset_date', ?)", (reset_date,)
+            )
+            return row is not None
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM entries")
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,358 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from spacetraders_api.exceptions import SpaceTradersApiException
+from spacetraders_api.market_store import MarketStore
+from spacetraders_api.models import Market, Ship
+
+# Margin matrices are built in blocks of buy markets so a block stays around this many cells
+_BLOCK_CELLS = 1 << 22
+
+
+class TradeRoute(NamedTuple):
+    ship: str
+    buy: str
+    sell: str
+    good: str
+    units: int
+    profit: float
+    seconds: float
+    profit_per_second: float
+
+
+def _get(record, name: str):
+    return record[name] if isinstance(record, dict) else getattr(record, name)
+
+
+def flight_seconds(distance: np.ndarray, speed: int) -> np.ndarray:
+    """
+    CRUISE flight time between waypoints `distance` apart for an engine of `speed`
+    """
+    return np.round(np.round(np.maximum(1, distance)) * (25 / speed) + 15)
+
+
+def fuel_units(distance: np.ndarray) -> np.ndarray:
+    """
+    Fuel burnt flying `distance` in CRUISE
+    """
+    return np.maximum(1, np.round(distance))
+
+
+class _ShipRoutes:
+    __slots__ = (
+        "symbol",
+        "units",
+        "speed",
+        "fuel",
+        "fuel_capacity",
+        "origin",
+        "approach",
+        "top",
+    )
+
+    def __init__(self, ship: Ship):
+        destination = ship.nav.route.destination
+        self.symbol = ship.symbol
+        self.units = ship.cargo.capacity
+        self.speed = max(1, ship.engine.speed)
+        self.fuel = ship.fuel.current
+        self.fuel_capacity = ship.fuel.capacity
+        # In transit ships are planned from where they will arrive
+        self.origin = (destination.systemSymbol, destination.x, destination.y)
+        # Seconds and fuel to reach every waypoint, filled in by the optimizer
+        self.approach: Tuple[np.ndarray, np.ndarray] = None
+        # (flat pair indexes, profit per second), best first
+        self.top: Tuple[np.ndarray, np.ndarray] = (
+            np.empty(0, np.int64),
+            np.empty(0),
+        )
+
+
+class RouteOptimizer:
+    def __init__(
+        self,
+        waypoints: Iterable,
+        ships: Iterable[Ship] = (),
+        k: int = 5,
+        fuel_price: float = 0.0,
+    ):
+        """
+        Ranks buy-here-sell-there routes by profit per second for every ship.
+        Prices are kept as waypoint x good matrices; the best good of every (buy, sell) pair is
+        kept as a margin matrix, and each ship's top `k` routes are derived from it.
+        A market update only recomputes the row and column of its waypoint, and only ships whose
+        ranking it can change are re-ranked.
+        Routes are planned in CRUISE and only between waypoints of the same system.
+        :param waypoints: SystemWaypoint or Waypoint models, or dicts with symbol, x and y
+        :param ships: (optional) Ships to plan for, see update_ship()
+        :param k: Routes kept per ship
+        :param fuel_price: Credits per unit of ship fuel, subtracted from the profit
+        (markets sell FUEL in units of 100)
+        """
+        symbols, systems, xs, ys = [], [], [], []
+        for waypoint in waypoints:
+            symbol = _get(waypoint, "symbol")
+            symbols.append(symbol)
+            systems.append(symbol.rsplit("-", 1)[0])
+            xs.append(_get(waypoint, "x"))
+            ys.append(_get(waypoint, "y"))
+        self.k = k
+        self.fuel_price = fuel_price
+        self.waypoints = symbols
+        self._waypoint_index = {symbol: i for i, symbol in enumerate(symbols)}
+        self._systems = np.array(systems, dtype=object)
+        self._xy = np.column_stack((xs, ys)).astype(np.float64).reshape(-1, 2)
+        self._distance = np.hypot(
+            *(self._xy[:, None, :] - self._xy[None, :, :]).transpose(2, 0, 1)
+        )
+        self._reachable = self._systems[:, None] == self._systems[None, :]
+        np.fill_diagonal(self._reachable, False)
+        self._leg_fuel = fuel_units(self._distance)
+        self._leg_seconds: Dict[int, np.ndarray] = {}
+        self.goods: List[str] = []
+        self._good_index: Dict[str, int] = {}
+        count = len(symbols)
+        # Price to buy a good at a waypoint and price it sells for, inf/-inf where not traded
+        self._purchase = np.full((count, 0), np.inf)
+        self._sell = np.full((count, 0), -np.inf)
+        self._margin = np.full((count, count), -np.inf)
+        self._best_good = np.zeros((count, count), dtype=np.int32)
+        self._ships: Dict[str, _ShipRoutes] = {}
+        for ship in ships:
+            self.update_ship(ship)
+
+    @classmethod
+    def from_store(
+        cls, store: MarketStore, waypoints: Iterable, since=None, **kwargs
+    ) -> "RouteOptimizer":
+        """
+        Optimizer seeded with the latest prices of every good in a MarketStore
+        :param since: (optional) Ignore prices older than this
+        """
+        optimizer = cls(waypoints, **kwargs)
+        prices: Dict[str, Dict[str, Tuple[int, int]]] = {}
+        for good_id in np.unique(store.rows["good"]):
+            good = store.string(int(good_id))
+            for waypoint, price in store.latest_prices(good, since).items():
+                if waypoint in optimizer._waypoint_index:
+                    prices.setdefault(waypoint, {})[good] = price
+        optimizer._add_goods({good for row in prices.values() for good in row})
+        for waypoint, row in prices.items():
+            optimizer._set_prices(waypoint, row)
+        optimizer._rebuild()
+        return optimizer
+
+    def _waypoint(self, symbol: str) -> int:
+        try:
+            return self._waypoint_index[symbol]
+        except KeyError:
+            raise SpaceTradersApiException(f"Unknown waypoint {symbol}") from None
+
+    def _add_goods(self, goods: Iterable[str]) -> bool:
+        new = sorted(set(goods) - self._good_index.keys())
+        for good in new:
+            self._good_index[good] = len(self.goods)
+            self.goods.append(good)
+        if new:
+            pad = ((0, 0), (0, len(new)))
+            self._purchase = np.pad(self._purchase, pad, constant_values=np.inf)
+            self._sell = np.pad(self._sell, pad, constant_values=-np.inf)
+        return bool(new)
+
+    def _set_prices(self, waypoint: str, prices: Dict[str, Tuple[int, int]]):
+        i = self._waypoint(waypoint)
+        self._purchase[i] = np.inf
+        self._sell[i] = -np.inf
+        for good, (purchase, sell) in prices.items():
+            self._purchase[i, self._good_index[good]] = purchase
+            self._sell[i, self._good_index[good]] = sell
+
+    def _margins(self, purchase: np.ndarray, sell: np.ndarray):
+        """
+        Best margin and good for every (buy row of `purchase`, sell row of `sell`) pair
+        """
+        if not purchase.shape[1]:
+            shape = (len(purchase), len(sell))
+            return np.full(shape, -np.inf), np.zeros(shape, dtype=np.int32)
+        spread = sell[None, :, :] - purchase[:, None, :]
+        best = spread.argmax(axis=2).astype(np.int32)
+        margin = np.take_along_axis(spread, best[:, :, None], axis=2)[:, :, 0]
+        return margin, best
+
+    def _rebuild(self):
+        count, goods = self._purchase.shape
+        block = max(1, _BLOCK_CELLS // max(1, count * goods))
+        for start in range(0, count, block):
+            end = min(count, start + block)
+            self._margin[start:end], self._best_good[start:end] = self._margins(
+                self._purchase[start:end], self._sell
+            )
+        self._margin[~self._reachable] = -np.inf
+        for routes in self._ships.values():
+            self._rank(routes)
+
+    def _seconds(self, speed: int) -> np.ndarray:
+        seconds = self._leg_seconds.get(speed)
+        if seconds is None:
+            seconds = self._leg_seconds[speed] = flight_seconds(self._distance, speed)
+        return seconds
+
+    def _approach(self, routes: _ShipRoutes):
+        """
+        Seconds and fuel from the ship's position to every waypoint, inf where unreachable
+        """
+        system, x, y = routes.origin
+        distance = np.hypot(self._xy[:, 0] - x, self._xy[:, 1] - y)
+        seconds = np.where(distance < 0.5, 0.0, flight_seconds(distance, routes.speed))
+        fuel = np.where(distance < 0.5, 0.0, fuel_units(distance))
+        unreachable = self._systems != system
+        if routes.fuel_capacity:
+            unreachable |= fuel > routes.fuel
+        seconds[unreachable] = np.inf
+        return seconds, fuel
+
+    def _profit_per_second(
+        self, routes: _ShipRoutes, rows=slice(None), columns=slice(None)
+    ) -> np.ndarray:
+        approach_seconds, approach_fuel = routes.approach
+        seconds = self._seconds(routes.speed)[rows, columns]
+        fuel = self._leg_fuel[rows, columns]
+        buy_seconds = approach_seconds[rows]
+        buy_fuel = approach_fuel[rows]
+        if np.ndim(seconds) == 2:
+            buy_seconds, buy_fuel = buy_seconds[:, None], buy_fuel[:, None]
+        profit = routes.units * self._margin[rows, columns] - self.fuel_price * (
+            buy_fuel + fuel
+        )
+        seconds = buy_seconds + seconds
+        feasible = (profit > 0) & np.isfinite(seconds)
+        if routes.fuel_capacity:
+            feasible &= fuel <= routes.fuel_capacity
+        with np.errstate(invalid="ignore"):
+            return np.where(feasible, profit / seconds, -np.inf)
+
+    def _rank(self, routes: _ShipRoutes):
+        value = self._profit_per_second(routes).ravel()
+        k = min(self.k, len(value))
+        if not k:
+            return
+        top = np.argpartition(-value, k - 1)[:k]
+        top = top[np.isfinite(value[top])]
+        top = top[np.argsort(-value[top], kind="stable")]
+        routes.top = (top, value[top])
+
+    def update_ship(self, ship: Ship):
+        """
+        Add a ship or re-plan it after it moved, refuelled or changed modules
+        """
+        routes = self._ships[ship.symbol] = _ShipRoutes(ship)
+        routes.approach = self._approach(routes)
+        self._rank(routes)
+
+    def remove_ship(self, ship_symbol: str):
+        self._ships.pop(ship_symbol, None)
+
+    def update_market(self, market: Market) -> int:
+        """
+        Apply a market snapshot, see update_prices()
+        """
+        if not market.tradeGoods:
+            return 0
+        return self.update_prices(
+            market.symbol,
+            {
+                good.symbol: (good.purchasePrice, good.sellPrice)
+                for good in market.tradeGoods
+            },
+        )
+
+    def update_prices(self, waypoint: str, prices: Dict[str, Tuple[int, int]]) -> int:
+        """
+        Replace every price of one market and re-rank the ships it affects
+        :param prices: {good: (purchase price, sell price)}
+        :return: Number of ships re-ranked
+        """
+        if self._add_goods(prices):
+            # A good nobody traded before changes the shape of every matrix
+            self._set_prices(waypoint, prices)
+            self._rebuild()
+            return len(self._ships)
+        self._set_prices(waypoint, prices)
+        i = self._waypoint(waypoint)
+        self._margin[i], self._best_good[i] = (
+            array[0] for array in self._margins(self._purchase[i : i + 1], self._sell)
+        )
+        self._margin[:, i], self._best_good[:, i] = (
+            array[:, 0]
+            for array in self._margins(self._purchase, self._sell[i : i + 1])
+        )
+        self._margin[i, ~self._reachable[i]] = -np.inf
+        self._margin[~self._reachable[:, i], i] = -np.inf
+
+        count = len(self.waypoints)
+        reranked = 0
+        for routes in self._ships.values():
+            top, value = routes.top
+            kth = value[-1] if len(top) >= self.k else -np.inf
+            touched = (top // count == i) | (top % count == i)
+            if not touched.any():
+                best = max(
+                    self._profit_per_second(routes, rows=i).max(initial=-np.inf),
+                    self._profit_per_second(routes, columns=i).max(initial=-np.inf),
+                )
+                if best <= kth:
+                    continue
+            self._rank(routes)
+            reranked += 1
+        return reranked
+
+    def _route(self, routes: _ShipRoutes, pair: int, value: float) -> TradeRoute:
+        buy, sell = divmod(int(pair), len(self.waypoints))
+        seconds = routes.approach[0][buy] + self._seconds(routes.speed)[buy, sell]
+        return TradeRoute(
+            ship=routes.symbol,
+            buy=self.waypoints[buy],
+            sell=self.waypoints[sell],
+            good=self.goods[self._best_good[buy, sell]],
+            units=routes.units,
+            profit=float(value * seconds),
+            seconds=float(seconds),
+            profit_per_second=float(value),
+        )
+
+    def top_routes(self, ship_symbol: str) -> List[TradeRoute]:
+        """
+        Best routes of a ship, most profit per second first
+        """
+        try:
+            routes = self._ships[ship_symbol]
+        except KeyError:
+            raise SpaceTradersApiException(f"Unknown ship {ship_symbol}") from None
+        top, value = routes.top
+        return [self._route(routes, pair, v) for pair, v in zip(top, value)]
+
+    def assign(self) -> Dict[str, Optional[TradeRoute]]:
+        """
+        One route per ship so that no two ships buy the same good at the same market or sell it
+        at the same market. Greedy over every ship's top routes, best profit per second first;
+        ships whose routes are all taken get None.
+        """
+        candidates = [
+            (value, symbol, pair)
+            for symbol, routes in self._ships.items()
+            for pair, value in zip(*routes.top)
+        ]
+        candidates.sort(key=lambda candidate: -candidate[0])
+        count = len(self.waypoints)
+        assigned: Dict[str, Optional[TradeRoute]] = dict.fromkeys(self._ships)
+        claimed = set()
+        for value, symbol, pair in candidates:
+            if assigned[symbol] is not None:
+                continue
+            buy, sell = divmod(int(pair), count)
+            good = int(self._best_good[buy, sell])
+            if ("buy", buy, good) in claimed or ("sell", sell, good) in claimed:
+                continue
+            claimed.update((("buy", buy, good), ("sell", sell, good)))
+            assigned[symbol] = self._route(self._ships[symbol], pair, value)
+        return assigned
@@ -0,0 +1,326 @@
+import json
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from spacetraders_api.exceptions import TransportError
+
+Timeout = Optional[Union[float, Tuple[float, float]]]
+
+
+# (connect, read) seconds used when the caller does not pass a timeout
+DEFAULT_TIMEOUT = (5.0, 30.0)
+
+
+def _requests_error_sent(error: Exception) -> bool:
+    """
+    Whether a failed requests call may have reached the server
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return False
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        from urllib3.exceptions import NewConnectionError
+
+        # urllib3 wraps the socket error in MaxRetryError.reason
+        reason = getattr(error.args[0], "reason", error.args[0])
+        return not isinstance(reason, NewConnectionError)
+    return True
+
+
+def _httpx_error_sent(httpx, error: Exception) -> bool:
+    return not isinstance(
+        error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+    )
+
+
+class TransportResponse:
+    def __init__(
+        self,
+        status_code: int,
+        reason: str,
+        headers: CaseInsensitiveDict,
+        content: bytes,
+    ):
+        """
+        Library-agnostic HTTP response handed back to RestAdapter by a transport
+        :param status_code: Standard HTTP Status code
+        :param reason: HTTP reason phrase
+        :param headers: Case-insensitive response headers
+        :param content: Raw response body
+        """
+        self.status_code = int(status_code)
+        self.reason = reason or ""
+        self.headers = headers
+        self.content = content
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class StreamingResponse:
+    def __init__(self, status_code: int, reason: str, headers, chunks):
+        """
+        Response whose body is consumed chunk by chunk instead of being loaded in memory
+        :param chunks: Iterator (or async iterator) of body chunks
+        """
+        self.status_code = int(status_code)
+        self.reason = reason or ""
+        self.headers = headers
+        self.chunks = chunks
+
+
+class RequestsTransport:
+    def __init__(
+        self,
+        pool_size: int = 10,
+        max_connections_per_host: int = 10,
+        ssl_verify: bool = True,
+    ):
+        """
+        Keep-alive transport backed by a single pooled requests.Session
+        :param pool_size: Number of per-host connection pools to keep around
+        :param max_connections_per_host: Connections kept open to a single host
+        :param ssl_verify: Verify TLS certificates
+        """
+        self._session = requests.Session()
+        self._session.verify = ssl_verify
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=max_connections_per_host
+        )
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        params: Dict = None,
+        content: bytes = None,
+        headers: Dict = None,
+        timeout: Timeout = None,
+    ) -> TransportResponse:
+        if self._closed:
+            raise TransportError("Transport is closed", sent=False, retryable=False)
+        try:
+            response = self._session.request(
+                method=method,
+                url=url,
+                params=params,
+                data=content,
+                headers=headers,
+                timeout=timeout,
+            )
+        except requests.exceptions.RequestException as e:
+            raise TransportError(str(e), sent=_requests_error_sent(e)) from e
+        return TransportResponse(
+            response.status_code,
+            reason=response.reason,
+            headers=response.headers,
+            content=response.content,
+        )
+
+    @contextmanager
+    def stream(
+        self, method: str, url: str, timeout: Timeout = None, chunk_size: int = 65536
+    ) -> Iterator[StreamingResponse]:
+        if self._closed:
+            raise TransportError("Transport is closed", sent=False, retryable=False)
+        try:
+            response = self._session.request(
+                method=method, url=url, timeout=timeout, stream=True
+            )
+        except requests.exceptions.RequestException as e:
+            raise TransportError(str(e)) from e
+        try:
+            yield StreamingResponse(
+                response.status_code,
+                reason=response.reason,
+                headers=response.headers,
+                chunks=self._iter_chunks(response, chunk_size),
+            )
+        finally:
+            response.close()
+
+    @staticmethod
+    def _iter_chunks(response, chunk_size: int) -> Iterator[bytes]:
+        try:
+            yield from response.iter_content(chunk_size=chunk_size)
+        except requests.exceptions.RequestException as e:
+            raise TransportError(str(e)) from e
+
+    def close(self):
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._session.close()
+
+
+class HttpxTransport:
+    def __init__(
+        self,
+        pool_size: int = 10,
+        max_connections_per_host: int = 10,
+        ssl_verify: bool = True,
+        http2: bool = True,
+    ):
+        """
+        Keep-alive transport backed by httpx, able to multiplex requests over HTTP/2.
+        Requires the optional httpx dependency (pip install "httpx[http2]").
+        :param pool_size: Total number of connections kept in the pool
+        :param max_connections_per_host: Kept for parity with RequestsTransport, httpx pools per client
+        :param ssl_verify: Verify TLS certificates
+        :param http2: Negotiate HTTP/2 when the server supports it
+        """
+        import httpx
+
+        self._httpx = httpx
+        limits = httpx.Limits(
+            max_connections=max(pool_size, max_connections_per_host),
+            max_keepalive_connections=max_connections_per_host,
+        )
+        self._client = httpx.Client(verify=ssl_verify, http2=http2, limits=limits)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        params: Dict = None,
+        content: bytes = None,
+        headers: Dict = None,
+        timeout: Timeout = None,
+    ) -> TransportResponse:
+        if self._closed:
+            raise TransportError("Transport is closed", sent=False, retryable=False)
+        if isinstance(timeout, tuple):
+            timeout = self._httpx.Timeout(timeout[1], connect=timeout[0])
+        try:
+            response = self._client.request(
+                method=method,
+                url=url,
+                params=params,
+                content=content,
+                headers=headers,
+                timeout=timeout,
+            )
+        except self._httpx.HTTPError as e:
+            raise TransportError(str(e), sent=_httpx_error_sent(self._httpx, e)) from e
+        return TransportResponse(
+            response.status_code,
+            reason=response.reason_phrase,
+            headers=CaseInsensitiveDict(response.headers),
+            content=response.content,
+        )
+
+    @contextmanager
+    def stream(
+        self, method: str, url: str, timeout: Timeout = None, chunk_size: int = 65536
+    ) -> Iterator[StreamingResponse]:
+        if self._closed:
+            raise TransportError("Transport is closed", sent=False, retryable=False)
+        if isinstance(timeout, tuple):
+            timeout = self._httpx.Timeout(timeout[1], connect=timeout[0])
+        try:
+            with self._client.stream(method, url, timeout=timeout) as response:
+                yield StreamingResponse(
+                    response.status_code,
+                    reason=response.reason_phrase,
+                    headers=CaseInsensitiveDict(response.headers),
+                    chunks=response.iter_bytes(chunk_size=chunk_size),
+                )
+        except self._httpx.HTTPError as e:
+            raise TransportError(str(e)) from e
+
+    def close(self):
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._client.close()
+
+
+class AsyncHttpxTransport:
+    def __init__(
+        self,
+        pool_size: int = 10,
+        max_connections_per_host: int = 10,
+        ssl_verify: bool = True,
+        http2: bool = False,
+    ):
+        """
+        Pooled asyncio transport backed by httpx.AsyncClient.
+        Requires the optional httpx dependency (pip install "httpx[http2]").
+        :param pool_size: Total number of connections kept in the pool
+        :param max_connections_per_host: Keep-alive connections reused per host
+        :param ssl_verify: Verify TLS certificates
+        :param http2: Negotiate HTTP/2 when the server supports it
+        """
+        import httpx
+
+        self._httpx = httpx
+        limits = httpx.Limits(
+            max_connections=max(pool_size, max_connections_per_host),
+            max_keepalive_connections=max_connections_per_host,
+        )
+        self._client = httpx.AsyncClient(verify=ssl_verify, http2=http2, limits=limits)
+        self._closed = False
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        params: Dict = None,
+        content: bytes = None,
+        headers: Dict = None,
+        timeout: Timeout = None,
+    ) -> TransportResponse:
+        if self._closed:
+            raise TransportError("Transport is closed", sent=False, retryable=False)
+        if isinstance(timeout, tuple):
+            timeout = self._httpx.Timeout(timeout[1], connect=timeout[0])
+        try:
+            response = await self._client.request(
+                method=method,
+                url=url,
+                params=params,
+                content=content,
+                headers=headers,
+                timeout=timeout,
+            )
+        except self._httpx.HTTPError as e:
+            raise TransportError(str(e), sent=_httpx_error_sent(self._httpx, e)) from e
+        return TransportResponse(
+            response.status_code,
+            reason=response.reason_phrase,
+            headers=CaseInsensitiveDict(response.headers),
+            content=response.content,
+        )
+
+    @asynccontextmanager
+    async def stream(
+        self, method: str, url: str, timeout: Timeout = None, chunk_size: int = 65536
+    ) -> AsyncIterator[StreamingResponse]:
+        if self._closed:
+            raise TransportError("Transport is closed", sent=False, retryable=False)
+        if isinstance(timeout, tuple):
+            timeout = self._httpx.Timeout(timeout[1], connect=timeout[0])
+        try:
+            async with self._client.stream(method, url, timeout=timeout) as response:
+                yield StreamingResponse(
+                    response.status_code,
+                    reason=response.reason_phrase,
+                    headers=CaseInsensitiveDict(response.headers),
+                    chunks=response.aiter_bytes(chunk_size=chunk_size),
+                )
+        except self._httpx.HTTPError as e:
+            raise TransportError(str(e)) from e
+
+    async def aclose(self):
+        if not self._closed:
+            self._closed = True
+            await self._client.aclose()